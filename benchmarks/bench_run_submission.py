@@ -0,0 +1,130 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+"""bench_run_submission.py
+
+Benchmark comparing run submission by names with run submission by ids on
+the execution endpoint. Kubeflow is replaced by an in-process fake client
+which sleeps a fixed latency per API call.
+
+Run from this directory:
+    python3 bench_run_submission.py --requests 200 --latency-ms 20
+
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# pylint: disable=wrong-import-position
+from kfadapter import kfadapter_main
+from kfadapter import kfadapter_conf
+from kfadapter import kfadapter_kfconnect
+
+
+class SlowKfp:
+    """Fake kfp client answering every call after latency seconds"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def _wait(self):
+        self.calls += 1
+        time.sleep(self.latency)
+
+    def get_experiment(self, experiment_name=None, namespace=None):
+        self._wait()
+        return SimpleNamespace(experiment_id='exp-id', display_name=experiment_name)
+
+    def get_pipeline_id(self, name):
+        self._wait()
+        return 'pipeline-id'
+
+    def list_pipeline_versions(self, pipeline_id, page_token='', page_size=10):
+        self._wait()
+        return SimpleNamespace(next_page_token='', pipeline_versions=[
+            SimpleNamespace(display_name='1', pipeline_version_id='version-id')])
+
+    def run_pipeline(self, exp_id, job_name, pipeline_package_path=None, params=None,
+                     pipeline_id=None, version_id=None):
+        self._wait()
+        return SimpleNamespace(run_id='run-id', display_name=job_name, experiment_id=exp_id,
+                               state='RUNNING')
+
+
+ARGUMENTS = {"trainingjob_id": "1", "featuregroup_name": "fg", "epochs": "1",
+             "modelName": "model", "modelVersion": "1"}
+
+BODIES = {
+    'names': {"arguments": ARGUMENTS, "experiment_name": "Default",
+              "pipeline_name": "qoe_pipeline", "pipeline_version": "1"},
+    'ids': {"arguments": ARGUMENTS, "experiment_id": "exp-id",
+            "pipeline_id": "pipeline-id", "pipeline_version_id": "version-id"},
+}
+
+
+def run_case(client, kfp, body, requests):
+    """Function submitting requests runs and giving latency percentiles in ms
+       and number of Kubeflow calls per submission"""
+    kfp.calls = 0
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.post("/trainingjobs/job/execution", data=json.dumps(body),
+                               headers={'content-type': 'application/json'})
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.get_data()
+    latencies.sort()
+    return (latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99) - 1],
+            kfp.calls / requests)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    args = parser.parse_args()
+
+    kfadapter_main.KFCONNECT_CONFIG_OBJ = kfadapter_conf.KfConfiguration.get_instance()
+    kfadapter_main.LOGGER = kfadapter_main.KFCONNECT_CONFIG_OBJ.logger
+    kfadapter_main.LOGGER.setLevel('WARNING')
+    kfadapter_main.KFCONNECT_KF_OBJ = kfadapter_kfconnect.KfConnect()
+    kfp = SlowKfp(args.latency_ms / 1000)
+    kfadapter_main.KFCONNECT_KF_OBJ.kfp_client = kfp
+    client = kfadapter_main.APP.test_client()
+
+    kfconnect = kfadapter_main.KFCONNECT_KF_OBJ
+    print("%-22s %10s %10s %14s" % ("path", "p50 ms", "p99 ms", "kfp calls/run"))
+    for name, cache_ttl in (('names, cache disabled', 0), ('names, cache warm', 60),
+                            ('ids', 60)):
+        kfconnect.metadata_cache.ttl = cache_ttl
+        kfconnect.version_index_cache.ttl = cache_ttl
+        kfconnect.metadata_cache.clear()
+        kfconnect.version_index_cache.clear()
+        body = BODIES['ids' if name == 'ids' else 'names']
+        p50, p99, calls = run_case(client, kfp, body, args.requests)
+        print("%-22s %10.2f %10.2f %14.2f" % (name, p50, p99, calls))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+"""bench_server.py
+
+Benchmark comparing throughput of the Flask development server with the
+gunicorn server of kfadapter_server under concurrent clients. Each server
+runs in its own process with Kubeflow replaced by a fake client which
+sleeps a fixed latency per API call, clients read GET /runs/<run_id>.
+
+Run from this directory:
+    python3 bench_server.py --clients 32 --seconds 10 --latency-ms 20
+
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+import subprocess
+from types import SimpleNamespace
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# pylint: disable=wrong-import-position
+from kfadapter import kfadapter_main
+from kfadapter import kfadapter_conf
+from kfadapter import kfadapter_kfconnect
+from kfadapter import kfadapter_server
+
+SERVER_ENV = {'KUBEFLOW_HOST': 'fake-kubeflow', 'KUBEFLOW_PORT': '0', 'KF_NAMESPACE': 'kubeflow',
+              'TRAININGMGR_HOST': '127.0.0.1', 'TRAININGMGR_PORT': '1',
+              'NOTIFICATION_OUTBOX_PATH': '', 'TRACKED_RUN_STORE_PATH': '',
+              # every request goes to the fake kubeflow
+              'RUN_STATE_CACHE_MAX_AGE_SEC': '0'}
+
+
+class SlowKfp:
+    """Fake kfp client answering every call after latency seconds"""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def get_run(self, run_id):
+        time.sleep(self.latency)
+        return SimpleNamespace(run_id=run_id, display_name='run-name', state='RUNNING')
+
+    def list_runs(self, page_token='', page_size=10, sort_by='', experiment_id=None,
+                  namespace=None, filter=None):
+        # pylint: disable=redefined-builtin
+        time.sleep(self.latency)
+        return SimpleNamespace(runs=[], next_page_token=None)
+
+
+def serve(kind, latency):
+    """Function serving the app with the fake kubeflow client until killed"""
+    kfadapter_kfconnect.KfConnect.get_kf_client = \
+        lambda self, host=None: setattr(self, 'kfp_client', SlowKfp(latency))
+    kfc_config = kfadapter_conf.KfConfiguration.get_instance()
+    kfc_config.logger.setLevel('WARNING')
+    if kind == 'dev':
+        kfadapter_main.start_services()
+        kfadapter_main.APP.run(host='0.0.0.0', port=kfc_config.appport)
+    else:
+        options = kfadapter_server.server_options(kfc_config)
+        options['loglevel'] = 'warning'
+        kfadapter_server.KfAdapterServer(kfadapter_main.APP, options).run()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def load(url, clients, seconds):
+    """Function reading url from concurrent clients with keep-alive sessions and
+       giving requests per second, latency percentiles in ms and errors"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client():
+        session = requests.Session()
+        own = []
+        failed = 0
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                ok = session.get(url, timeout=10).status_code == 200
+            except requests.exceptions.RequestException:
+                ok = False
+            if ok:
+                own.append((time.perf_counter() - start) * 1000)
+            else:
+                failed += 1
+        with lock:
+            latencies.extend(own)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    if not latencies:
+        return 0, 0, 0, errors[0]
+    return (len(latencies) / seconds, latencies[len(latencies) // 2],
+            latencies[max(0, int(len(latencies) * 0.99) - 1)], errors[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[2])
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--threads', type=int, default=64, help='gunicorn threads')
+    parser.add_argument('--serve', choices=['dev', 'gunicorn'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.latency_ms / 1000)
+        return
+
+    print("%-10s %10s %10s %10s %8s" % ("server", "req/s", "p50 ms", "p99 ms", "errors"))
+    for kind in ('dev', 'gunicorn'):
+        port = free_port()
+        env = dict(os.environ, KF_ADAPTER_PORT=str(port), SERVER_THREADS=str(args.threads),
+                   **SERVER_ENV)
+        server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', kind,
+                                   '--latency-ms', str(args.latency_ms)], env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            url = 'http://127.0.0.1:%d/runs/run-id' % port
+            wait_ready(url)
+            rate, p50, p99, errors = load(url, args.clients, args.seconds)
+        finally:
+            server.terminate()
+            server.wait()
+        print("%-10s %10.1f %10.2f %10.2f %8d" % (kind, rate, p50, p99, errors))
+
+
+if __name__ == '__main__':
+    main()
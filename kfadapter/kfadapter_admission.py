@@ -0,0 +1,177 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+"""kfadapter_admission.py
+
+This module is for limiting the number of pipeline runs in flight in
+Kubeflow, submissions beyond the limit wait in a priority ordered queue
+
+"""
+
+import time
+import heapq
+import itertools
+from threading import Condition
+
+from kfadapter import kfadapter_conf
+from kfadapter.kfadapter_metrics import METRICS
+
+
+class AdmissionRejected(ValueError):
+    """
+    This is a class for the exception raised when a submission is not admitted
+    because the admission queue is full or waiting for a free slot timed out
+    """
+
+
+class AdmissionController:
+    """
+    This is a class for admitting run submissions while the runs tracked in
+    kfadapter_conf.TRAINING_DICT plus the admitted but not yet tracked ones
+    stay below max_in_flight. Waiting submissions are admitted highest
+    priority first and in arrival order within a priority.
+
+    A slot is taken by acquire and handed over to the tracked run by
+    kfadapter_conf.track_run, or given back by cancel if no run gets tracked.
+    kfadapter_conf.untrack_run frees the slot of a finished run.
+
+    Attributes: None
+    """
+
+    def __init__(self, max_in_flight, max_queued=1000, timeout=60):
+        """
+        The constructor for AdmissionController class.
+
+        Parameters:
+            max_in_flight: maximum number of runs in flight
+            max_queued: maximum number of submissions waiting for admission
+            timeout: seconds a submission waits for admission before it is rejected
+         """
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.cond = Condition()
+        self.reserved = 0
+        # heap of (-priority, arrival sequence) of waiting submissions
+        self.waiters = []
+        self.sequence = itertools.count()
+
+    def in_flight(self):
+        """
+        Function for giving number of runs in flight
+
+        Args: None
+
+        Returns: tracked runs plus admitted runs not tracked yet
+
+        """
+        return len(kfadapter_conf.TRAINING_DICT) + self.reserved
+
+    def _update_gauges(self):
+        # caller holds self.cond
+        METRICS.set_gauge('admission_in_flight', self.in_flight())
+        METRICS.set_gauge('admission_queue_depth', len(self.waiters))
+
+    def acquire(self, priority=0):
+        """
+        Function for waiting until a submission may be sent to Kubeflow
+
+        Args:
+            priority: higher priorities are admitted first
+
+        Returns: None
+
+        Exceptions:
+            AdmissionRejected: queue is full or no slot got free within timeout
+
+        """
+        start = time.monotonic()
+        with self.cond:
+            if not self.waiters and self.in_flight() < self.max_in_flight:
+                self.reserved += 1
+                METRICS.inc('admission_admitted')
+                self._update_gauges()
+                return
+            if len(self.waiters) >= self.max_queued:
+                METRICS.inc('admission_rejected')
+                raise AdmissionRejected("Too many submissions waiting for admission")
+
+            entry = (-priority, next(self.sequence))
+            heapq.heappush(self.waiters, entry)
+            METRICS.inc('admission_queued')
+            self._update_gauges()
+            deadline = start + self.timeout
+            while self.waiters[0] != entry or self.in_flight() >= self.max_in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.waiters.remove(entry)
+                    heapq.heapify(self.waiters)
+                    self._update_gauges()
+                    self.cond.notify_all()
+                    METRICS.inc('admission_rejected')
+                    raise AdmissionRejected("Timed out waiting for admission, %d runs in flight"
+                                            % self.in_flight())
+                self.cond.wait(remaining)
+
+            heapq.heappop(self.waiters)
+            self.reserved += 1
+            METRICS.inc('admission_admitted')
+            METRICS.observe('admission_wait_seconds', time.monotonic() - start)
+            self._update_gauges()
+            # the next waiter may fit as well
+            self.cond.notify_all()
+
+    def tracked(self):
+        """
+        Function for handing a slot over to a run added to TRAINING_DICT,
+        called by kfadapter_conf.track_run
+
+        Args: None
+
+        Returns: None
+
+        """
+        with self.cond:
+            self.reserved = max(0, self.reserved - 1)
+
+    def cancel(self):
+        """
+        Function for giving back a slot of a submission whose run is not tracked
+
+        Args: None
+
+        Returns: None
+
+        """
+        with self.cond:
+            self.reserved = max(0, self.reserved - 1)
+            self._update_gauges()
+            self.cond.notify_all()
+
+    def finished(self):
+        """
+        Function for waking up waiting submissions after a tracked run finished,
+        called by kfadapter_conf.untrack_run
+
+        Args: None
+
+        Returns: None
+
+        """
+        with self.cond:
+            self._update_gauges()
+            self.cond.notify_all()
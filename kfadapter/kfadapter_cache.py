@@ -0,0 +1,319 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+"""kfadapter_cache.py
+
+This module is for caching Kubeflow lookups in memory and coalescing
+concurrent identical calls
+
+"""
+
+import time
+from collections import OrderedDict
+from threading import Lock, Event
+
+from kfadapter.kfadapter_metrics import METRICS
+from kfadapter.kfadapter_util import run_finished
+
+
+class TtlLruCache:
+    """
+    This is a class for a bounded, thread safe cache whose entries expire
+    after ttl seconds and are evicted least recently used first.
+
+    Attributes: None
+    """
+
+    def __init__(self, maxsize, ttl, name):
+        """
+        The constructor for TtlLruCache class.
+
+        Parameters:
+            maxsize: maximum number of entries
+            ttl: seconds an entry stays valid, 0 disables caching
+            name: prefix of hit/miss/eviction counters in metrics
+         """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self.lock = Lock()
+        # key -> (expiry time, value), ordered from least to most recently used
+        self.entries = OrderedDict()
+
+    def get(self, key, default=None):
+        """
+        Function for giving a cached value and counting the hit or miss
+
+        Args:
+            key: cache key
+            default: value returned when key is not cached or expired
+
+        Returns: cached value or default
+
+        """
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(key)
+                METRICS.inc(self.name + '_cache_hits')
+                return entry[1]
+            if entry is not None:
+                del self.entries[key]
+        METRICS.inc(self.name + '_cache_misses')
+        return default
+
+    def put(self, key, value):
+        """
+        Function for storing a value, evicting least recently used entries
+        when the cache is full
+
+        Args:
+            key: cache key
+            value: value to cache
+
+        Returns: None
+
+        """
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                METRICS.inc(self.name + '_cache_evictions')
+
+    def get_or_load(self, key, loader):
+        """
+        Function for giving a cached value or loading and caching it,
+        None results of loader are not cached
+
+        Args:
+            key: cache key
+            loader: function without arguments returning the value
+
+        Returns: cached or loaded value
+
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+        value = loader()
+        if value is not None:
+            self.put(key, value)
+        return value
+
+    def invalidate(self, key):
+        """
+        Function for removing one entry
+
+        Args:
+            key: cache key
+
+        Returns: None
+
+        """
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        """
+        Function for removing all entries for which predicate(key, value) is true
+
+        Args:
+            predicate: function of key and value
+
+        Returns: number of removed entries
+
+        """
+        with self.lock:
+            keys = [key for key, entry in self.entries.items() if predicate(key, entry[1])]
+            for key in keys:
+                del self.entries[key]
+        return len(keys)
+
+    def clear(self):
+        """
+        Function for removing all entries
+
+        Args: None
+
+        Returns: None
+
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+
+class SingleFlight:
+    """
+    This is a class for coalescing concurrent calls with the same key, the
+    first caller runs the function and the others wait for its result or
+    exception instead of running it again.
+
+    Attributes: None
+    """
+
+    def __init__(self, name):
+        """
+        The constructor for SingleFlight class.
+
+        Parameters:
+            name: prefix of the coalesced calls counter in metrics
+         """
+        self.name = name
+        self.lock = Lock()
+        # key -> [done event, result, exception] of the call in flight
+        self.calls = {}
+
+    def do(self, key, func):
+        """
+        Function for running func once for all concurrent callers with key
+
+        Args:
+            key: key identifying identical calls
+            func: function without arguments
+
+        Returns: result of func
+
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = [Event(), None, None]
+                self.calls[key] = call
+        if not leader:
+            METRICS.inc(self.name + '_coalesced')
+            call[0].wait()
+            if call[2] is not None:
+                raise call[2]
+            return call[1]
+
+        try:
+            call[1] = func()
+            return call[1]
+        except Exception as err:
+            call[2] = err
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call[0].set()
+
+
+class RunStateCache:
+    """
+    This is a class for the last fetched state of runs, written by the status
+    poller and read by run endpoints. Every entry carries the wall clock time
+    it was fetched at and readers pass the maximum age they accept, except for
+    finished runs whose state can not change any more.
+
+    Attributes: None
+    """
+
+    def __init__(self, maxsize=10000):
+        """
+        The constructor for RunStateCache class.
+
+        Parameters:
+            maxsize: maximum number of entries, least recently written are evicted
+         """
+        self.maxsize = maxsize
+        self.lock = Lock()
+        # run_id -> (fetch time, run), ordered from least to most recently written
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, run, fetched_at=None):
+        """
+        Function for storing the fetched state of a run
+
+        Args:
+            run: kubeflow run
+            fetched_at: wall clock time the run was fetched at, current time if not given
+
+        Returns: None
+
+        """
+        if fetched_at is None:
+            fetched_at = time.time()
+        with self.lock:
+            entry = self.entries.get(run.run_id)
+            if entry is not None and entry[0] > fetched_at:
+                return
+            self.entries[run.run_id] = (fetched_at, run)
+            self.entries.move_to_end(run.run_id)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+            size = len(self.entries)
+        METRICS.set_gauge('run_state_cache_size', size)
+
+    def get(self, run_id, max_age):
+        """
+        Function for giving the cached state of a run fetched within max_age
+        seconds, or of a finished run, and counting the hit or miss
+
+        Args:
+            run_id: run id of the run
+            max_age: maximum age in seconds of the entry
+
+        Returns: tuple of run and age in seconds, or None
+
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(run_id)
+            hit = entry is not None and \
+                (now - entry[0] <= max_age or run_finished(entry[1].state))
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            ratio = self.hits / (self.hits + self.misses)
+        METRICS.set_gauge('run_state_cache_hit_ratio', ratio)
+        if not hit:
+            METRICS.inc('run_state_cache_misses')
+            return None
+        age = now - entry[0]
+        METRICS.inc('run_state_cache_hits')
+        METRICS.observe('run_state_cache_age_seconds', age)
+        return entry[1], age
+
+    def invalidate(self, run_id):
+        """
+        Function for removing the entry of a run
+
+        Args:
+            run_id: run id of the run
+
+        Returns: None
+
+        """
+        with self.lock:
+            self.entries.pop(run_id, None)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
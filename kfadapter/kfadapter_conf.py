@@ -24,13 +24,74 @@ Application configuration - Application Port and run status interval
 
 """
 
+import time
 from os import getenv
 from threading import Lock
 
 from kfadapter.tmgr_logger import TMLogger
 
 TRAINING_DICT = {}
+# trainingjob_id -> run_id of tracked runs, reverse index of TRAINING_DICT
+JOB_RUNS = {}
+# run_id -> epoch seconds the run was first tracked, bounds the run listing of the poller
+RUN_TRACKED_AT = {}
 LOCK = Lock()
+# TrackedRunStore persisting TRAINING_DICT, set at startup when enabled
+RUN_STORE = None
+# AdmissionController limiting runs in flight, set at startup when enabled
+ADMISSION = None
+# RunStateCache written by the status poller, set at startup when enabled
+RUN_STATE_CACHE = None
+# RunEventBus the status poller publishes run state transitions to, set at startup
+RUN_EVENTS = None
+# SubmissionDeduplicator told about untracked runs, set at startup when enabled
+SUBMISSIONS = None
+
+
+def track_run(run_id, trainingjob_id):
+    """
+    Function for adding a run to TRAINING_DICT, JOB_RUNS, RUN_TRACKED_AT and
+    the run store, caller must hold LOCK
+
+    Args:
+        run_id: run id of submitted run
+        trainingjob_id: trainingjob id the run belongs to
+
+    Returns: None
+
+    """
+    new_run = run_id not in TRAINING_DICT
+    TRAINING_DICT[run_id] = trainingjob_id
+    JOB_RUNS[trainingjob_id] = run_id
+    RUN_TRACKED_AT.setdefault(run_id, time.time())
+    if ADMISSION is not None and new_run:
+        ADMISSION.tracked()
+    if RUN_STORE is not None:
+        RUN_STORE.put(run_id, trainingjob_id)
+
+
+def untrack_run(run_id):
+    """
+    Function for removing a run from TRAINING_DICT, JOB_RUNS, RUN_TRACKED_AT
+    and the run store, caller must hold LOCK
+
+    Args:
+        run_id: run id of tracked run
+
+    Returns: trainingjob id of the run or None if it was not tracked
+
+    """
+    trainingjob_id = TRAINING_DICT.pop(run_id, None)
+    RUN_TRACKED_AT.pop(run_id, None)
+    if JOB_RUNS.get(trainingjob_id) == run_id:
+        del JOB_RUNS[trainingjob_id]
+    if RUN_STORE is not None:
+        RUN_STORE.delete(run_id)
+    if ADMISSION is not None and trainingjob_id is not None:
+        ADMISSION.finished()
+    if SUBMISSIONS is not None and trainingjob_id is not None:
+        SUBMISSIONS.forget(run_id)
+    return trainingjob_id
 
 
 class KfConfiguration:
@@ -68,13 +129,74 @@ class KfConfiguration:
         self.tmgr_logger = TMLogger("../config/log_config.yaml")
         self.logger = self.tmgr_logger.logger
 
-        self.run_status_polling_interval_sec = 20
+        self.run_status_polling_interval_sec = float(getenv('RUN_STATUS_POLLING_INTERVAL_SEC', '20'))
+        self.run_status_poll_min_interval_sec = float(getenv('RUN_STATUS_POLL_MIN_INTERVAL_SEC', '2'))
+        self.run_status_poll_backoff = float(getenv('RUN_STATUS_POLL_BACKOFF', '2'))
+        self.run_status_poll_jitter = float(getenv('RUN_STATUS_POLL_JITTER', '0.1'))
+        self.run_status_poll_workers = int(getenv('RUN_STATUS_POLL_WORKERS', '8'))
+        self.run_status_sweep_mode = getenv('RUN_STATUS_SWEEP_MODE', 'drain')
         self.kf_dict['kfhostname'] = getenv('KUBEFLOW_HOST')
         self.kf_dict['kfport'] = getenv('KUBEFLOW_PORT')
         self.kf_dict['kfdefaultns'] = getenv('KF_NAMESPACE')
         self.appport = getenv('KF_ADAPTER_PORT')
         self.trainingmgr_dict['trainingmgr_host'] = getenv('TRAININGMGR_HOST') 
         self.trainingmgr_dict['trainingmgr_port'] = getenv('TRAININGMGR_PORT')
+        self.trainingmgr_dict['pool_size'] = int(getenv('TRAININGMGR_POOL_SIZE', '10'))
+        self.trainingmgr_dict['connect_timeout_sec'] = float(getenv('TRAININGMGR_CONNECT_TIMEOUT_SEC', '3'))
+        self.trainingmgr_dict['read_timeout_sec'] = float(getenv('TRAININGMGR_READ_TIMEOUT_SEC', '10'))
+        self.trainingmgr_dict['notify_retries'] = int(getenv('TRAININGMGR_NOTIFY_RETRIES', '3'))
+        self.trainingmgr_dict['notify_backoff_sec'] = float(getenv('TRAININGMGR_NOTIFY_BACKOFF_SEC', '0.5'))
+        self.trainingmgr_dict['batch_path'] = getenv('TRAININGMGR_BATCH_NOTIFICATION_PATH',
+                                                     '/trainingjob/pipelineNotifications')
+        self.trainingmgr_dict['batch_probe_interval_sec'] = float(getenv('TRAININGMGR_BATCH_PROBE_INTERVAL_SEC', '300'))
+        self.notify_batch_size = int(getenv('NOTIFY_BATCH_SIZE', '0'))
+        self.notify_batch_window_sec = float(getenv('NOTIFY_BATCH_WINDOW_SEC', '0.5'))
+        self.workflow_watch_enabled = getenv('WORKFLOW_WATCH_ENABLED', 'false').lower() == 'true'
+        self.workflow_watch_timeout_sec = float(getenv('WORKFLOW_WATCH_TIMEOUT_SEC', '300'))
+        self.k8s_api_url = getenv('K8S_API_URL')
+        self.k8s_token_path = getenv('K8S_TOKEN_PATH')
+        self.k8s_ca_cert_path = getenv('K8S_CA_CERT_PATH')
+        self.server_threads = int(getenv('SERVER_THREADS', '64'))
+        self.server_keepalive_sec = int(getenv('SERVER_KEEPALIVE_SEC', '5'))
+        self.server_backlog = int(getenv('SERVER_BACKLOG', '2048'))
+        self.server_timeout_sec = int(getenv('SERVER_TIMEOUT_SEC', '120'))
+        self.server_graceful_timeout_sec = int(getenv('SERVER_GRACEFUL_TIMEOUT_SEC', '30'))
+        self.notification_outbox_path = getenv('NOTIFICATION_OUTBOX_PATH', 'notification_outbox.db')
+        self.tracked_run_store_path = getenv('TRACKED_RUN_STORE_PATH', 'tracked_runs.db')
+        self.metadata_cache_size = int(getenv('METADATA_CACHE_SIZE', '256'))
+        self.metadata_cache_ttl_sec = float(getenv('METADATA_CACHE_TTL_SEC', '60'))
+        self.pipeline_version_index_size = int(getenv('PIPELINE_VERSION_INDEX_SIZE', '64'))
+        self.batch_submit_workers = int(getenv('BATCH_SUBMIT_WORKERS', '8'))
+        self.batch_submit_max_jobs = int(getenv('BATCH_SUBMIT_MAX_JOBS', '500'))
+        self.submission_workers = int(getenv('SUBMISSION_WORKERS', '4'))
+        self.submission_queue_size = int(getenv('SUBMISSION_QUEUE_SIZE', '1000'))
+        self.submission_max_tickets = int(getenv('SUBMISSION_MAX_TICKETS', '10000'))
+        self.max_in_flight_runs = int(getenv('MAX_IN_FLIGHT_RUNS', '0'))
+        self.admission_max_queued = int(getenv('ADMISSION_MAX_QUEUED', '1000'))
+        self.admission_queue_timeout_sec = float(getenv('ADMISSION_QUEUE_TIMEOUT_SEC', '60'))
+        self.idempotency_window_sec = float(getenv('IDEMPOTENCY_WINDOW_SEC', '600'))
+        self.idempotency_max_entries = int(getenv('IDEMPOTENCY_MAX_ENTRIES', '10000'))
+        self.run_mirror_sync_interval_sec = float(getenv('RUN_MIRROR_SYNC_INTERVAL_SEC', '0'))
+        self.run_mirror_full_sync_interval_sec = float(getenv('RUN_MIRROR_FULL_SYNC_INTERVAL_SEC', '600'))
+        self.run_mirror_max_staleness_sec = float(getenv('RUN_MIRROR_MAX_STALENESS_SEC', '30'))
+        self.run_state_cache_max_age_sec = float(getenv('RUN_STATE_CACHE_MAX_AGE_SEC', '5'))
+        self.run_state_cache_max_entries = int(getenv('RUN_STATE_CACHE_MAX_ENTRIES', '10000'))
+        self.run_event_buffer_size = int(getenv('RUN_EVENT_BUFFER_SIZE', '10000'))
+        self.run_wait_max_timeout_sec = float(getenv('RUN_WAIT_MAX_TIMEOUT_SEC', '60'))
+        self.event_stream_keepalive_sec = float(getenv('EVENT_STREAM_KEEPALIVE_SEC', '15'))
+        self.long_request_max_concurrent = int(getenv('LONG_REQUEST_MAX_CONCURRENT',
+                                                      str(max(1, self.server_threads // 2))))
+        self.max_subscriptions = int(getenv('MAX_SUBSCRIPTIONS', '100'))
+        self.webhook_workers = int(getenv('WEBHOOK_WORKERS', '8'))
+        self.webhook_max_queued = int(getenv('WEBHOOK_MAX_QUEUED', '1000'))
+        # webhook deliveries share the workers, so a slow subscriber gets short
+        # timeouts and no retries instead of the training manager policy
+        self.webhook_dict = dict(self.trainingmgr_dict)
+        self.webhook_dict['pool_size'] = self.webhook_workers
+        self.webhook_dict['pool_connections'] = self.max_subscriptions
+        self.webhook_dict['connect_timeout_sec'] = float(getenv('WEBHOOK_CONNECT_TIMEOUT_SEC', '1'))
+        self.webhook_dict['read_timeout_sec'] = float(getenv('WEBHOOK_READ_TIMEOUT_SEC', '3'))
+        self.webhook_dict['notify_retries'] = int(getenv('WEBHOOK_RETRIES', '0'))
 
         
     @property
@@ -170,12 +292,38 @@ class KfConfiguration:
         Args:None
 
         Returns:
-            run_status_polling_interval_sec: time in secs before run status will be queried
-                                             again from kubeflow
+            run_status_polling_interval_sec: maximum time in secs before run status will be
+                                             queried again from kubeflow
 
         """
         return self.run_status_polling_interval_sec
 
+    def get_runstspollworkers(self):
+        """
+        Function for giving run_status_poll_workers to caller of the function
+
+        Args:None
+
+        Returns:
+            run_status_poll_workers: maximum number of run status queries sent
+                                     to kubeflow concurrently in one poll sweep
+
+        """
+        return self.run_status_poll_workers
+
+    def get_runstssweepmode(self):
+        """
+        Function for giving run_status_sweep_mode to caller of the function
+
+        Args:None
+
+        Returns:
+            run_status_sweep_mode: 'drain' to notify every finished run found in a poll
+                                   sweep, 'single' to notify only the first one
+
+        """
+        return self.run_status_sweep_mode
+
     def is_config_loaded_properly(self):
         """
         Function for determining whether any of configuration parameters are none i.e not loaded
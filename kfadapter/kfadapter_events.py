@@ -0,0 +1,174 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+"""kfadapter_events.py
+
+This module is for fanning out run state transitions seen by the status
+poller to clients waiting on a run or following the event stream
+
+"""
+
+import time
+from collections import OrderedDict, deque
+from threading import Lock, Condition, Event
+
+from kfadapter.kfadapter_metrics import METRICS
+
+
+class RunEventBus:
+    """
+    This is a class for publishing run state transitions once and handing
+    them to any number of waiters. Waiters on one run block on an event of
+    that run, stream clients read numbered events from a bounded buffer so a
+    reconnecting client can resume after the last event id it has seen.
+
+    Attributes: None
+    """
+
+    def __init__(self, buffer_size=10000, max_runs=10000):
+        """
+        The constructor for RunEventBus class.
+
+        Parameters:
+            buffer_size: number of recent events kept for stream clients
+            max_runs: number of runs whose last state is remembered
+         """
+        self.max_runs = max_runs
+        self.lock = Lock()
+        self.new_event = Condition(self.lock)
+        # recent event dicts, oldest first, each with increasing 'id'
+        self.events = deque(maxlen=buffer_size)
+        self.last_id = 0
+        # run_id -> (run_status, final) of the last published state
+        self.states = OrderedDict()
+        # run_id -> [Event set when the run reaches a final state, number of waiters]
+        self.waiters = {}
+        self.waiting = 0
+        # functions called with every published event, e.g. WebhookDispatcher.dispatch
+        self.listeners = []
+
+    def add_listener(self, listener):
+        """
+        Function for registering a function called with every published event,
+        it is called on the publishing thread and must not block
+
+        Args:
+            listener: function taking an event dict
+
+        Returns: None
+
+        """
+        self.listeners.append(listener)
+
+    def publish(self, run_id, run_status, trainingjob_id=None, final=False):
+        """
+        Function for publishing the state of a run, states equal to the last
+        published one are dropped
+
+        Args:
+            run_id: run id of the run
+            run_status: state of the run
+            trainingjob_id: trainingjob id the run belongs to
+            final: True if the state will not change any more
+
+        Returns: published event dict or None if the state did not change
+
+        """
+        with self.lock:
+            if self.states.get(run_id) == (run_status, final):
+                return None
+            self.states[run_id] = (run_status, final)
+            self.states.move_to_end(run_id)
+            while len(self.states) > self.max_runs:
+                self.states.popitem(last=False)
+            self.last_id += 1
+            event = {'id': self.last_id, 'run_id': run_id, 'run_status': run_status,
+                     'trainingjob_id': trainingjob_id, 'finished': final,
+                     'time': time.time()}
+            self.events.append(event)
+            waiter = self.waiters.pop(run_id, None) if final else None
+            self.new_event.notify_all()
+        if waiter is not None:
+            waiter[0].set()
+        for listener in self.listeners:
+            listener(event)
+        METRICS.inc('run_events_published')
+        return event
+
+    def state(self, run_id):
+        """
+        Function for giving the last published state of a run
+
+        Args:
+            run_id: run id of the run
+
+        Returns: tuple of run status and final flag, or None
+
+        """
+        with self.lock:
+            return self.states.get(run_id)
+
+    def wait(self, run_id, timeout):
+        """
+        Function for waiting until a run reaches a final state
+
+        Args:
+            run_id: run id of the run
+            timeout: maximum seconds to wait
+
+        Returns: tuple of run status and final flag of the last published
+                 state, or None if no state was published for the run
+
+        """
+        with self.lock:
+            state = self.states.get(run_id)
+            if state is not None and state[1]:
+                return state
+            waiter = self.waiters.setdefault(run_id, [Event(), 0])
+            waiter[1] += 1
+            self.waiting += 1
+            METRICS.set_gauge('run_waiters', self.waiting)
+        start = time.monotonic()
+        waiter[0].wait(timeout)
+        METRICS.observe('run_wait_seconds', time.monotonic() - start)
+        with self.lock:
+            waiter[1] -= 1
+            if waiter[1] == 0 and self.waiters.get(run_id) is waiter:
+                del self.waiters[run_id]
+            self.waiting -= 1
+            METRICS.set_gauge('run_waiters', self.waiting)
+            return self.states.get(run_id)
+
+    def events_after(self, last_id, timeout):
+        """
+        Function for giving events newer than last_id, waiting up to timeout
+        seconds for one when there is none
+
+        Args:
+            last_id: id of the last event the caller has seen, 0 for all buffered
+            timeout: maximum seconds to wait
+
+        Returns: list of event dicts, empty on timeout
+
+        """
+        with self.lock:
+            if last_id > self.last_id:
+                # id handed out before a restart, start over from the buffer
+                last_id = 0
+            if self.last_id == last_id:
+                self.new_event.wait(timeout)
+            return [event for event in self.events if event['id'] > last_id]
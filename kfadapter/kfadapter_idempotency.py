@@ -0,0 +1,128 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+"""kfadapter_idempotency.py
+
+This module is for making run submissions idempotent per trainingjob so
+retried requests do not start a second Kubeflow run
+
+"""
+
+from kfadapter import kfadapter_conf
+from kfadapter.kfadapter_cache import TtlLruCache, SingleFlight
+from kfadapter.kfadapter_metrics import METRICS
+
+
+class SubmissionDeduplicator:
+    """
+    This is a class for deduplicating run submissions keyed on trainingjob id
+    and an optional idempotency key. A retry gets the run of the first
+    submission if it was submitted within the window and has not finished
+    since or, without idempotency key, if the trainingjob still has a tracked
+    run. Concurrent duplicates share one Kubeflow submission.
+
+    Attributes: None
+    """
+
+    def __init__(self, window, maxsize=10000):
+        """
+        The constructor for SubmissionDeduplicator class.
+
+        Parameters:
+            window: seconds a submission is remembered for retries
+            maxsize: maximum number of remembered submissions
+         """
+        # (trainingjob_id, idempotency key) -> run dict
+        self.recent = TtlLruCache(maxsize, window, 'idempotency')
+        # run_id -> True for scheduled runs untracked within the window
+        self.finished = TtlLruCache(maxsize, window, 'idempotency_finished')
+        self.flight = SingleFlight('idempotency')
+
+    def forget(self, run_id):
+        """
+        Function for marking a run as finished so submissions which scheduled
+        it are no longer replayed, called by kfadapter_conf.untrack_run
+
+        Args:
+            run_id: run id of the untracked run
+
+        Returns: None
+
+        """
+        self.finished.put(run_id, True)
+
+    def replay(self, trainingjob_id, idempotency_key=None):
+        """
+        Function for giving the run of an earlier submission of a trainingjob
+
+        Args:
+            trainingjob_id: trainingjob id of the submission
+            idempotency_key: idempotency key of the submission, if any
+
+        Returns: run dict of the earlier submission or None
+
+        """
+        key = (trainingjob_id, idempotency_key)
+        run_dict = self.recent.get(key)
+        if run_dict is not None:
+            if run_dict.get('run_status') != "scheduled" or \
+                    not self.finished.get(run_dict['run_id']):
+                return dict(run_dict)
+            # replaying a finished run would report it as scheduled and have it tracked again
+            self.recent.invalidate(key)
+        if idempotency_key is None:
+            with kfadapter_conf.LOCK:
+                run_id = kfadapter_conf.JOB_RUNS.get(trainingjob_id)
+            if run_id is not None:
+                return {'trainingjob_id': trainingjob_id, 'run_id': run_id,
+                        'run_status': "scheduled"}
+        return None
+
+    def submit(self, trainingjob_id, idempotency_key, submit):
+        """
+        Function for submitting a run unless it is a duplicate of an earlier
+        or concurrent submission
+
+        Args:
+            trainingjob_id: trainingjob id of the submission
+            idempotency_key: idempotency key of the submission, if any
+            submit: function without arguments submitting the run and
+                    returning its run dict
+
+        Returns: tuple of run dict and True if it is the run of an earlier submission
+
+        """
+        key = (trainingjob_id, idempotency_key)
+        run_dict = self.replay(trainingjob_id, idempotency_key)
+        if run_dict is None:
+            submitted = []
+
+            def submit_once():
+                # a submission which finished just before this one started
+                earlier = self.replay(trainingjob_id, idempotency_key)
+                if earlier is not None:
+                    return earlier
+                result = submit()
+                self.recent.put(key, result)
+                submitted.append(result)
+                return result
+
+            run_dict = dict(self.flight.do(key, submit_once))
+            if submitted:
+                return run_dict, False
+        METRICS.inc('idempotent_replays')
+        return run_dict, True
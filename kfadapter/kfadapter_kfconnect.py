@@ -20,10 +20,85 @@
 This module is for interfacing and interworking with KubeFlow SDK
 
 """
+import json
+from datetime import datetime, timezone
+
 import kfp
 
 from kfadapter.kfadapter_util import random_suffix
 from kfadapter.kfadapter_conf import KfConfiguration
+from kfadapter.kfadapter_cache import TtlLruCache, SingleFlight
+
+FILTER_OPERATIONS = {'EQUALS': 1, 'NOT_EQUALS': 2, 'GREATER_THAN': 3,
+                     'GREATER_THAN_EQUALS': 5, 'LESS_THAN': 6, 'LESS_THAN_EQUALS': 7,
+                     'IN': 8, 'IS_SUBSTRING': 9}
+
+def build_kf_filter(predicates):
+    """
+    Function for building KubeFlow API filter string from predicates
+
+    Args:
+        predicates: list of (key, operation, value) tuples, operation is a key
+                    of FILTER_OPERATIONS, list values are sent as string values
+                    and datetime values as timestamp values
+
+    Returns: json filter string or None if there are no predicates
+
+    """
+    if not predicates:
+        return None
+    filter_predicates = []
+    for key, operation, value in predicates:
+        predicate = {'operation': FILTER_OPERATIONS[operation], 'key': key}
+        if isinstance(value, (list, tuple, set)):
+            predicate['stringValues'] = {'values': list(value)}
+        elif isinstance(value, datetime):
+            predicate['timestampValue'] = value.astimezone(timezone.utc).strftime(
+                '%Y-%m-%dT%H:%M:%SZ')
+        else:
+            predicate['stringValue'] = value
+        filter_predicates.append(predicate)
+    return json.dumps({'predicates': filter_predicates})
+
+def _listed_before(runs, created_after):
+    """
+    Function for checking whether the last run of a page sorted by created_at
+    desc was created before created_after, later pages hold older runs only
+    """
+    if created_after is None or not runs or runs[-1].created_at is None:
+        return False
+    return runs[-1].created_at < created_after
+
+class PipelineVersionIndex:
+    """
+    This is a class for resolving version names of one pipeline to version ids.
+
+    Attributes:
+        names: version names in listing order, duplicates included
+        ids: version name to version id, the last listed version wins
+    """
+    def __init__(self):
+        """
+        The constructor for PipelineVersionIndex class.
+
+        Parameters:None
+         """
+        self.names = []
+        self.ids = {}
+
+    def add(self, name, version_id):
+        """
+        Function for adding a version to the index
+
+        Args:
+            name: version name
+            version_id: version id
+
+        Returns: None
+
+        """
+        self.names.append(name)
+        self.ids[name] = version_id
 
 class KfConnect:
     """
@@ -40,6 +115,15 @@ class KfConnect:
         self.kfp_client = None
         kfc_config = KfConfiguration.get_instance()
         self.logger = kfc_config.logger
+        # pipeline, pipeline version and experiment lookups
+        self.metadata_cache = TtlLruCache(kfc_config.metadata_cache_size,
+                                          kfc_config.metadata_cache_ttl_sec, 'metadata')
+        # pipeline id -> PipelineVersionIndex
+        self.version_index_cache = TtlLruCache(kfc_config.pipeline_version_index_size,
+                                               kfc_config.metadata_cache_ttl_sec,
+                                               'pipeline_version_index')
+        # identical concurrent cache misses share one kubeflow call
+        self.read_flight = SingleFlight('kfp_read')
         self.logger.debug("Initialized KfConnect")
 
     def set_kf_client(self, kfp_client):
@@ -57,17 +141,34 @@ class KfConnect:
         """
         self.kfp_client = kfp.Client(host)
 
-    def get_kf_list_experiments(self, nspace):
+    def cached_read(self, cache, key, loader):
+        """
+        Function for giving a cached lookup, loading it on a miss with one
+        kubeflow call shared by all concurrent callers of the same key
+
+        Args:
+            cache: TtlLruCache holding the lookup
+            key: cache key of the lookup
+            loader: function without arguments calling kubeflow
+
+        Returns: cached or loaded value
+
+        """
+        return cache.get_or_load(key, lambda: self.read_flight.do((cache.name, key), loader))
+
+    def get_kf_list_experiments(self, nspace, page_size=10, page_token=''):
         """
         Function for getting list of experiments based on namespace
 
         Args:
             nspace: namespace from which experiments can be listed
+            page_size: number of experiments in the page
+            page_token: token of the page, first page if empty
 
         Returns: experiment list
 
         """
-        exp = self.kfp_client.list_experiments(page_size=10)
+        exp = self.kfp_client.list_experiments(page_token=page_token, page_size=page_size)
         return exp
 
     def get_kf_experiment_details(self, ex_name, nspace):
@@ -84,7 +185,9 @@ class KfConnect:
         """
         self.logger.debug("Get Experiment details " + ex_name)
         try:
-            exp = self.kfp_client.get_experiment(experiment_name=ex_name)
+            exp = self.cached_read(
+                self.metadata_cache, ('experiment', ex_name),
+                lambda: self.kfp_client.get_experiment(experiment_name=ex_name))
         except ValueError as err:
             self.logger.error(err)
             return None
@@ -104,31 +207,146 @@ class KfConnect:
         run = self.kfp_client.get_run(run_id)
         return run
 
-    def get_kf_list_runs(self, nspace):
+    def get_kf_runs(self, run_ids, experiment_id=None, states=None, created_after=None,
+                    page_size=100, max_pages=10, fallback_map=map):
         """
-        Function for getting list of runs based on namespace
+        Function for getting many runs with a few paginated list calls, newest
+        runs first. Paging stops once a page reaches runs created before
+        created_after. At most one page is listed per page_size // 10 run ids,
+        so a few run ids are fetched with get_run only. Runs which are not found
+        within the listed pages are fetched one by one with get_run.
+
+        Args:
+            run_ids: run ids to look up
+            experiment_id: only list runs of this experiment
+            states: only list runs in one of these states
+            created_after: only list runs created at or after this datetime, e.g. the
+                           time the oldest of run_ids was submitted
+            page_size: number of runs fetched per list call
+            max_pages: upper bound of list calls
+            fallback_map: map function used for per-run fallback lookups,
+                          e.g. executor.map for concurrent lookups
+
+        Returns: dict of run_id to run, runs which can not be found are left out
+
+        """
+        pending = set(run_ids)
+        runs = {}
+        predicates = []
+        if states:
+            predicates.append(('state', 'IN', states))
+        if created_after is not None:
+            predicates.append(('created_at', 'GREATER_THAN_EQUALS', created_after))
+        run_filter = build_kf_filter(predicates)
+        # a list call only pays off while it replaces several get_run calls
+        pages = min(max_pages, len(pending) // max(1, page_size // 10))
+        page_token = ''
+        try:
+            for _ in range(pages):
+                if not pending:
+                    break
+                res = self.kfp_client.list_runs(page_token=page_token, page_size=page_size,
+                                                sort_by='created_at desc',
+                                                experiment_id=experiment_id,
+                                                filter=run_filter)
+                for run in res.runs or []:
+                    if run.run_id in pending:
+                        runs[run.run_id] = run
+                        pending.discard(run.run_id)
+                page_token = res.next_page_token
+                if not page_token or _listed_before(res.runs, created_after):
+                    break
+        except Exception as err:# pylint: disable=broad-except
+            self.logger.error("List runs failed, falling back to get_run: " + str(err))
+
+        missing = [run_id for run_id in run_ids if run_id not in runs]
+        for run_id, run in zip(missing, fallback_map(self._get_kf_run_or_none, missing)):
+            if run is not None:
+                runs[run_id] = run
+        return runs
+
+    def _get_kf_run_or_none(self, run_id):
+        """
+        Function for getting run based on run_id, None is returned if run can not be fetched
+        """
+        try:
+            return self.get_kf_run(run_id)
+        except Exception as err:# pylint: disable=broad-except
+            self.logger.error("Get run failed for " + run_id + ": " + str(err))
+            return None
+
+    def get_kf_list_runs(self, nspace, page_size=20, page_token='', states=None,
+                         experiment_id=None, pipeline_id=None, created_after=None, sort_by='',
+                         finished_after=None):
+        """
+        Function for getting list of runs based on namespace, filters are
+        applied by kubeflow so pages hold matching runs only
 
         Args:
             nspace: namespace from which runs can be listed
+            page_size: number of runs in the page
+            page_token: token of the page, first page if empty
+            states: only list runs in one of these states
+            experiment_id: only list runs of this experiment
+            pipeline_id: only list runs of this pipeline
+            created_after: only list runs created after this datetime
+            sort_by: field and optional direction to sort by, e.g. 'created_at desc'
+            finished_after: only list runs finished after this datetime
 
         Returns: runs list
 
         """
-        runs = self.kfp_client.list_runs(page_size=20)
+        predicates = []
+        if states:
+            predicates.append(('state', 'IN', states))
+        if pipeline_id:
+            predicates.append(('pipeline_id', 'EQUALS', pipeline_id))
+        if created_after is not None:
+            predicates.append(('created_at', 'GREATER_THAN', created_after))
+        if finished_after is not None:
+            predicates.append(('finished_at', 'GREATER_THAN', finished_after))
+        runs = self.kfp_client.list_runs(page_token=page_token, page_size=page_size,
+                                         sort_by=sort_by, experiment_id=experiment_id,
+                                         filter=build_kf_filter(predicates))
         return runs
 
-    def get_kf_list_pipelines(self):
+    def get_kf_list_pipelines(self, page_size=20, page_token=''):
         """
         Function for getting list of pipelines in kubeflow
 
-        Args: None
+        Args:
+            page_size: number of pipelines in the page
+            page_token: token of the page, first page if empty
 
         Returns: list of pipeline and its description
 
         """
-        pipeline = self.kfp_client.list_pipelines(page_size=20)
+        pipeline = self.kfp_client.list_pipelines(page_token=page_token, page_size=page_size)
         return pipeline
 
+    @staticmethod
+    def iter_kf_pages(list_page, items_attr, page_size=100):
+        """
+        Function for iterating over the items of all pages of a list call,
+        only one page is held in memory at a time
+
+        Args:
+            list_page: function of page_size and page_token giving one page
+            items_attr: attribute of the page holding its items
+            page_size: number of items fetched per list call
+
+        Returns: generator of items
+
+        """
+        page_token = ''
+        while True:
+            page = list_page(page_size=page_size, page_token=page_token)
+            for item in getattr(page, items_attr) or []:
+                yield item
+            page_token = page.next_page_token
+            if not page_token:
+                return
+
     def get_kf_pipeline_id(self, pipeline_name):
         """
         Function for getting pipeline id for a pipeline name in kubeflow
@@ -139,7 +357,9 @@ class KfConnect:
         Returns:pipeline id in a string
 
         """
-        pipe_id = self.kfp_client.get_pipeline_id(pipeline_name)
+        pipe_id = self.cached_read(
+            self.metadata_cache, ('pipeline_id', pipeline_name),
+            lambda: self.kfp_client.get_pipeline_id(pipeline_name))
         return pipe_id
 
     def get_kf_pipeline_version_id(self, pipeline_id, pipeline_version_name):
@@ -154,15 +374,42 @@ class KfConnect:
         Returns:pipeline's version id in a string
 
         """
-        version_id = None
-
-        obj_list = self.kfp_client.list_pipeline_versions(pipeline_id,
-                                                          page_size=1000000000).pipeline_versions
-        for pipeline_version_obj in obj_list:
-            if pipeline_version_obj.display_name == pipeline_version_name:
-                version_id = pipeline_version_obj.pipeline_version_id
+        index = self.get_pipeline_version_index(pipeline_id)
+        version_id = index.ids.get(pipeline_version_name)
+        if version_id is None:
+            # version may have been uploaded by someone else since index was built
+            self.version_index_cache.invalidate(pipeline_id)
+            index = self.get_pipeline_version_index(pipeline_id)
+            version_id = index.ids.get(pipeline_version_name)
         return version_id
 
+    def get_pipeline_version_index(self, pipeline_id, page_size=100):
+        """
+        Function for getting name to id index of all versions of a pipeline,
+        built with paginated list calls and cached per pipeline
+
+        Args:
+            pipeline_id: id of pipeline
+            page_size: number of versions fetched per list call
+
+        Returns: PipelineVersionIndex
+
+        """
+        def load_index():
+            index = PipelineVersionIndex()
+            page_token = ''
+            while True:
+                res_obj = self.kfp_client.list_pipeline_versions(pipeline_id,
+                                                                 page_token=page_token,
+                                                                 page_size=page_size)
+                for obj in res_obj.pipeline_versions or []:
+                    index.add(obj.display_name, obj.pipeline_version_id)
+                page_token = res_obj.next_page_token
+                if not page_token:
+                    return index
+
+        return self.cached_read(self.version_index_cache, pipeline_id, load_index)
+
     def upload_kf_pipeline(self, pipeline_name, file, desc):
         """
         Function for uploading pipeline in kubeflow
@@ -175,6 +422,7 @@ class KfConnect:
 
         """
         pipe_info = self.kfp_client.upload_pipeline(file, pipeline_name, desc)
+        self.invalidate_pipeline_cache(pipeline_name=pipeline_name)
         return pipe_info
 
     def upload_pipeline_with_versions(self, pipeline_name, file, desc):
@@ -189,24 +437,33 @@ class KfConnect:
         Returns:object containing pipleine id and other information
 
         """
-        versions_list = self.get_pl_versions_by_pl_name(pipeline_name)
+        # next version name is counted from the versions, a cached index may miss
+        # versions uploaded since and give a name which is already taken
+        versions_list = self.get_pl_versions_by_pl_name(pipeline_name, refresh=True)
         length = len(versions_list)
         pipe_info = None
         if length == 0:
             pipe_info = self.kfp_client.upload_pipeline(file, pipeline_name=pipeline_name,
                                                         description=desc)
+            self.invalidate_pipeline_cache(pipeline_name=pipeline_name)
         else:
             pipe_info = self.kfp_client.upload_pipeline_version(file,
                                                                 pipeline_version_name=str(length+1),
                                                                 pipeline_name=pipeline_name)
+            if pipe_info is not None:
+                self.metadata_cache.invalidate(('pipeline', pipe_info.pipeline_id))
+                index = self.version_index_cache.get(pipe_info.pipeline_id)
+                if index is not None:
+                    index.add(pipe_info.display_name, pipe_info.pipeline_version_id)
         return pipe_info
 
-    def get_pl_versions_by_pl_name(self, pipeline_name):
+    def get_pl_versions_by_pl_name(self, pipeline_name, refresh=False):
         """
         Function for getting versions list for given pipeline name
 
         Args:
             pipeline_name: name of pipeline
+            refresh: reload the version index instead of using a cached one
 
         Returns:list containing versions name
 
@@ -214,15 +471,9 @@ class KfConnect:
         pipeline_id = self.get_kf_pipeline_id(pipeline_name)
         if pipeline_id == None:
             return []
-        res_obj = self.kfp_client.list_pipeline_versions(pipeline_id,
-                                                         page_size=1000000000)
-        if res_obj.total_size is None:
-            return []
-        obj_list = res_obj.pipeline_versions
-        versions_list = []
-        for obj in obj_list:
-            versions_list.append(obj.display_name)
-        return versions_list
+        if refresh:
+            self.version_index_cache.invalidate(pipeline_id)
+        return list(self.get_pipeline_version_index(pipeline_id).names)
 
     def get_kf_pipeline_desc(self, pipeline_id):
         """
@@ -234,7 +485,9 @@ class KfConnect:
         Returns:pipeline description
 
         """
-        pipeline = self.kfp_client.get_pipeline(pipeline_id)
+        pipeline = self.cached_read(
+            self.metadata_cache, ('pipeline', pipeline_id),
+            lambda: self.kfp_client.get_pipeline(pipeline_id))
         return pipeline
 
     def delete_kf_pipeline(self, pipeline_id):
@@ -248,8 +501,34 @@ class KfConnect:
 
         """
         pipeline = self.kfp_client.delete_pipeline(pipeline_id)
+        self.invalidate_pipeline_cache(pipeline_id=pipeline_id)
         return pipeline
 
+    def invalidate_pipeline_cache(self, pipeline_id=None, pipeline_name=None):
+        """
+        Function for dropping cached lookups of a pipeline after it was changed
+
+        Args:
+            pipeline_id: id of pipeline
+            pipeline_name: name of pipeline
+
+        Returns: None
+
+        """
+        pipeline_ids = {pipeline_id}
+
+        def name_or_id(key, value):
+            if key[0] == 'pipeline_id' and (key[1] == pipeline_name or value == pipeline_id):
+                pipeline_ids.add(value)
+                return True
+            return False
+
+        self.metadata_cache.invalidate_where(name_or_id)
+        self.metadata_cache.invalidate_where(
+            lambda key, value: key[0] == 'pipeline' and key[1] in pipeline_ids)
+        for index_pipeline_id in pipeline_ids:
+            self.version_index_cache.invalidate(index_pipeline_id)
+
     def run_kf_pipeline(self, exp_id, pipeline_id, arguments, version_id):
         """
         Function for running pipeline with arguments under an experiment in kubeflow
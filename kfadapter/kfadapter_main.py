@@ -27,22 +27,64 @@ HTTP POST - for execution of pipeline
 """
 
 import os
+import time
+import queue
 import traceback
 import json
-from threading import Thread
+from datetime import datetime, timezone
+from functools import partial
+from threading import Thread, Lock, BoundedSemaphore
+from concurrent.futures import ThreadPoolExecutor
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_api import status
 import kfp_server_api
 
 from kfadapter import kfadapter_conf
+from kfadapter.kfadapter_admission import AdmissionController, AdmissionRejected
+from kfadapter.kfadapter_cache import RunStateCache
+from kfadapter.kfadapter_events import RunEventBus
+from kfadapter.kfadapter_idempotency import SubmissionDeduplicator
 from kfadapter.kfadapter_kfconnect import KfConnect
-from kfadapter.kfadapter_util import BadRequest, wait_status_thread, keys_match, check_map
+from kfadapter.kfadapter_metrics import METRICS
+from kfadapter.kfadapter_mirror import RunMirror, PAGE_TOKEN_PREFIX
+from kfadapter.kfadapter_notifier import TrainingMgrNotifier
+from kfadapter.kfadapter_outbox import NotificationOutbox
+from kfadapter.kfadapter_poller import RunStatusPoller, MANUAL_RECONCILE
+from kfadapter.kfadapter_runstore import TrackedRunStore, recover_tracked_runs
+from kfadapter.kfadapter_submission import SubmissionQueue, TICKET_QUEUED
+from kfadapter.kfadapter_watcher import WorkflowWatcher, make_api_client
+from kfadapter.kfadapter_webhooks import WebhookDispatcher
+from kfadapter.kfadapter_util import BadRequest, keys_match, check_map, timed_stage, \
+    format_server_timing, run_finished
 
 #Handles to Config and Kubeflow
 KFCONNECT_CONFIG_OBJ = None
 KFCONNECT_KF_OBJ = None
 LOGGER = None
+OUTBOX = None
+RUN_STORE = None
+SUBMISSION_QUEUE = None
+SUBMISSION_DEDUP = None
+RUN_MIRROR = None
+WEBHOOKS = None
+POLLER = None
+WATCHER = None
+# set once start_services has started the background services of this process
+SERVICES_STARTED = False
+SERVICES_LOCK = Lock()
+# upper bound of page_size query parameter of list endpoints
+MAX_PAGE_SIZE = 1000
+RUN_STATES = {'PENDING', 'RUNNING', 'SUCCEEDED', 'SKIPPED', 'FAILED', 'CANCELING', 'CANCELED',
+              'PAUSED', 'RUNTIME_STATE_UNSPECIFIED'}
+RUN_SORT_FIELDS = {'created_at', 'finished_at', 'scheduled_at', 'display_name'}
+# pool for concurrent kubeflow lookups done while serving a request
+SUBMIT_EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix="run-submit")
+# pool bounding kubeflow calls of batch submissions, sized from configuration in main
+BATCH_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="run-batch")
+# slots of requests holding a server thread until they are answered, /events streams
+# and /runs/<run_id>/wait, sized from configuration in main below the server threads
+LONG_REQUEST_SLOTS = BoundedSemaphore(32)
 
 
 APP = Flask(__name__)
@@ -255,16 +297,124 @@ def kf_liveness():
     """
     return "Okay", status.HTTP_200_OK
 
+@APP.route("/metrics")
+def kf_metrics():
+    """Function handling rest endpoint to get in-process metrics of kfadapter
+
+    Args:none
+
+    Returns:
+        json dict:
+                   denoting counters, gauges and timing summaries
+
+        status: HTTP status 200
+
+    """
+    return jsonify(METRICS.snapshot()), status.HTTP_200_OK
+
+def page_args(default_page_size):
+    """Function reading page_size and page_token query parameters
+
+    Args:
+        default_page_size (int): page size used when page_size is not given
+
+    Returns:
+        tuple: page size and page token
+
+    Exceptions:
+        BadRequest with HTTP status 400 if page_size is not a number in 1..MAX_PAGE_SIZE
+
+    """
+    try:
+        page_size = int(request.args.get('page_size', default_page_size))
+    except ValueError:
+        page_size = 0
+    if not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise BadRequest('page_size must be a number from 1 to ' + str(MAX_PAGE_SIZE),
+                         status.HTTP_400_BAD_REQUEST, {'ext': 1})
+    return page_size, request.args.get('page_token', '')
+
+def wants_all_pages():
+    """Function checking whether query parameter all=true asks for all pages
+
+    Args: None
+
+    Returns:
+        bool: True if all pages should be streamed
+
+    """
+    return request.args.get('all', '').lower() == 'true'
+
+def next_page_header(next_page_token):
+    """Function giving the header carrying the token of the next page
+
+    Args:
+        next_page_token (str): token of next page, empty on last page
+
+    Returns:
+        dict: response headers
+
+    """
+    return {'X-Next-Page-Token': next_page_token} if next_page_token else {}
+
+def stream_ndjson(items, to_dict, headers=None):
+    """Function streaming items as newline delimited json, one line per item,
+       items are consumed lazily so memory does not grow with their number
+
+    Args:
+        items: iterable of items, typically from KfConnect.iter_kf_pages
+        to_dict: function giving the json dict of an item
+        headers (dict): additional response headers
+
+    Returns:
+        streamed flask response, ending with an error line if kubeflow failed
+
+    """
+    def generate():
+        try:
+            for item in items:
+                yield json.dumps(to_dict(item), default=str) + '\n'
+        except:# pylint: disable=bare-except
+            tbk = traceback.format_exc()
+            LOGGER.error(tbk)
+            yield json.dumps({'status': status.HTTP_500_INTERNAL_SERVER_ERROR,
+                              'message': 'Unsupported error from Kubeflow'}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers=headers)
+
+def pipeline_summary(pipeline):
+    """Function giving the description of a pipeline returned by /pipelines
+
+    Args:
+        pipeline: kubeflow pipeline
+
+    Returns:
+        json dict: pipeline description
+
+    """
+    pipe_super_dict = {}
+    pipe_super_dict['pipeline_id'] = pipeline.pipeline_id
+    pipe_super_dict['display_name'] = pipeline.display_name
+    pipe_super_dict['description'] = pipeline.description
+    pipe_super_dict['created_at'] = pipeline.created_at
+    return pipe_super_dict
+
 @APP.route("/experiments")
 def list_experiments():
     """Function handling rest endpoint to get all experiments
        from kubeflow
 
-    Args:none
+    Args:
+        page_size (int): query parameter, number of experiments in the page
+        page_token (str): query parameter, token of the page to get
+        all (bool): query parameter, true streams all pages as NDJSON lines
+                    of experiment name and id
 
     Returns:
         json dict:
-                   denoting experiment id  for each experiment name
+                   denoting experiment id  for each experiment name,
+                   token of next page in X-Next-Page-Token header
 
         status: HTTP status 200 or 400
 
@@ -273,9 +423,17 @@ def list_experiments():
 
     """
 
+    page_size, page_token = page_args(10)
+    if wants_all_pages():
+        experiments = KFCONNECT_KF_OBJ.iter_kf_pages(
+            partial(KFCONNECT_KF_OBJ.get_kf_list_experiments,
+                    KFCONNECT_CONFIG_OBJ.kf_dict['kfdefaultns']), 'experiments', page_size)
+        return stream_ndjson(experiments,
+                             lambda exp: {'name': exp.display_name, 'id': exp.experiment_id})
     exp_dict = {}
     try:
-        exp = KFCONNECT_KF_OBJ.get_kf_list_experiments(KFCONNECT_CONFIG_OBJ.kf_dict['kfdefaultns'])
+        exp = KFCONNECT_KF_OBJ.get_kf_list_experiments(KFCONNECT_CONFIG_OBJ.kf_dict['kfdefaultns'],
+                                                       page_size, page_token)
         for experiment in exp.experiments:
             exp_dict[experiment.display_name] = experiment.experiment_id
     except:# pylint: disable=bare-except
@@ -284,14 +442,18 @@ def list_experiments():
         raise BadRequest('Unsupported error from Kubeflow',\
                 status.HTTP_500_INTERNAL_SERVER_ERROR, {'ext': 1}) from None
 
-    return jsonify(exp_dict), status.HTTP_200_OK
+    return jsonify(exp_dict), status.HTTP_200_OK, next_page_header(exp.next_page_token)
 
 @APP.route("/pipelines")
 def list_pipelines():
     """Function handling rest endpoint to get all pipelines
        from kubeflow
 
-    Args:none
+    Args:
+        page_size (int): query parameter, number of pipelines in the page
+        page_token (str): query parameter, token of the page to get
+        all (bool): query parameter, true streams all pages as NDJSON lines
+                    of pipeline description
 
     Returns:
         json dict:
@@ -303,20 +465,20 @@ def list_pipelines():
         error payload describing status, message and HTTP status code
 
     """
+    page_size, page_token = page_args(20)
+    if wants_all_pages():
+        pipelines = KFCONNECT_KF_OBJ.iter_kf_pages(KFCONNECT_KF_OBJ.get_kf_list_pipelines,
+                                                   'pipelines', page_size)
+        return stream_ndjson(pipelines, pipeline_summary)
     pipe_dict = {}
     try:
-        pipeline_list = KFCONNECT_KF_OBJ.get_kf_list_pipelines()
+        pipeline_list = KFCONNECT_KF_OBJ.get_kf_list_pipelines(page_size, page_token)
         pipe_dict['next_page_token'] = pipeline_list.next_page_token
         pipe_dict['total_size'] = pipeline_list.total_size
 
         pipelines = []
         for pipeline in pipeline_list.pipelines:
-            pipe_super_dict = {}
-            pipe_super_dict['pipeline_id'] = pipeline.pipeline_id
-            pipe_super_dict['display_name'] = pipeline.display_name
-            pipe_super_dict['description'] = pipeline.description
-            pipe_super_dict['created_at'] = pipeline.created_at
-            pipelines.append(pipe_super_dict)
+            pipelines.append(pipeline_summary(pipeline))
         pipe_dict['pipelines'] = pipelines
 
     except:# pylint: disable=bare-except
@@ -328,6 +490,254 @@ def list_pipelines():
     return jsonify(pipe_dict), status.HTTP_200_OK
 
 
+def resolve_pipeline_version(timings, pipe_name, pipeline_version_name, pipe_id=None,
+                             version_id=None):
+    """Function resolving pipeline id and pipeline version id from their names,
+       ids which are already known are not looked up again
+
+    Args:
+        timings (dict): stage timings to record the lookups in
+        pipe_name (str): Pipeline name
+        pipeline_version_name (str): Pipeline version name
+        pipe_id (str): Pipeline id, looked up by pipe_name if not given
+        version_id (str): Pipeline version id, looked up by pipeline_version_name if not given
+
+    Returns:
+        tuple: pipeline id and version id, (None, None) if pipeline does not exist
+
+    """
+    if pipe_id is None:
+        pipe_id = timed_stage(timings, 'pipeline', KFCONNECT_KF_OBJ.get_kf_pipeline_id, pipe_name)
+        if pipe_id is None:
+            return None, None
+    if version_id is None:
+        version_id = timed_stage(timings, 'pipeline_version',
+                                 KFCONNECT_KF_OBJ.get_kf_pipeline_version_id, pipe_id,
+                                 pipeline_version_name)
+    return pipe_id, version_id
+
+def has_run_arguments(req):
+    """Function checking that an execution request has arguments and either the
+       id or the name of experiment, pipeline and pipeline version, a null id
+       counts as not given
+
+    Args:
+        req (dict): execution request body
+
+    Returns:
+        bool: True if the request is complete
+
+    """
+    return ("arguments" in req and
+            (req.get("experiment_id") is not None or "experiment_name" in req) and
+            (req.get("pipeline_id") is not None or "pipeline_name" in req) and
+            (req.get("pipeline_version_id") is not None or "pipeline_version" in req))
+
+def run_priority(req):
+    """Function reading the optional admission priority of an execution request
+
+    Args:
+        req (dict): execution request body
+
+    Returns:
+        int: priority, 0 if not given
+
+    Exceptions:
+        BadRequest with HTTP status 400 if priority is not an integer
+
+    """
+    priority = req.get("priority", 0)
+    try:
+        if isinstance(priority, (bool, float)):
+            raise ValueError(priority)
+        return int(priority)
+    except (TypeError, ValueError):
+        raise BadRequest('priority must be an integer', status.HTTP_400_BAD_REQUEST,
+                         {'ext': 1}) from None
+
+def resolve_run_ids(timings, req):
+    """Function resolving experiment, pipeline and pipeline version ids of an
+       execution request. Ids given in the request are used as they are, only
+       missing ones are looked up by name and the lookups run concurrently.
+
+    Args:
+        timings (dict): stage timings to record the lookups in
+        req (dict): execution request body
+
+    Returns:
+        tuple: experiment id, pipeline id and pipeline version id
+
+    Exceptions:
+        ValueError: experiment or pipeline name does not exist in Kubeflow
+
+    """
+    exp_id = req.get("experiment_id")
+    pipe_id = req.get("pipeline_id")
+    version_id = req.get("pipeline_version_id")
+
+    # experiment lookup does not depend on pipeline lookups, resolve them concurrently
+    exp_future = None
+    if exp_id is None:
+        exp_future = SUBMIT_EXECUTOR.submit(timed_stage, timings, 'experiment',
+                                            KFCONNECT_KF_OBJ.get_kf_experiment_details,
+                                            req["experiment_name"],
+                                            KFCONNECT_CONFIG_OBJ.kf_dict['kfdefaultns'])
+    pipe_future = None
+    if pipe_id is None or version_id is None:
+        pipe_future = SUBMIT_EXECUTOR.submit(resolve_pipeline_version, timings,
+                                             req.get("pipeline_name"),
+                                             req.get("pipeline_version"), pipe_id, version_id)
+    if exp_future is not None:
+        exp = exp_future.result()
+        if exp is None:
+            raise ValueError("Experiment name is not correct " + req["experiment_name"])
+        LOGGER.debug(exp)
+        exp_id = exp.experiment_id
+
+    if pipe_future is not None:
+        pipe_id, version_id = pipe_future.result()
+        if pipe_id is None:
+            raise ValueError("Pipeline name is not correct " + req["pipeline_name"])
+    return exp_id, pipe_id, version_id
+
+def submit_run(timings, trainingjob_id, req, exp_id, pipe_id, version_id):
+    """Function submitting a pipeline run for a trainingjob with resolved ids,
+       the run is not tracked here so callers can track several runs at once
+
+    Args:
+        timings (dict): stage timings to record the submission in
+        trainingjob_id (str): Unique trainingjob id
+        req (dict): execution request body
+        exp_id (str): Experiment id
+        pipe_id (str): Pipeline id
+        version_id (str): Pipeline version id
+
+    Returns:
+        json dict: denoting run for pipeline, run_status is scheduled if the run
+                   has to be tracked
+
+    Exceptions:
+        AdmissionRejected: too many runs in flight
+
+    """
+    LOGGER.debug("Pipeline ID = " + pipe_id)
+    LOGGER.debug("version id is: "+ version_id)
+    admission = kfadapter_conf.ADMISSION
+    if admission is not None:
+        timed_stage(timings, 'admission', admission.acquire, run_priority(req))
+    LOGGER.debug("Running pipeline")
+
+    try:
+        run = timed_stage(timings, 'submit', KFCONNECT_KF_OBJ.run_kf_pipeline,
+                          exp_id, pipe_id, req["arguments"], version_id)
+
+        LOGGER.debug("Run ID = %s", run.run_id)
+        run_dict = {}
+        run_dict['trainingjob_id'] = trainingjob_id
+        run_dict['run_id'] = run.run_id
+        run_dict['run_name'] = run.display_name
+        run_dict['experiment_name'] = 'Default'
+        run_dict['experiment_id'] = exp_id
+
+        run_dict['pipeline_name'] = req.get("pipeline_name")
+        run_dict['pipeline_id'] = pipe_id
+        run_dict['pipeline_version_id'] = version_id
+        pending = run.state == 'PENDING'
+    except:# pylint: disable=bare-except
+        if admission is not None:
+            admission.cancel()
+        raise
+    if pending:
+        # the admission slot is handed over when the caller tracks the run
+        run_dict['run_status'] = "scheduled"
+    elif admission is not None:
+        admission.cancel()
+    return run_dict
+
+def execute_run(timings, trainingjob_id, req):
+    """Function resolving ids, submitting and tracking the pipeline run of
+       an execution request
+
+    Args:
+        timings (dict): stage timings to record the kubeflow calls in
+        trainingjob_id (str): Unique trainingjob id
+        req (dict): execution request body
+
+    Returns:
+        json dict: denoting run for pipeline
+
+    Exceptions:
+        ValueError: experiment or pipeline name does not exist in Kubeflow
+
+    """
+    exp_id, pipe_id, version_id = resolve_run_ids(timings, req)
+    run_dict = submit_run(timings, trainingjob_id, req, exp_id, pipe_id, version_id)
+    if run_dict.get('run_status') == "scheduled":
+        with kfadapter_conf.LOCK:
+            kfadapter_conf.track_run(run_dict['run_id'], trainingjob_id)
+    return run_dict
+
+def execute_run_once(timings, trainingjob_id, req, idempotency_key=None):
+    """Function executing an execution request unless it repeats an earlier or
+       concurrent request of the same trainingjob and idempotency key
+
+    Args:
+        timings (dict): stage timings to record the kubeflow calls in
+        trainingjob_id (str): Unique trainingjob id
+        req (dict): execution request body
+        idempotency_key (str): idempotency key of the request, if any
+
+    Returns:
+        tuple: run dict and True if it is the run of an earlier request
+
+    """
+    if SUBMISSION_DEDUP is None:
+        return execute_run(timings, trainingjob_id, req), False
+    return SUBMISSION_DEDUP.submit(trainingjob_id, idempotency_key,
+                                   lambda: execute_run(timings, trainingjob_id, req))
+
+def is_async_request():
+    """Function checking whether the caller asked for asynchronous execution,
+       either with query parameter async=true or with header Prefer: respond-async
+
+    Args: None
+
+    Returns:
+        bool: True if the request should be queued
+
+    """
+    return (request.args.get('async', '').lower() == 'true' or
+            'respond-async' in request.headers.get('Prefer', ''))
+
+def queue_run(trainingjob_id, req, idempotency_key=None):
+    """Function queueing an execution request for the submission workers
+
+    Args:
+        trainingjob_id (str): Unique trainingjob id
+        req (dict): execution request body
+        idempotency_key (str): idempotency key of the request, if any
+
+    Returns:
+        json dict: ticket of the queued submission
+        status: HTTP status 202
+
+    Exceptions:
+        BadRequest with HTTP status 503 if asynchronous submission is disabled
+        or the queue is full
+
+    """
+    if SUBMISSION_QUEUE is None:
+        raise BadRequest('Asynchronous submission is not enabled',
+                         status.HTTP_503_SERVICE_UNAVAILABLE, {'ext': 1})
+    try:
+        ticket = SUBMISSION_QUEUE.submit(trainingjob_id, req, idempotency_key)
+    except queue.Full:
+        raise BadRequest('Submission queue is full', status.HTTP_503_SERVICE_UNAVAILABLE,
+                         {'ext': 1}) from None
+    return jsonify({'ticket': ticket, 'trainingjob_id': trainingjob_id,
+                    'status': TICKET_QUEUED}), status.HTTP_202_ACCEPTED, \
+        {'Location': '/submissions/' + ticket}
+
 @APP.route('/trainingjobs/<trainingjob_id>/execution', methods=['POST'])
 def run_pipeline(trainingjob_id):
     """Function handling HTTP POST rest endpoint to execute pipeline based on trainingjob name
@@ -337,13 +747,19 @@ def run_pipeline(trainingjob_id):
         json_request_args(dict):
                             arguments(dict) - Arguments required for pipeline to run
                             pipeline_name(str) - name of Pipeline registered in KubeFlow
+                            pipeline_version(str) - name of Pipeline version
                             experiment_name(str) - Experiment under which the pipeline
                                                    run will happen
+                            experiment_id(str), pipeline_id(str),
+                            pipeline_version_id(str) - optional ids used instead of
+                                                       looking up the names
+                            priority(int) - optional, higher priorities are admitted
+                                            first when too many runs are in flight
 
 
     Returns:
-        json dict: denoting run for pipeline
-        status: HTTP status 200 or 400
+        json dict: denoting run for pipeline, including the resolved ids
+        status: HTTP status 200, 202 if queued, 400 or 503 if not admitted
 
     Exceptions:
         error payload describing status, message and HTTP status code
@@ -353,61 +769,38 @@ def run_pipeline(trainingjob_id):
     err_string = None
     LOGGER.debug("run_pipeline for %s", trainingjob_id)
     run_dict = {}
+    replayed = False
+    timings = {}
+    start = time.monotonic()
     try:
         errcode = status.HTTP_400_BAD_REQUEST
         err_string = "Internal Error"
         req = request.json
         LOGGER.debug(req)
-        if("arguments" in req.keys() and "pipeline_name" in req.keys() and \
-                "experiment_name" in req.keys() and "pipeline_version" in req.keys()):
-            arguments = req["arguments"]
-            pipe_name = req["pipeline_name"]
-            exp_name = req["experiment_name"]
-            pipeline_version_name = req["pipeline_version"]
-
+        if has_run_arguments(req):
+            run_priority(req)
             errcode = status.HTTP_500_INTERNAL_SERVER_ERROR
             err_string = "Unsupported error from Kubeflow"
-            exp = KFCONNECT_KF_OBJ.get_kf_experiment_details(exp_name,\
-                    KFCONNECT_CONFIG_OBJ.kf_dict['kfdefaultns'])
-            if exp is None:
-                raise ValueError("Experiment name is not correct " +exp_name)
-
-            LOGGER.debug(exp)
-            pipe_id = KFCONNECT_KF_OBJ.get_kf_pipeline_id(pipe_name)
-            if pipe_id is None:
-                raise ValueError("Pipeline name is not correct " +pipe_name)
-
-            LOGGER.debug("Pipeline ID = " + pipe_id)
-
-            version_id = KFCONNECT_KF_OBJ.get_kf_pipeline_version_id(pipe_id, pipeline_version_name)
-
-            LOGGER.debug("version id is: "+ version_id)
-            LOGGER.debug("Running pipeline")
-
-            run = KFCONNECT_KF_OBJ.run_kf_pipeline(exp.experiment_id, pipe_id, arguments, version_id)
-
-            LOGGER.debug("Run ID = %s", run.run_id)
-            run_dict['trainingjob_id'] = trainingjob_id
-            run_dict['run_id'] = run.run_id
-            run_dict['run_name'] = run.display_name
-            run_dict['experiment_name'] = 'Default'
-            run_dict['experiment_id'] = run.experiment_id
-
-            run_dict['pipeline_name'] = pipe_name
-            run_dict['pipeline_id'] = run.pipeline_version_reference.pipeline_id
-            if run.state == 'PENDING':
-                run_dict['run_status'] = "scheduled"
-                with kfadapter_conf.LOCK:
-                    kfadapter_conf.TRAINING_DICT[run.run_id] = trainingjob_id
+            idempotency_key = request.headers.get('Idempotency-Key')
+            if is_async_request():
+                return queue_run(trainingjob_id, req, idempotency_key)
+            run_dict, replayed = execute_run_once(timings, trainingjob_id, req, idempotency_key)
         else:
             errcode = status.HTTP_400_BAD_REQUEST
             err_string = 'Less arguments'
-            raise BadRequest('Less arguments', errcode, {'ext':1})
+            raise BadRequest('Less arguments', errcode, {'payload': req})
+    except AdmissionRejected as err:
+        LOGGER.error(err)
+        raise BadRequest(str(err), status.HTTP_503_SERVICE_UNAVAILABLE, {'ext': 1}) from None
+
     except ValueError as err:
         LOGGER.error(err)
         payload = {'payload': request.json}
         raise BadRequest(err_string, errcode, payload) from None
 
+    except BadRequest:
+        raise
+
     except:# pylint: disable=bare-except
         tbk = traceback.format_exc()
         if err_string == 'Internal Error':
@@ -418,18 +811,304 @@ def run_pipeline(trainingjob_id):
 
         raise BadRequest(err_string, errcode, payload) from None
 
-    return jsonify(run_dict), status.HTTP_200_OK
+    timings['total'] = time.monotonic() - start
+    METRICS.observe('run_submit_total_seconds', timings['total'])
+    headers = {'Server-Timing': format_server_timing(timings)}
+    if replayed:
+        headers['Idempotent-Replayed'] = 'true'
+    return jsonify(run_dict), status.HTTP_200_OK, headers
+
+def lookup_batch_ids(jobs):
+    """Function starting the experiment and pipeline lookups of a batch, each
+       distinct name is looked up only once however many jobs share it
+
+    Args:
+        jobs (list): execution request bodies
+
+    Returns:
+        tuple: dicts of experiment name to future of experiment and of
+               pipeline lookup key to future of (pipeline id, version id)
+
+    """
+    exp_futures = {}
+    pipe_futures = {}
+    for job in jobs:
+        if job.get("experiment_id") is None and job["experiment_name"] not in exp_futures:
+            exp_futures[job["experiment_name"]] = BATCH_EXECUTOR.submit(
+                KFCONNECT_KF_OBJ.get_kf_experiment_details, job["experiment_name"],
+                KFCONNECT_CONFIG_OBJ.kf_dict['kfdefaultns'])
+        if job.get("pipeline_id") is None or job.get("pipeline_version_id") is None:
+            key = pipeline_lookup_key(job)
+            if key not in pipe_futures:
+                pipe_futures[key] = BATCH_EXECUTOR.submit(resolve_pipeline_version, {}, *key)
+    return exp_futures, pipe_futures
+
+def pipeline_lookup_key(job):
+    """Function giving the arguments of resolve_pipeline_version for a job
+
+    Args:
+        job (dict): execution request body
+
+    Returns:
+        tuple: pipeline name, version name, pipeline id and version id
+
+    """
+    return (job.get("pipeline_name"), job.get("pipeline_version"), job.get("pipeline_id"),
+            job.get("pipeline_version_id"))
+
+def submit_batch_job(job, exp_futures, pipe_futures):
+    """Function submitting one job of a batch once its lookups are done
+
+    Args:
+        job (dict): execution request body with trainingjob_id
+        exp_futures (dict): experiment lookups of the batch
+        pipe_futures (dict): pipeline lookups of the batch
+
+    Returns:
+        json dict: denoting run for pipeline with replayed set if it is the run
+                   of an earlier request, or the error for a failed job
+
+    """
+    trainingjob_id = job["trainingjob_id"]
+    try:
+        exp_id = job.get("experiment_id")
+        if exp_id is None:
+            exp = exp_futures[job["experiment_name"]].result()
+            if exp is None:
+                raise ValueError("Experiment name is not correct " + job["experiment_name"])
+            exp_id = exp.experiment_id
+        pipe_id = job.get("pipeline_id")
+        version_id = job.get("pipeline_version_id")
+        if pipe_id is None or version_id is None:
+            pipe_id, version_id = pipe_futures[pipeline_lookup_key(job)].result()
+            if pipe_id is None:
+                raise ValueError("Pipeline name is not correct " + job["pipeline_name"])
+        replayed = False
+        if SUBMISSION_DEDUP is None:
+            run_dict = submit_run({}, trainingjob_id, job, exp_id, pipe_id, version_id)
+        else:
+            run_dict, replayed = SUBMISSION_DEDUP.submit(
+                trainingjob_id, None,
+                lambda: submit_run({}, trainingjob_id, job, exp_id, pipe_id, version_id))
+        run_dict['status'] = "submitted"
+        if replayed:
+            run_dict['replayed'] = True
+        return run_dict
+    except ValueError as err:
+        LOGGER.error(err)
+        return {'trainingjob_id': trainingjob_id, 'status': "failed", 'message': str(err)}
+    except:# pylint: disable=bare-except
+        tbk = traceback.format_exc()
+        LOGGER.error(tbk)
+        return {'trainingjob_id': trainingjob_id, 'status': "failed",
+                'message': "Unsupported error from Kubeflow"}
+
+@APP.route('/trainingjobs/execution:batch', methods=['POST'])
+def run_pipelines_batch():
+    """Function handling HTTP POST rest endpoint to execute pipelines of many
+       trainingjobs in one request
+
+    Args:
+        json_request_args(dict):
+                            jobs(list) - execution request bodies as taken by
+                                         /trainingjobs/<trainingjob_id>/execution,
+                                         each with its trainingjob_id
+
+    Returns:
+        json dict: results(list) - run or error of each job in request order,
+                                   replayed is true for runs of earlier requests,
+                   submitted(int) and failed(int) - number of jobs
+        status: HTTP status 200 or 400
+
+    Exceptions:
+        error payload describing status, message and HTTP status code
+
+    """
+    req = request.json
+    jobs = req.get("jobs") if isinstance(req, dict) else None
+    if not isinstance(jobs, list) or not jobs:
+        raise BadRequest('Less arguments', status.HTTP_400_BAD_REQUEST, {'ext': 1})
+    if len(jobs) > KFCONNECT_CONFIG_OBJ.batch_submit_max_jobs:
+        raise BadRequest('Too many jobs in batch', status.HTTP_400_BAD_REQUEST,
+                         {'max_jobs': KFCONNECT_CONFIG_OBJ.batch_submit_max_jobs})
+
+    start = time.monotonic()
+    results = [None] * len(jobs)
+    valid = []
+    for index, job in enumerate(jobs):
+        if isinstance(job, dict) and "trainingjob_id" in job and has_run_arguments(job):
+            try:
+                run_priority(job)
+                valid.append(index)
+            except BadRequest as err:
+                results[index] = {'trainingjob_id': job["trainingjob_id"], 'status': "failed",
+                                  'message': err.message}
+        else:
+            results[index] = {'trainingjob_id': job.get("trainingjob_id")
+                                                if isinstance(job, dict) else None,
+                              'status': "failed", 'message': 'Less arguments'}
+
+    # lookups are queued before the submissions which wait on them, so
+    # every lookup is already taken by a worker when a submission blocks
+    exp_futures, pipe_futures = lookup_batch_ids([jobs[index] for index in valid])
+    futures = [(index, BATCH_EXECUTOR.submit(submit_batch_job, jobs[index], exp_futures,
+                                             pipe_futures)) for index in valid]
+    for index, future in futures:
+        results[index] = future.result()
+
+    # replayed runs were tracked by the request which submitted them
+    scheduled = [result for result in results if result.get('run_status') == "scheduled"
+                 and not result.get('replayed')]
+    with kfadapter_conf.LOCK:
+        for result in scheduled:
+            kfadapter_conf.track_run(result['run_id'], result['trainingjob_id'])
+
+    submitted = sum(1 for result in results if result['status'] == "submitted")
+    METRICS.observe('run_batch_size', len(jobs))
+    METRICS.observe('run_batch_seconds', time.monotonic() - start)
+    METRICS.inc('run_batch_jobs_submitted', submitted)
+    METRICS.inc('run_batch_jobs_failed', len(jobs) - submitted)
+    return jsonify({'results': results, 'submitted': submitted,
+                    'failed': len(jobs) - submitted}), status.HTTP_200_OK
+
+@APP.route('/submissions/<ticket>')
+def get_submission(ticket):
+    """Function handling rest endpoint to get status of an asynchronous submission
+
+    Args:
+        ticket (str): ticket returned when the submission was queued
+
+    Returns:
+        json dict: ticket, trainingjob_id, status (queued, running, submitted or
+                   failed), run_id and run once submitted, message once failed
+        status: HTTP status 200 or 404
+
+    Exceptions:
+        error payload describing status, message and HTTP status code
+
+    """
+    ticket_status = SUBMISSION_QUEUE.status(ticket) if SUBMISSION_QUEUE is not None else None
+    if ticket_status is None:
+        raise BadRequest('No such submission ' + ticket, status.HTTP_404_NOT_FOUND, {'ext': 1})
+    return jsonify(ticket_status), status.HTTP_200_OK
+
+def run_filter_args():
+    """Function reading run filter and sort query parameters of /runs
+
+    Args: None
+
+    Returns:
+        dict: keyword arguments of KfConnect.get_kf_list_runs
+
+    Exceptions:
+        BadRequest with HTTP status 400 for unknown states, sort fields or
+        malformed created_after timestamps
+
+    """
+    filters = {}
+    states = [state.strip().upper() for state in request.args.get('state', '').split(',')
+              if state.strip()]
+    if states:
+        filters['states'] = states
+        unknown = set(states) - RUN_STATES
+        if unknown:
+            raise BadRequest('Unknown run state ' + ', '.join(sorted(unknown)),
+                             status.HTTP_400_BAD_REQUEST, {'ext': 1})
+    for arg in ('experiment_id', 'pipeline_id'):
+        if request.args.get(arg):
+            filters[arg] = request.args[arg]
+    created_after = request.args.get('created_after')
+    if created_after:
+        try:
+            # fromisoformat of python < 3.11 does not take the Z suffix
+            timestamp = datetime.fromisoformat(created_after.replace('Z', '+00:00'))
+        except ValueError:
+            raise BadRequest('created_after must be an ISO 8601 timestamp',
+                             status.HTTP_400_BAD_REQUEST, {'ext': 1}) from None
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        filters['created_after'] = timestamp
+    sort_by = request.args.get('sort_by')
+    if sort_by:
+        parts = sort_by.split()
+        if not parts or parts[0] not in RUN_SORT_FIELDS or len(parts) > 2 or \
+                (len(parts) == 2 and parts[1].lower() not in ('asc', 'desc')):
+            raise BadRequest('sort_by must be one of ' + ', '.join(sorted(RUN_SORT_FIELDS)) +
+                             ' optionally followed by asc or desc',
+                             status.HTTP_400_BAD_REQUEST, {'ext': 1})
+        filters['sort_by'] = ' '.join(parts)
+    return filters
+
+def run_source(page_token=''):
+    """Function choosing where run read endpoints read runs from, the run
+       mirror when it is enabled and synced within the staleness bound,
+       Kubeflow otherwise. Page tokens stay with the source which issued them.
+
+    Args:
+        page_token (str): page token of the request, if any
+
+    Returns:
+        tuple: RunMirror or KfConnect, and response headers telling the
+               staleness of mirrored data
+
+    """
+    mirror = RUN_MIRROR
+    if mirror is None or (page_token and not page_token.startswith(PAGE_TOKEN_PREFIX)):
+        return KFCONNECT_KF_OBJ, {}
+    staleness = mirror.staleness()
+    if staleness is None or \
+            (staleness > KFCONNECT_CONFIG_OBJ.run_mirror_max_staleness_sec and not page_token):
+        METRICS.inc('run_mirror_misses')
+        return KFCONNECT_KF_OBJ, {}
+    METRICS.inc('run_mirror_hits')
+    return mirror, {'X-Run-Mirror-Staleness-Sec': '%.1f' % staleness}
+
+def run_summary(run):
+    """Function giving the description of a run returned by /runs
+
+    Args:
+        run: kubeflow run
+
+    Returns:
+        json dict: run description
+
+    """
+    LOGGER.debug(f"Run: {run}")
+    run_super_dict = {}
+    run_super_dict['run_id'] = run.run_id
+    run_super_dict['run_description'] = run.description
+    run_super_dict['run_status'] = run.state
+    run_super_dict['experiment_id'] = run.experiment_id
+
+    LOGGER.debug(f"Pipeline version reference: {run.pipeline_version_reference}")
+
+    if run.pipeline_version_reference is not None:
+        pipeline_info = KFCONNECT_KF_OBJ.get_kf_pipeline_desc(run.pipeline_version_reference.pipeline_id)
+        run_super_dict['pipeline_name'] = pipeline_info.display_name
+        run_super_dict['pipeline_id'] = pipeline_info.pipeline_id
+    return run_super_dict
 
 @APP.route("/runs")
 def list_runs():
     """Function handling rest endpoint to get all runs
        from kubeflow
 
-    Args:none
+    Args:
+        page_size (int): query parameter, number of runs in the page
+        page_token (str): query parameter, token of the page to get
+        all (bool): query parameter, true streams all pages as NDJSON lines
+                    of run description with run_name
+        state (str): query parameter, comma separated run states to list
+        experiment_id (str): query parameter, only runs of this experiment
+        pipeline_id (str): query parameter, only runs of this pipeline
+        created_after (str): query parameter, ISO 8601 timestamp, only runs created later
+        sort_by (str): query parameter, created_at, finished_at, scheduled_at or
+                       display_name optionally followed by asc or desc
 
     Returns:
         json dict:
-                   denoting run description for each pipeline run
+                   denoting run description for each pipeline run,
+                   token of next page in X-Next-Page-Token header
 
         status: HTTP status 200 or 400
 
@@ -437,28 +1116,25 @@ def list_runs():
         error payload describing status, message and HTTP status code
 
     """
+    page_size, page_token = page_args(20)
+    filters = run_filter_args()
+    source, headers = run_source(page_token)
+    if wants_all_pages():
+        runs = KFCONNECT_KF_OBJ.iter_kf_pages(
+            partial(source.get_kf_list_runs, KFCONNECT_CONFIG_OBJ.kf_dict['kfdefaultns'],
+                    **filters),
+            'runs', page_size)
+        return stream_ndjson(runs, lambda run: dict(run_summary(run), run_name=run.display_name),
+                             headers)
     run_dict = {}
 
     try:
-        runs = KFCONNECT_KF_OBJ.get_kf_list_runs(KFCONNECT_CONFIG_OBJ.kf_dict['kfdefaultns'])
+        runs = source.get_kf_list_runs(KFCONNECT_CONFIG_OBJ.kf_dict['kfdefaultns'],
+                                       page_size, page_token, **filters)
 
         for run in runs.runs:
-            LOGGER.debug(f"Run: {run}")
-            run_super_dict = {}
-            run_super_dict['run_id'] = run.run_id
-            run_super_dict['run_description'] = run.description
-            run_super_dict['run_status'] = run.state
-            run_super_dict['experiment_id'] = run.experiment_id
-
-            LOGGER.debug(f"Pipeline version reference: {run.pipeline_version_reference}")
-            LOGGER.debug(f"Pipeline version reference ID: {run.pipeline_version_reference.pipeline_id}")
-
-            if run.pipeline_version_reference is not None:
-                pipeline_info = KFCONNECT_KF_OBJ.get_kf_pipeline_desc(run.pipeline_version_reference.pipeline_id)
-                run_super_dict['pipeline_name'] = pipeline_info.display_name
-                run_super_dict['pipeline_id'] = pipeline_info.pipeline_id
-
-            run_dict[run.display_name] = run_super_dict
+            run_dict[run.display_name] = run_summary(run)
+
     except:# pylint: disable=bare-except
         tbk = traceback.format_exc()
         LOGGER.error(tbk)
@@ -466,7 +1142,38 @@ def list_runs():
                          {'ext': 1}) from None
 
 
-    return jsonify(run_dict), status.HTTP_200_OK
+    headers.update(next_page_header(runs.next_page_token))
+    return jsonify(run_dict), status.HTTP_200_OK, headers
+
+def read_run(run_id):
+    """Function reading a run from the run state cache written by the status
+       poller when the entry is fresh enough, from the run mirror or Kubeflow
+       otherwise. Runs read from Kubeflow are written back to the cache.
+
+    Args:
+        run_id (str): Run id
+
+    Returns:
+        tuple: run and response headers telling the age of cached data
+
+    """
+    state_cache = kfadapter_conf.RUN_STATE_CACHE
+    if state_cache is not None:
+        cached = state_cache.get(run_id, KFCONNECT_CONFIG_OBJ.run_state_cache_max_age_sec)
+        if cached is not None:
+            return cached[0], {'X-Run-State-Age-Sec': '%.1f' % cached[1]}
+
+    source, headers = run_source()
+    if source is not KFCONNECT_KF_OBJ:
+        run_info = source.get_kf_run(run_id)
+        if run_info is not None:
+            return run_info, headers
+    # mirror disabled, stale or synced before the run was created
+    fetched_at = time.time()
+    run_info = KFCONNECT_KF_OBJ.get_kf_run(run_id)
+    if state_cache is not None:
+        state_cache.put(run_info, fetched_at)
+    return run_info, {}
 
 @APP.route("/runs/<run_id>", methods=['GET', 'DELETE'])
 def kf_run(run_id):
@@ -494,10 +1201,12 @@ def kf_run(run_id):
             KFCONNECT_KF_OBJ.terminate_kf_pipeline(run_id)
             with kfadapter_conf.LOCK:
                     # Deleting from global-var so that wait_status_thread should not keep checking this run_id
-                    del kfadapter_conf.TRAINING_DICT[run_id]
+                    kfadapter_conf.untrack_run(run_id)
+            if kfadapter_conf.RUN_STATE_CACHE is not None:
+                kfadapter_conf.RUN_STATE_CACHE.invalidate(run_id)
             return {}, status.HTTP_200_OK
 
-        run_info = KFCONNECT_KF_OBJ.get_kf_run(run_id)
+        run_info, headers = read_run(run_id)
         run_dict['run_id'] = run_info.run_id
         run_dict['run_name'] = run_info.display_name
         run_dict['run_status'] = run_info.state
@@ -508,23 +1217,313 @@ def kf_run(run_id):
         raise BadRequest('Unsupported error from Kubeflow', status.HTTP_400_BAD_REQUEST,\
                 {'payload': {'run_id': run_id}}) from None
 
-    return jsonify(run_dict), status.HTTP_200_OK
+    return jsonify(run_dict), status.HTTP_200_OK, headers
 
-if __name__ == "__main__":
-    KFCONNECT_CONFIG_OBJ = kfadapter_conf.KfConfiguration.get_instance()
-    if KFCONNECT_CONFIG_OBJ.is_config_loaded_properly() is False:
-        print("Config not loaded properly")
-    else:
-        KF_HOST_URI = "http://"+KFCONNECT_CONFIG_OBJ.kf_dict['kfhostname']+\
+def acquire_long_request_slot():
+    """Function taking a slot for a request which holds a server thread until it
+       is answered, so such requests can not take every thread of the server
+
+    Args: None
+
+    Returns:
+        BoundedSemaphore: slots to release the taken slot to
+
+    Exceptions:
+        BadRequest with HTTP status 503 when all slots are taken
+
+    """
+    slots = LONG_REQUEST_SLOTS
+    if not slots.acquire(blocking=False):
+        METRICS.inc('long_requests_rejected')
+        raise BadRequest('Too many open event streams and waits',
+                         status.HTTP_503_SERVICE_UNAVAILABLE, {'ext': 1})
+    return slots
+
+@APP.route("/runs/<run_id>/wait")
+def wait_run(run_id):
+    """Function handling rest endpoint to wait until a run has finished. The
+       request is answered as soon as the status poller sees the run finish,
+       or after timeout seconds given as query parameter (default 30)
+
+    Args:
+        run_id (str): Run id
+
+    Returns:
+        json dict: run_id, run_status and finished, false when the run was
+                   still going on at timeout
+        status: HTTP status 200, 400 or 503
+
+    Exceptions:
+        error payload describing status, message and HTTP status code
+
+    """
+    try:
+        timeout = float(request.args.get('timeout', 30))
+    except ValueError:
+        timeout = -1
+    if not 0 <= timeout <= KFCONNECT_CONFIG_OBJ.run_wait_max_timeout_sec:
+        raise BadRequest('timeout must be a number of seconds from 0 to ' +
+                         str(KFCONNECT_CONFIG_OBJ.run_wait_max_timeout_sec),
+                         status.HTTP_400_BAD_REQUEST, {'ext': 1})
+
+    events = kfadapter_conf.RUN_EVENTS
+    state = events.state(run_id) if events is not None else None
+    if state is None or not state[1]:
+        try:
+            run_info, _ = read_run(run_id)
+        except Exception as err:
+            LOGGER.error("Exception from KubeFlow in run")
+            LOGGER.error(err)
+            raise BadRequest('Unsupported error from Kubeflow', status.HTTP_400_BAD_REQUEST,\
+                    {'payload': {'run_id': run_id}}) from None
+        state = (run_info.state, run_finished(run_info.state))
+        if not state[1] and events is not None:
+            with kfadapter_conf.LOCK:
+                tracked = run_id in kfadapter_conf.TRAINING_DICT
+            # only runs tracked by the status poller get published
+            if tracked:
+                slots = acquire_long_request_slot()
+                try:
+                    published = events.wait(run_id, timeout)
+                finally:
+                    slots.release()
+            else:
+                published = events.state(run_id)
+            state = published or state
+
+    return jsonify({'run_id': run_id, 'run_status': state[0], 'finished': state[1]}), \
+        status.HTTP_200_OK
+
+@APP.route("/events")
+def run_events():
+    """Function handling rest endpoint streaming run state transitions seen by
+       the status poller as Server-Sent Events. A client reconnecting with the
+       Last-Event-ID header gets the events it missed while they are buffered.
+       Query parameters run_id and trainingjob_id limit the stream to one run
+       or trainingjob.
+
+    Args: None
+
+    Returns:
+        text/event-stream response with one 'run' event per transition, data is
+        json dict of id, run_id, run_status, trainingjob_id, finished and time
+        status: HTTP status 200 or 503
+
+    Exceptions:
+        error payload describing status, message and HTTP status code
+
+    """
+    events = kfadapter_conf.RUN_EVENTS
+    if events is None:
+        raise BadRequest('Run events are not enabled', status.HTTP_503_SERVICE_UNAVAILABLE,
+                         {'ext': 1})
+    last_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+    try:
+        last_id = events.last_id if last_id is None else int(last_id)
+    except ValueError:
+        raise BadRequest('Last-Event-ID must be an event id', status.HTTP_400_BAD_REQUEST,
+                         {'ext': 1}) from None
+    run_id = request.args.get('run_id')
+    trainingjob_id = request.args.get('trainingjob_id')
+    keepalive = KFCONNECT_CONFIG_OBJ.event_stream_keepalive_sec
+
+    def generate(last_id):
+        METRICS.inc('run_event_stream_connects')
+        yield 'retry: 3000\n\n'
+        while True:
+            new_events = events.events_after(last_id, keepalive)
+            if not new_events:
+                yield ': keep-alive\n\n'
+                continue
+            for event in new_events:
+                last_id = event['id']
+                if run_id and event['run_id'] != run_id or \
+                        trainingjob_id and event['trainingjob_id'] != trainingjob_id:
+                    continue
+                yield 'id: {}\nevent: run\ndata: {}\n\n'.format(event['id'], json.dumps(event))
+
+    slots = acquire_long_request_slot()
+    response = Response(generate(last_id), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # called also when the client goes away before the stream was started
+    response.call_on_close(slots.release)
+    return response
+
+@APP.route("/subscriptions", methods=['GET', 'POST'])
+def subscriptions():
+    """Function handling HTTP GET/POST rest endpoint to list subscriptions or to
+       register a callback url for run state transitions seen by the status poller
+
+    Args:
+        json_request_args(dict) in HTTP POST METHOD:
+                            callback_url(str) - http or https url events are posted to
+                            states(list) - run states to be notified of, all if not given
+                            trainingjob_id(str) - only notify runs of this trainingjob
+
+    Returns:
+        json dict:
+                   list of subscriptions in HTTP GET METHOD
+                   subscription with its subscription_id in HTTP POST METHOD
+        status: HTTP status 200, 201, 400 or 503
+
+    Exceptions:
+        error payload describing status, message and HTTP status code
+
+    """
+    if WEBHOOKS is None:
+        raise BadRequest('Subscriptions are not enabled', status.HTTP_503_SERVICE_UNAVAILABLE,
+                         {'ext': 1})
+    if request.method == 'GET':
+        return jsonify(WEBHOOKS.list()), status.HTTP_200_OK
+
+    req = request.json
+    callback_url = req.get("callback_url") if isinstance(req, dict) else None
+    if not isinstance(callback_url, str) or \
+            not callback_url.startswith(('http://', 'https://')):
+        raise BadRequest('callback_url must be an http or https url',
+                         status.HTTP_400_BAD_REQUEST, {'payload': req})
+    states = req.get("states")
+    if states is not None:
+        if not isinstance(states, list) or \
+                not set(states) <= RUN_STATES | {MANUAL_RECONCILE}:
+            raise BadRequest('states must be a list of run states', status.HTTP_400_BAD_REQUEST,
+                             {'payload': req})
+    subscription = WEBHOOKS.subscribe(callback_url, states, req.get("trainingjob_id"))
+    if subscription is None:
+        raise BadRequest('Too many subscriptions', status.HTTP_400_BAD_REQUEST,
+                         {'max_subscriptions': WEBHOOKS.max_subscriptions})
+    LOGGER.info("Subscribed " + callback_url)
+    return jsonify(subscription), status.HTTP_201_CREATED
+
+@APP.route("/subscriptions/<subscription_id>", methods=['GET', 'DELETE'])
+def webhook_subscription(subscription_id):
+    """Function handling HTTP GET/DELETE rest endpoint to get or remove a subscription
+
+    Args:
+        subscription_id (str): id returned when subscribing
+
+    Returns:
+        json dict: subscription with delivered, failed, dropped and queued event counts
+                   in HTTP GET METHOD, empty in HTTP DELETE METHOD
+        status: HTTP status 200, 404 or 503
+
+    Exceptions:
+        error payload describing status, message and HTTP status code
+
+    """
+    if WEBHOOKS is None:
+        raise BadRequest('Subscriptions are not enabled', status.HTTP_503_SERVICE_UNAVAILABLE,
+                         {'ext': 1})
+    if request.method == 'DELETE':
+        if not WEBHOOKS.unsubscribe(subscription_id):
+            raise BadRequest('No such subscription ' + subscription_id,
+                             status.HTTP_404_NOT_FOUND, {'ext': 1})
+        return {}, status.HTTP_200_OK
+    found = WEBHOOKS.get(subscription_id)
+    if found is None:
+        raise BadRequest('No such subscription ' + subscription_id, status.HTTP_404_NOT_FOUND,
+                         {'ext': 1})
+    return jsonify(found), status.HTTP_200_OK
+
+def start_services():
+    """Function reading configuration, connecting to Kubeflow and starting the
+       background services of the adapter: notification outbox, tracked run
+       store, submission queue, run mirror, workflow watcher and the status
+       poller. Later calls do nothing, so whichever server runs the app starts
+       every service exactly once per process.
+
+    Args: None
+
+    Returns:
+        bool: True if the services are running
+
+    """
+    global KFCONNECT_CONFIG_OBJ, KFCONNECT_KF_OBJ, LOGGER, OUTBOX, RUN_STORE, SUBMISSION_QUEUE, \
+        SUBMISSION_DEDUP, RUN_MIRROR, WEBHOOKS, BATCH_EXECUTOR, LONG_REQUEST_SLOTS, POLLER, WATCHER, \
+        SERVICES_STARTED
+    # pylint: disable=global-statement
+    with SERVICES_LOCK:
+        if SERVICES_STARTED:
+            return True
+        KFCONNECT_CONFIG_OBJ = kfadapter_conf.KfConfiguration.get_instance()
+        if KFCONNECT_CONFIG_OBJ.is_config_loaded_properly() is False:
+            print("Config not loaded properly")
+            return False
+        kf_host_uri = "http://"+KFCONNECT_CONFIG_OBJ.kf_dict['kfhostname']+\
                     ":"+KFCONNECT_CONFIG_OBJ.kf_dict['kfport']+"/pipeline"
         LOGGER = KFCONNECT_CONFIG_OBJ.logger
-        LOGGER.debug(KF_HOST_URI)
+        LOGGER.debug(kf_host_uri)
         KFCONNECT_KF_OBJ = KfConnect()
+        BATCH_EXECUTOR = ThreadPoolExecutor(max_workers=KFCONNECT_CONFIG_OBJ.batch_submit_workers,
+                                            thread_name_prefix="run-batch")
+        LONG_REQUEST_SLOTS = BoundedSemaphore(KFCONNECT_CONFIG_OBJ.long_request_max_concurrent)
         try:
-            KFCONNECT_KF_OBJ.get_kf_client(KF_HOST_URI)
+            KFCONNECT_KF_OBJ.get_kf_client(kf_host_uri)
             LOGGER.debug(KFCONNECT_CONFIG_OBJ.appport)
-            THR = Thread(target=wait_status_thread, args=(1, KFCONNECT_KF_OBJ))
-            THR.start()
+            if KFCONNECT_CONFIG_OBJ.notification_outbox_path:
+                OUTBOX = NotificationOutbox(KFCONNECT_CONFIG_OBJ.notification_outbox_path,
+                                            TrainingMgrNotifier(
+                                                KFCONNECT_CONFIG_OBJ.trainingmgr_dict, LOGGER),
+                                            LOGGER,
+                                            notify_batch_size=KFCONNECT_CONFIG_OBJ.notify_batch_size,
+                                            batch_window=KFCONNECT_CONFIG_OBJ.notify_batch_window_sec)
+                OUTBOX.start()
+            if KFCONNECT_CONFIG_OBJ.max_in_flight_runs > 0:
+                kfadapter_conf.ADMISSION = AdmissionController(
+                    KFCONNECT_CONFIG_OBJ.max_in_flight_runs,
+                    KFCONNECT_CONFIG_OBJ.admission_max_queued,
+                    KFCONNECT_CONFIG_OBJ.admission_queue_timeout_sec)
+            if KFCONNECT_CONFIG_OBJ.tracked_run_store_path:
+                RUN_STORE = TrackedRunStore(KFCONNECT_CONFIG_OBJ.tracked_run_store_path, LOGGER)
+                recover_tracked_runs(RUN_STORE)
+                RUN_STORE.start()
+            if KFCONNECT_CONFIG_OBJ.idempotency_window_sec > 0:
+                SUBMISSION_DEDUP = SubmissionDeduplicator(
+                    KFCONNECT_CONFIG_OBJ.idempotency_window_sec,
+                    KFCONNECT_CONFIG_OBJ.idempotency_max_entries)
+                kfadapter_conf.SUBMISSIONS = SUBMISSION_DEDUP
+            kfadapter_conf.RUN_EVENTS = RunEventBus(KFCONNECT_CONFIG_OBJ.run_event_buffer_size)
+            if KFCONNECT_CONFIG_OBJ.max_subscriptions > 0:
+                WEBHOOKS = WebhookDispatcher(
+                    TrainingMgrNotifier(KFCONNECT_CONFIG_OBJ.webhook_dict, LOGGER),
+                    KFCONNECT_CONFIG_OBJ.webhook_workers, KFCONNECT_CONFIG_OBJ.webhook_max_queued,
+                    KFCONNECT_CONFIG_OBJ.max_subscriptions, LOGGER)
+                kfadapter_conf.RUN_EVENTS.add_listener(WEBHOOKS.dispatch)
+            if KFCONNECT_CONFIG_OBJ.run_state_cache_max_age_sec > 0:
+                kfadapter_conf.RUN_STATE_CACHE = RunStateCache(
+                    KFCONNECT_CONFIG_OBJ.run_state_cache_max_entries)
+            if KFCONNECT_CONFIG_OBJ.run_mirror_sync_interval_sec > 0:
+                RUN_MIRROR = RunMirror(KFCONNECT_KF_OBJ, KFCONNECT_CONFIG_OBJ.kf_dict['kfdefaultns'],
+                                       KFCONNECT_CONFIG_OBJ.run_mirror_sync_interval_sec,
+                                       KFCONNECT_CONFIG_OBJ.run_mirror_full_sync_interval_sec,
+                                       logger=LOGGER)
+                RUN_MIRROR.start()
+            SUBMISSION_QUEUE = SubmissionQueue(
+                lambda trainingjob_id, req, key: execute_run_once({}, trainingjob_id, req, key)[0],
+                KFCONNECT_CONFIG_OBJ.submission_workers,
+                KFCONNECT_CONFIG_OBJ.submission_queue_size,
+                KFCONNECT_CONFIG_OBJ.submission_max_tickets, LOGGER)
+            SUBMISSION_QUEUE.start()
+            POLLER = RunStatusPoller(KFCONNECT_KF_OBJ, outbox=OUTBOX)
+            if KFCONNECT_CONFIG_OBJ.workflow_watch_enabled:
+                WATCHER = WorkflowWatcher(make_api_client(KFCONNECT_CONFIG_OBJ.k8s_api_url,
+                                                          KFCONNECT_CONFIG_OBJ.k8s_token_path,
+                                                          KFCONNECT_CONFIG_OBJ.k8s_ca_cert_path),
+                                          KFCONNECT_CONFIG_OBJ.kf_dict['kfdefaultns'],
+                                          POLLER.observe_status,
+                                          KFCONNECT_CONFIG_OBJ.workflow_watch_timeout_sec,
+                                          logger=LOGGER)
+                WATCHER.start()
+            Thread(target=POLLER.run, name="run-status-poller", daemon=True).start()
+        except Exception as some_err:# pylint: disable=broad-except
+            LOGGER.error(some_err)
+            return False
+        SERVICES_STARTED = True
+        return True
+
+if __name__ == "__main__":
+    if start_services():
+        try:
             APP.run(host='0.0.0.0', port=KFCONNECT_CONFIG_OBJ.appport)
         except Exception as some_err:# pylint: disable=broad-except
             LOGGER.error(some_err)
@@ -0,0 +1,148 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+"""kfadapter_metrics.py
+
+This module is for keeping in-process counters, gauges and timing
+summaries of KfAdapter App, which are exposed on the /metrics endpoint
+
+"""
+
+from threading import Lock
+
+
+class MetricsRegistry:
+    """
+    This is a class for recording counters, gauges and timing summaries
+    in a thread safe manner.
+
+    Attributes: None
+    """
+
+    def __init__(self):
+        """
+        The constructor for MetricsRegistry class.
+
+        Parameters:None
+         """
+        self._lock = Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._summaries = {}
+
+    def inc(self, name, value=1):
+        """
+        Function for incrementing a counter
+
+        Args:
+            name: name of the counter
+            value: amount to add to the counter
+
+        Returns: None
+
+        """
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        """
+        Function for setting a gauge to the given value
+
+        Args:
+            name: name of the gauge
+            value: current value of the gauge
+
+        Returns: None
+
+        """
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name, value):
+        """
+        Function for recording one observation (e.g. a duration) in a summary
+
+        Args:
+            name: name of the summary
+            value: observed value
+
+        Returns: None
+
+        """
+        with self._lock:
+            summary = self._summaries.get(name)
+            if summary is None:
+                summary = {'count': 0, 'sum': 0.0, 'min': value, 'max': value, 'last': value}
+                self._summaries[name] = summary
+            summary['count'] += 1
+            summary['sum'] += value
+            summary['min'] = min(summary['min'], value)
+            summary['max'] = max(summary['max'], value)
+            summary['last'] = value
+
+    def get(self, name):
+        """
+        Function for giving current value of a counter or gauge, or the
+        summary dict of a summary
+
+        Args:
+            name: name of the metric
+
+        Returns: metric value or None if metric is not recorded
+
+        """
+        with self._lock:
+            if name in self._counters:
+                return self._counters[name]
+            if name in self._gauges:
+                return self._gauges[name]
+            if name in self._summaries:
+                return dict(self._summaries[name])
+        return None
+
+    def snapshot(self):
+        """
+        Function for giving a copy of all metrics
+
+        Args: None
+
+        Returns: dict with counters, gauges and summaries
+
+        """
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+                'summaries': {name: dict(summary) for name, summary in self._summaries.items()}
+            }
+
+    def reset(self):
+        """
+        Function for clearing all metrics
+
+        Args: None
+
+        Returns: None
+
+        """
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._summaries.clear()
+
+
+METRICS = MetricsRegistry()
@@ -0,0 +1,306 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+"""kfadapter_mirror.py
+
+This module is for keeping a local mirror of Kubeflow runs which is synced
+with delta queries so run read endpoints do not need Kubeflow calls
+
+"""
+
+import time
+import logging
+import traceback
+from datetime import timedelta
+from functools import partial
+from threading import RLock, Event, Thread
+
+from kfp_server_api.models.v2beta1_list_runs_response import V2beta1ListRunsResponse
+
+from kfadapter.kfadapter_metrics import METRICS
+
+# states in which a run can still change without finishing
+ACTIVE_STATES = ['PENDING', 'RUNNING', 'CANCELING', 'PAUSED']
+PAGE_TOKEN_PREFIX = 'mirror:'
+# watermarks are moved back by this margin as kubeflow compares whole seconds
+WATERMARK_MARGIN = timedelta(seconds=1)
+
+
+def _sort_value(value):
+    # runs without the sort field go first in ascending order
+    return (value is not None, value if value is not None else 0)
+
+
+class RunMirror:
+    """
+    This is a class for a local copy of Kubeflow runs indexed by run id,
+    experiment id and state. A background thread fetches runs created or
+    finished after the last seen created_at and finished_at watermarks and
+    runs still active, and reloads all runs every full_sync_interval so
+    deleted runs disappear. The read functions take the same arguments as
+    KfConnect so callers can use either.
+
+    Attributes: None
+    """
+
+    def __init__(self, kfc_kfconnect, nspace, sync_interval=5, full_sync_interval=600,
+                 page_size=100, logger=None):
+        """
+        The constructor for RunMirror class.
+
+        Parameters:
+            kfc_kfconnect: KfConnect used for syncing
+            nspace: namespace of the mirrored runs
+            sync_interval: seconds between two delta syncs
+            full_sync_interval: seconds between two full syncs
+            page_size: number of runs fetched per list call
+            logger: logger to be used, module logger if not given
+         """
+        self.kfc_kfconnect = kfc_kfconnect
+        self.nspace = nspace
+        self.sync_interval = sync_interval
+        self.full_sync_interval = full_sync_interval
+        self.page_size = page_size
+        self.logger = logger or logging.getLogger(__name__)
+        self.lock = RLock()
+        self.runs = {}
+        self.by_experiment = {}
+        self.by_state = {}
+        self.created_watermark = None
+        self.finished_watermark = None
+        self.last_sync = None
+        self.last_full_sync = None
+        self.stop_event = Event()
+        self.thread = None
+
+    def staleness(self):
+        """
+        Function for giving seconds since the last successful sync
+
+        Args: None
+
+        Returns: seconds or None if the mirror was never synced
+
+        """
+        if self.last_sync is None:
+            return None
+        return time.time() - self.last_sync
+
+    def _index(self, run):
+        # caller holds self.lock
+        self.by_experiment.setdefault(run.experiment_id, set()).add(run.run_id)
+        self.by_state.setdefault(run.state, set()).add(run.run_id)
+
+    def _unindex(self, run):
+        # caller holds self.lock
+        for index, key in ((self.by_experiment, run.experiment_id), (self.by_state, run.state)):
+            run_ids = index.get(key)
+            if run_ids is not None:
+                run_ids.discard(run.run_id)
+                if not run_ids:
+                    del index[key]
+
+    def _apply(self, run):
+        # caller holds self.lock
+        old = self.runs.get(run.run_id)
+        if old is not None:
+            self._unindex(old)
+        self.runs[run.run_id] = run
+        self._index(run)
+        if run.created_at is not None and \
+                (self.created_watermark is None or run.created_at > self.created_watermark):
+            self.created_watermark = run.created_at
+        if run.finished_at is not None and \
+                (self.finished_watermark is None or run.finished_at > self.finished_watermark):
+            self.finished_watermark = run.finished_at
+
+    def _fetch(self, **filters):
+        return self.kfc_kfconnect.iter_kf_pages(
+            partial(self.kfc_kfconnect.get_kf_list_runs, self.nspace, **filters),
+            'runs', self.page_size)
+
+    def full_sync(self):
+        """
+        Function for replacing the mirror with all runs in Kubeflow
+
+        Args: None
+
+        Returns: number of mirrored runs
+
+        """
+        runs = list(self._fetch())
+        with self.lock:
+            self.runs = {}
+            self.by_experiment = {}
+            self.by_state = {}
+            self.created_watermark = None
+            self.finished_watermark = None
+            for run in runs:
+                self._apply(run)
+            self.last_full_sync = self.last_sync = time.time()
+        METRICS.inc('run_mirror_synced_runs', len(runs))
+        METRICS.set_gauge('run_mirror_size', len(runs))
+        return len(runs)
+
+    def delta_sync(self):
+        """
+        Function for fetching runs created or finished since the watermarks and
+        all active runs, and applying them to the mirror
+
+        Args: None
+
+        Returns: number of fetched runs
+
+        """
+        with self.lock:
+            created_after = self.created_watermark
+            finished_after = self.finished_watermark
+        changed = []
+        if created_after is not None:
+            changed.extend(self._fetch(created_after=created_after - WATERMARK_MARGIN))
+        if finished_after is not None:
+            changed.extend(self._fetch(finished_after=finished_after - WATERMARK_MARGIN))
+        changed.extend(self._fetch(states=ACTIVE_STATES))
+        with self.lock:
+            for run in changed:
+                self._apply(run)
+            self.last_sync = time.time()
+            size = len(self.runs)
+        METRICS.inc('run_mirror_synced_runs', len(changed))
+        METRICS.set_gauge('run_mirror_size', size)
+        return len(changed)
+
+    def sync(self):
+        """
+        Function for a full sync when one is due, a delta sync otherwise
+
+        Args: None
+
+        Returns: None
+
+        """
+        start = time.monotonic()
+        if self.last_full_sync is None or \
+                time.time() - self.last_full_sync >= self.full_sync_interval:
+            self.full_sync()
+        else:
+            self.delta_sync()
+        METRICS.observe('run_mirror_sync_seconds', time.monotonic() - start)
+
+    def get_kf_run(self, run_id):
+        """
+        Function for getting a mirrored run
+
+        Args:
+            run_id: run id of the run
+
+        Returns: run or None if it is not mirrored
+
+        """
+        with self.lock:
+            return self.runs.get(run_id)
+
+    def get_kf_list_runs(self, nspace, page_size=20, page_token='', states=None,
+                         experiment_id=None, pipeline_id=None, created_after=None, sort_by=''):
+        """
+        Function for listing mirrored runs like KfConnect.get_kf_list_runs,
+        newest runs first unless sort_by is given
+
+        Args:
+            nspace: not used, the mirror holds runs of one namespace
+            page_size: number of runs in the page
+            page_token: token of the page given by the mirror, first page if empty
+            states: only list runs in one of these states
+            experiment_id: only list runs of this experiment
+            pipeline_id: only list runs of this pipeline
+            created_after: only list runs created after this datetime
+            sort_by: field and optional direction to sort by, e.g. 'created_at desc'
+
+        Returns: runs list
+
+        """
+        with self.lock:
+            run_ids = None
+            if states:
+                run_ids = set().union(*(self.by_state.get(state, ()) for state in states))
+            if experiment_id:
+                experiment_runs = self.by_experiment.get(experiment_id, set())
+                run_ids = experiment_runs if run_ids is None else run_ids & experiment_runs
+            runs = list(self.runs.values()) if run_ids is None else \
+                [self.runs[run_id] for run_id in run_ids]
+        if pipeline_id:
+            runs = [run for run in runs if run.pipeline_version_reference is not None and
+                    run.pipeline_version_reference.pipeline_id == pipeline_id]
+        if created_after is not None:
+            runs = [run for run in runs
+                    if run.created_at is not None and run.created_at > created_after]
+
+        parts = (sort_by or 'created_at desc').split()
+        runs.sort(key=lambda run: (_sort_value(getattr(run, parts[0])), run.run_id),
+                  reverse=len(parts) == 2 and parts[1].lower() == 'desc')
+
+        offset = int(page_token[len(PAGE_TOKEN_PREFIX):]) if page_token else 0
+        page = runs[offset:offset + page_size]
+        next_offset = offset + page_size
+        next_page_token = PAGE_TOKEN_PREFIX + str(next_offset) if next_offset < len(runs) else None
+        return V2beta1ListRunsResponse(runs=page, total_size=len(runs),
+                                       next_page_token=next_page_token)
+
+    def run(self):
+        """
+        Function for syncing the mirror every sync_interval until stop is called
+
+        Args: None
+
+        Returns: None
+
+        """
+        while not self.stop_event.is_set():
+            try:
+                self.sync()
+            except: # pylint: disable=bare-except
+                tbk = traceback.format_exc()
+                self.logger.error(tbk)
+            staleness = self.staleness()
+            if staleness is not None:
+                METRICS.set_gauge('run_mirror_staleness_seconds', staleness)
+            self.stop_event.wait(self.sync_interval)
+
+    def start(self):
+        """
+        Function for starting the background sync thread
+
+        Args: None
+
+        Returns: None
+
+        """
+        self.thread = Thread(target=self.run, name="run-mirror", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Function for stopping the background sync thread
+
+        Args: None
+
+        Returns: None
+
+        """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
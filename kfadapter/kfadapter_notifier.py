@@ -0,0 +1,179 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+"""kfadapter_notifier.py
+
+This module is for sending run notifications to training manager over a
+pooled keep-alive HTTP session
+
+"""
+
+import json
+import time
+import random
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from kfadapter.kfadapter_metrics import METRICS
+
+NOTIFICATION_PATH = "/trainingjob/pipelineNotification"
+BATCH_NOTIFICATION_PATH = "/trainingjob/pipelineNotifications"
+# answers of a receiver without the batch endpoint
+BATCH_UNSUPPORTED_CODES = {404, 405, 415, 501}
+
+
+class TrainingMgrNotifier:
+    """
+    This is a class for posting notifications to training manager with
+    connect/read timeouts and bounded retries with jittered backoff.
+
+    Attributes: None
+    """
+
+    def __init__(self, trainingmgr_dict, logger=None):
+        """
+        The constructor for TrainingMgrNotifier class.
+
+        Parameters:
+            trainingmgr_dict: KfConfiguration.trainingmgr_dict holding host, port,
+                              pool size, timeouts and retry settings, optionally
+                              pool_connections, the number of hosts whose
+                              connections are kept
+            logger: logger to be used, module logger if not given
+         """
+        self.logger = logger or logging.getLogger(__name__)
+        base_url = "http://" + str(trainingmgr_dict['trainingmgr_host']) + ":" + \
+                   str(trainingmgr_dict['trainingmgr_port'])
+        self.url = base_url + NOTIFICATION_PATH
+        self.batch_url = base_url + trainingmgr_dict.get('batch_path', BATCH_NOTIFICATION_PATH)
+        self.batch_probe_interval = trainingmgr_dict.get('batch_probe_interval_sec', 300)
+        # monotonic time until which the batch endpoint is known to be missing
+        self.batch_unsupported_until = None
+        self.timeout = (trainingmgr_dict.get('connect_timeout_sec', 3),
+                        trainingmgr_dict.get('read_timeout_sec', 10))
+        self.retries = trainingmgr_dict.get('notify_retries', 3)
+        self.backoff = trainingmgr_dict.get('notify_backoff_sec', 0.5)
+        pool_size = trainingmgr_dict.get('pool_size', 10)
+        pool_connections = max(1, trainingmgr_dict.get('pool_connections', 1))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_size,
+                              max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'content-type': 'application/json',
+                                     'Accept-Charset': 'UTF-8'})
+
+    def post(self, url, payload, metric_prefix='trainingmgr_notify'):
+        """
+        Function for posting a json payload with retries
+
+        Args:
+            url: url to post to
+            payload: json serializable payload
+            metric_prefix: prefix of retry and duration metrics
+
+        Returns: last response received, None if no response could be received
+
+        """
+        data = json.dumps(payload)
+        response = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                METRICS.inc(metric_prefix + '_retries')
+                time.sleep(self.backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5))
+            start = time.monotonic()
+            try:
+                response = self.session.post(url, data=data, timeout=self.timeout)
+            except requests.exceptions.RequestException as err:
+                self.logger.warning("Notification to %s failed: %s", url, err)
+                response = None
+                continue
+            finally:
+                METRICS.observe(metric_prefix + '_seconds', time.monotonic() - start)
+            if response.status_code < 500:
+                break
+            self.logger.warning("Notification to %s returned %d", url, response.status_code)
+        return response
+
+    def notify(self, run_dict):
+        """
+        Function for notifying run status to training manager
+
+        Args:
+            run_dict: dict with run_id, run_status and trainingjob_id
+
+        Returns: True if training manager answered with 2xx, False otherwise
+
+        """
+        response = self.post(self.url, run_dict)
+        if response is not None and 200 <= response.status_code < 300:
+            METRICS.inc('trainingmgr_notify_success')
+            return True
+        METRICS.inc('trainingmgr_notify_failures')
+        if response is not None:
+            self.logger.error("Training manager rejected notification %s with %d",
+                              run_dict, response.status_code)
+        return False
+
+    def notify_batch(self, run_dicts):
+        """
+        Function for notifying status of many runs to training manager in one
+        request with a json array. A receiver answering 404, 405, 415 or 501 is
+        taken as not supporting batches and is not asked again for
+        batch_probe_interval_sec, callers then fall back to notify.
+
+        Args:
+            run_dicts: list of dicts with run_id, run_status and trainingjob_id
+
+        Returns: True if training manager answered with 2xx, False if it failed,
+                 None if batches are not supported
+
+        """
+        if self.batch_unsupported_until is not None and \
+                time.monotonic() < self.batch_unsupported_until:
+            return None
+        response = self.post(self.batch_url, run_dicts)
+        if response is not None and response.status_code in BATCH_UNSUPPORTED_CODES:
+            METRICS.inc('trainingmgr_notify_batch_unsupported')
+            self.logger.warning("Training manager does not support batch notifications, "
+                                "answered %d", response.status_code)
+            self.batch_unsupported_until = time.monotonic() + self.batch_probe_interval
+            return None
+        self.batch_unsupported_until = None
+        METRICS.observe('trainingmgr_notify_batch_size', len(run_dicts))
+        if response is not None and 200 <= response.status_code < 300:
+            METRICS.inc('trainingmgr_notify_success', len(run_dicts))
+            return True
+        METRICS.inc('trainingmgr_notify_failures', len(run_dicts))
+        if response is not None:
+            self.logger.error("Training manager rejected batch of %d notifications with %d",
+                              len(run_dicts), response.status_code)
+        return False
+
+    def close(self):
+        """
+        Function for closing pooled connections
+
+        Args: None
+
+        Returns: None
+
+        """
+        self.session.close()
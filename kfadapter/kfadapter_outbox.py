@@ -0,0 +1,292 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+"""kfadapter_outbox.py
+
+This module is for keeping run notifications in a sqlite backed outbox
+until training manager has accepted them
+
+"""
+
+import json
+import time
+import sqlite3
+import logging
+import traceback
+from threading import Lock, Event, Thread
+
+from kfadapter.kfadapter_metrics import METRICS
+
+
+class NotificationOutbox:
+    """
+    This is a class for storing notifications durably before delivery and
+    delivering them from a background sender thread. An entry is removed
+    only after training manager answered with 2xx, failed deliveries are
+    retried with exponential backoff. With notify_batch_size above 1 the
+    sender waits up to batch_window seconds after a put so a burst of
+    completions goes out as batches, entry by entry if training manager does
+    not support batches.
+
+    Attributes: None
+    """
+
+    def __init__(self, path, notifier, logger=None, batch_size=100,
+                 retry_interval=5, max_retry_interval=300, notify_batch_size=0,
+                 batch_window=0):
+        """
+        The constructor for NotificationOutbox class.
+
+        Parameters:
+            path: sqlite database file of the outbox
+            notifier: TrainingMgrNotifier used for delivery
+            logger: logger to be used, module logger if not given
+            batch_size: maximum number of entries read per drain
+            retry_interval: seconds before first redelivery of a failed entry
+            max_retry_interval: upper bound of seconds between redeliveries
+            notify_batch_size: maximum number of entries per batch notification,
+                               0 or 1 notifies entries one by one
+            batch_window: seconds the sender waits for a batch to fill up
+         """
+        self.notifier = notifier
+        self.logger = logger or logging.getLogger(__name__)
+        self.batch_size = batch_size
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.notify_batch_size = notify_batch_size
+        self.batch_window = batch_window
+        self.lock = Lock()
+        self.wakeup = Event()
+        self.batch_full = Event()
+        # entries put since the sender last started draining
+        self.unsent = 0
+        self.stop_event = Event()
+        self.thread = None
+
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS outbox ("
+                              "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                              "payload TEXT NOT NULL, "
+                              "created_at REAL NOT NULL, "
+                              "attempts INTEGER NOT NULL DEFAULT 0, "
+                              "next_attempt_at REAL NOT NULL)")
+        self._update_depth()
+
+    def put(self, payload):
+        """
+        Function for adding a notification to the outbox
+
+        Args:
+            payload: json serializable notification payload
+
+        Returns: id of the outbox entry
+
+        """
+        now = time.time()
+        with self.lock:
+            cur = self.conn.execute("INSERT INTO outbox (payload, created_at, next_attempt_at) "
+                                    "VALUES (?, ?, ?)", (json.dumps(payload), now, now))
+            self.unsent += 1
+            full = self.unsent >= self.notify_batch_size
+        self._update_depth()
+        self.wakeup.set()
+        if full:
+            self.batch_full.set()
+        return cur.lastrowid
+
+    def due_entries(self, now=None):
+        """
+        Function for giving entries due for delivery, oldest first
+
+        Args:
+            now: wall clock time, current time if not given
+
+        Returns: list of (id, payload, created_at, attempts) tuples
+
+        """
+        if now is None:
+            now = time.time()
+        with self.lock:
+            rows = self.conn.execute("SELECT id, payload, created_at, attempts FROM outbox "
+                                     "WHERE next_attempt_at <= ? ORDER BY id LIMIT ?",
+                                     (now, self.batch_size)).fetchall()
+        return [(row[0], json.loads(row[1]), row[2], row[3]) for row in rows]
+
+    def ack(self, entry_id):
+        """
+        Function for removing a delivered entry
+
+        Args:
+            entry_id: id of the outbox entry
+
+        Returns: None
+
+        """
+        with self.lock:
+            self.conn.execute("DELETE FROM outbox WHERE id = ?", (entry_id,))
+
+    def ack_many(self, entry_ids):
+        """
+        Function for removing delivered entries in one statement
+
+        Args:
+            entry_ids: ids of the outbox entries
+
+        Returns: None
+
+        """
+        with self.lock:
+            self.conn.execute("DELETE FROM outbox WHERE id IN ({})".format(
+                ', '.join('?' * len(entry_ids))), entry_ids)
+
+    def defer(self, entry_id, attempts):
+        """
+        Function for scheduling redelivery of a failed entry
+
+        Args:
+            entry_id: id of the outbox entry
+            attempts: number of failed deliveries so far
+
+        Returns: None
+
+        """
+        delay = min(self.max_retry_interval, self.retry_interval * (2 ** (attempts - 1)))
+        with self.lock:
+            self.conn.execute("UPDATE outbox SET attempts = ?, next_attempt_at = ? WHERE id = ?",
+                              (attempts, time.time() + delay, entry_id))
+
+    def depth(self):
+        """
+        Function for giving number of undelivered entries
+
+        Args: None
+
+        Returns: number of entries in the outbox
+
+        """
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def _update_depth(self):
+        with self.lock:
+            depth, oldest = self.conn.execute("SELECT COUNT(*), MIN(created_at) "
+                                              "FROM outbox").fetchone()
+        METRICS.set_gauge('notification_outbox_depth', depth)
+        METRICS.set_gauge('notification_outbox_oldest_age_seconds',
+                          time.time() - oldest if oldest is not None else 0)
+
+    def drain_once(self):
+        """
+        Function for delivering all entries which are due once
+
+        Args: None
+
+        Returns: number of delivered entries
+
+        """
+        delivered = 0
+        while True:
+            entries = self.due_entries()
+            if self.notify_batch_size > 1:
+                for start in range(0, len(entries), self.notify_batch_size):
+                    delivered += self._deliver_batch(entries[start:start + self.notify_batch_size])
+            else:
+                for entry in entries:
+                    delivered += self._deliver(entry)
+            if len(entries) < self.batch_size:
+                break
+        self._update_depth()
+        return delivered
+
+    def _deliver(self, entry):
+        entry_id, payload, created_at, attempts = entry
+        if self.notifier.notify(payload):
+            self.ack(entry_id)
+            METRICS.observe('notification_delivery_lag_seconds', time.time() - created_at)
+            return 1
+        self.defer(entry_id, attempts + 1)
+        return 0
+
+    def _deliver_batch(self, entries):
+        if len(entries) == 1:
+            return self._deliver(entries[0])
+        result = self.notifier.notify_batch([entry[1] for entry in entries])
+        if result is None:
+            METRICS.inc('notification_batch_fallbacks')
+            return sum(self._deliver(entry) for entry in entries)
+        if not result:
+            for entry in entries:
+                self.defer(entry[0], entry[3] + 1)
+            return 0
+        self.ack_many([entry[0] for entry in entries])
+        now = time.time()
+        for entry in entries:
+            METRICS.observe('notification_delivery_lag_seconds', now - entry[2])
+        return len(entries)
+
+    def run(self):
+        """
+        Function for delivering outbox entries until stop is called
+
+        Args: None
+
+        Returns: None
+
+        """
+        while not self.stop_event.is_set():
+            self.wakeup.clear()
+            self.batch_full.clear()
+            with self.lock:
+                self.unsent = 0
+            try:
+                self.drain_once()
+            except: # pylint: disable=bare-except
+                tbk = traceback.format_exc()
+                self.logger.error(tbk)
+            self.wakeup.wait(self.retry_interval)
+            if self.notify_batch_size > 1 and self.batch_window > 0:
+                # let a burst of completions collect, unless a batch is full already
+                self.batch_full.wait(self.batch_window)
+
+    def start(self):
+        """
+        Function for starting the background sender thread
+
+        Args: None
+
+        Returns: None
+
+        """
+        self.thread = Thread(target=self.run, name="notification-outbox", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Function for stopping the background sender thread
+
+        Args: None
+
+        Returns: None
+
+        """
+        self.stop_event.set()
+        self.wakeup.set()
+        self.batch_full.set()
+        if self.thread is not None:
+            self.thread.join()
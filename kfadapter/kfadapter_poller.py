@@ -0,0 +1,415 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+"""kfadapter_poller.py
+
+This module is for polling the status of tracked pipeline runs from Kubeflow
+and notifying finished runs to training manager
+
+"""
+
+import traceback
+import time
+import heapq
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from kfadapter import kfadapter_conf
+from kfadapter.kfadapter_metrics import METRICS
+from kfadapter.kfadapter_notifier import TrainingMgrNotifier
+from kfadapter.kfadapter_util import run_finished
+
+MANUAL_RECONCILE = "Manual reconcile"
+SWEEP_MODE_DRAIN = "drain"
+SWEEP_MODE_SINGLE = "single"
+# seconds subtracted from the oldest tracked time when listing runs, covers the
+# time between run creation and tracking and clock skew with kubeflow
+CREATED_AFTER_MARGIN_SEC = 300
+
+
+class RunStatusPoller:
+    """
+    This is a class for polling status of runs in kfadapter_conf.TRAINING_DICT.
+
+    Every tracked run has its own next check time kept in a heap. A run is
+    checked as soon as it is seen and then with an interval growing by the
+    backoff factor on every check, up to the maximum interval, so long running
+    jobs are queried less often than freshly submitted ones.
+
+    kfadapter_conf.LOCK is only held while copying or updating TRAINING_DICT,
+    status queries and notifications are done without holding it.
+
+    Attributes: None
+    """
+
+    def __init__(self, kfc_kfconnect, workers=None, sweep_mode=None,
+                 min_interval=None, max_interval=None, backoff=None, jitter=None,
+                 notifier=None, outbox=None):
+        """
+        The constructor for RunStatusPoller class.
+
+        Parameters:
+            kfc_kfconnect: KfConnect object used for querying run status
+            workers: maximum number of concurrent run status queries
+            sweep_mode: SWEEP_MODE_DRAIN to notify every finished run of a sweep,
+                        SWEEP_MODE_SINGLE to notify only the first one
+            min_interval: seconds between the first and second check of a run
+            max_interval: upper bound of seconds between two checks of a run
+            backoff: factor by which the interval grows after every check
+            jitter: fraction by which every interval is randomly stretched or shrunk
+            notifier: TrainingMgrNotifier used for notifications, built from
+                      KfConfiguration.trainingmgr_dict if not given
+            outbox: NotificationOutbox finished runs are written to, notifications
+                    are sent directly with notifier if not given
+         """
+        self.kfc_kfconnect = kfc_kfconnect
+        self.kfc_config = kfadapter_conf.KfConfiguration.get_instance()
+        self.logger = self.kfc_config.logger
+        if workers is None:
+            workers = self.kfc_config.run_status_poll_workers
+        self.workers = max(1, workers)
+        if sweep_mode is None:
+            sweep_mode = self.kfc_config.run_status_sweep_mode
+        self.sweep_mode = sweep_mode
+        self.min_interval = self.kfc_config.run_status_poll_min_interval_sec \
+                if min_interval is None else min_interval
+        self.max_interval = self.kfc_config.run_status_polling_interval_sec \
+                if max_interval is None else max_interval
+        self.backoff = self.kfc_config.run_status_poll_backoff if backoff is None else backoff
+        self.jitter = self.kfc_config.run_status_poll_jitter if jitter is None else jitter
+        # heap of (next check time, run_id), stale entries are skipped when popped
+        self.schedule = []
+        # run_id -> [next check time, number of checks done]
+        self.run_checks = {}
+        if notifier is None:
+            notifier = TrainingMgrNotifier(self.kfc_config.trainingmgr_dict, self.logger)
+        self.notifier = notifier
+        self.outbox = outbox
+        # run ids being notified, guarded by kfadapter_conf.LOCK
+        self.completing = set()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers,
+                                           thread_name_prefix="run-status-poll")
+
+    def get_run_statuses(self, run_ids):
+        """
+        Function for getting status of tracked runs from kubeflow with batched
+        list calls, runs missing from the list are queried through the worker pool.
+        Fetched runs are written to kfadapter_conf.RUN_STATE_CACHE when it is set
+
+        Args:
+            run_ids: run ids of tracked runs
+
+        Returns: list of run status strings in order of run_ids, MANUAL_RECONCILE
+                 for runs whose status can not be queried
+
+        """
+        runs = self.kfc_kfconnect.get_kf_runs(run_ids, created_after=self.created_after(run_ids),
+                                              fallback_map=self.executor.map)
+        state_cache = kfadapter_conf.RUN_STATE_CACHE
+        if state_cache is not None:
+            fetched_at = time.time()
+            for run in runs.values():
+                state_cache.put(run, fetched_at)
+        return [runs[run_id].state if run_id in runs else MANUAL_RECONCILE
+                for run_id in run_ids]
+
+    @staticmethod
+    def created_after(run_ids):
+        """
+        Function for getting the creation time bound of the run listing from
+        the time the oldest of run_ids was tracked
+
+        Args:
+            run_ids: run ids of tracked runs
+
+        Returns: timezone aware datetime, or None if a run has no tracked time
+
+        """
+        with kfadapter_conf.LOCK:
+            tracked_at = [kfadapter_conf.RUN_TRACKED_AT.get(run_id) for run_id in run_ids]
+        if not tracked_at or None in tracked_at:
+            return None
+        return datetime.fromtimestamp(min(tracked_at) - CREATED_AFTER_MARGIN_SEC, timezone.utc)
+
+    def notify_trainingmgr(self, run_id, run_status, trainingjob_id):
+        """
+        Function for posting run status of finished run to training manager,
+        or for queueing it in the outbox when one is configured
+
+        Args:
+            run_id: run id of finished run
+            run_status: status of finished run
+            trainingjob_id: trainingjob id of finished run
+
+        Returns: True if the notification was queued or accepted by training manager
+
+        """
+        run_dict = {}
+        run_dict['run_id'] = run_id
+        run_dict['run_status'] = run_status
+        run_dict['trainingjob_id'] = trainingjob_id
+        try:
+            if self.outbox is not None:
+                self.logger.info("Queueing notification to training manager")
+                self.logger.info(run_dict)
+                self.outbox.put(run_dict)
+                return True
+            self.logger.info("POSTING to training manager")
+            self.logger.info(run_dict)
+            return self.notifier.notify(run_dict)
+        except: # pylint: disable=bare-except
+            tbk = traceback.format_exc()
+            self.logger.error(tbk)
+            return False
+
+    def complete_run(self, run_id, run_status):
+        """
+        Function for notifying a finished run to training manager and untracking
+        it, only the first caller for a run notifies so the poller and a status
+        watcher can both report the same run. With an outbox the run is only
+        untracked once the notification is written, so it is checked again
+        if the write fails.
+
+        Args:
+            run_id: run id of finished run
+            run_status: status of finished run
+
+        Returns: True if the run was still tracked and has been notified
+
+        """
+        with kfadapter_conf.LOCK:
+            trainingjob_id = kfadapter_conf.TRAINING_DICT.get(run_id)
+            if trainingjob_id is None or run_id in self.completing:
+                return False
+            self.completing.add(run_id)
+        try:
+            notified = self.notify_trainingmgr(run_id, run_status, trainingjob_id)
+            if not notified and self.outbox is not None:
+                self.logger.error("Keeping run %s tracked, its notification was not queued",
+                                  run_id)
+                return False
+            with kfadapter_conf.LOCK:
+                kfadapter_conf.untrack_run(run_id)
+            return True
+        finally:
+            with kfadapter_conf.LOCK:
+                self.completing.discard(run_id)
+
+    def observe_status(self, run_id, run_status):
+        """
+        Function for taking a run status seen outside of the poll sweeps, e.g.
+        by WorkflowWatcher, through the same event and notification path
+
+        Args:
+            run_id: run id of the run
+            run_status: kubeflow run state
+
+        Returns: True if the run finished and has been notified
+
+        """
+        with kfadapter_conf.LOCK:
+            trainingjob_id = kfadapter_conf.TRAINING_DICT.get(run_id)
+        if trainingjob_id is None:
+            return False
+        done = run_finished(run_status)
+        events = kfadapter_conf.RUN_EVENTS
+        if events is not None:
+            events.publish(run_id, run_status, trainingjob_id, done)
+        if done and self.complete_run(run_id, run_status):
+            METRICS.inc('run_completions_notified')
+            METRICS.inc('run_completions_watched')
+            return True
+        return False
+
+    def next_interval(self, checks):
+        """
+        Function for giving seconds until the next check of a run
+
+        Args:
+            checks: number of checks already done for the run
+
+        Returns: interval in seconds
+
+        """
+        interval = min(self.max_interval, self.min_interval * (self.backoff ** checks))
+        if self.jitter:
+            interval *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(0, interval)
+
+    def _schedule(self, run_id, due, checks):
+        self.run_checks[run_id] = [due, checks]
+        heapq.heappush(self.schedule, (due, run_id))
+
+    def _sync_tracked_runs(self, tracked, now):
+        """
+        Function for scheduling newly tracked runs for immediate check and
+        forgetting runs no longer present in TRAINING_DICT
+        """
+        for run_id in list(self.run_checks):
+            if run_id not in tracked:
+                del self.run_checks[run_id]
+        for run_id in tracked:
+            if run_id not in self.run_checks:
+                self._schedule(run_id, now, 0)
+
+    def _pop_due_runs(self, now):
+        due_runs = []
+        while self.schedule and self.schedule[0][0] <= now:
+            due, run_id = heapq.heappop(self.schedule)
+            entry = self.run_checks.get(run_id)
+            if entry is not None and entry[0] == due:
+                due_runs.append(run_id)
+        return due_runs
+
+    def next_check_time(self):
+        """
+        Function for giving time of the earliest scheduled run check
+
+        Args: None
+
+        Returns: monotonic time of next check or None if no run is scheduled
+
+        """
+        while self.schedule:
+            due, run_id = self.schedule[0]
+            entry = self.run_checks.get(run_id)
+            if entry is not None and entry[0] == due:
+                return due
+            heapq.heappop(self.schedule)
+        return None
+
+    def sweep(self, now=None):
+        """
+        Function for checking status of tracked runs which are due, publishing
+        their states to kfadapter_conf.RUN_EVENTS and notifying finished runs
+        to training manager. In SWEEP_MODE_SINGLE only the first finished run
+        is notified, the rest are picked up by later sweeps.
+
+        Args:
+            now: monotonic time of the sweep, current time if not given
+
+        Returns: list of run ids which were notified and removed from tracking
+
+        """
+        start = time.monotonic()
+        if now is None:
+            now = start
+        with kfadapter_conf.LOCK:
+            dict_copy = kfadapter_conf.TRAINING_DICT.copy()
+
+        self._sync_tracked_runs(dict_copy, now)
+        run_ids = self._pop_due_runs(now)
+        handled = set()
+        finished = []
+        try:
+            statuses = self.get_run_statuses(run_ids) if run_ids else []
+            events = kfadapter_conf.RUN_EVENTS
+            for run_id, run_status in zip(run_ids, statuses):
+                done = run_finished(run_status) or run_status == MANUAL_RECONCILE
+                if events is not None:
+                    events.publish(run_id, run_status, dict_copy[run_id], done)
+                if done and (self.sweep_mode != SWEEP_MODE_SINGLE or not finished):
+                    del self.run_checks[run_id]
+                    if self.complete_run(run_id, run_status):
+                        finished.append(run_id)
+                elif done:
+                    self._schedule(run_id, now, self.run_checks[run_id][1])
+                else:
+                    checks = self.run_checks[run_id][1]
+                    self._schedule(run_id, now + self.next_interval(checks), checks + 1)
+                handled.add(run_id)
+        finally:
+            # runs taken off the heap must not be lost when a query or listener fails
+            for run_id in run_ids:
+                if run_id not in handled and run_id in self.run_checks:
+                    checks = self.run_checks[run_id][1]
+                    self._schedule(run_id, now + self.next_interval(checks), checks)
+
+        duration = time.monotonic() - start
+        METRICS.set_gauge('tracked_runs', len(dict_copy))
+        METRICS.observe('run_status_poll_sweep_seconds', duration)
+        METRICS.observe('run_status_checks_per_sweep', len(run_ids))
+        METRICS.observe('run_completions_per_sweep', len(finished))
+        METRICS.inc('run_completions_notified', len(finished))
+        self.logger.debug("Poll sweep checked %d of %d tracked runs and notified %d finished "
+                          "runs in %.3f sec", len(run_ids), len(dict_copy), len(finished),
+                          duration)
+        return finished
+
+    def reconcile(self):
+        """
+        Function for checking all tracked runs at once, e.g. runs recovered from
+        the run store after a restart
+
+        Args: None
+
+        Returns: list of run ids which were notified and removed from tracking
+
+        """
+        start = time.monotonic()
+        for run_id, entry in self.run_checks.items():
+            entry[0] = start
+            heapq.heappush(self.schedule, (start, run_id))
+        finished = self.sweep(now=start)
+        METRICS.observe('run_reconcile_seconds', time.monotonic() - start)
+        return finished
+
+    def run(self):
+        """
+        Function for polling tracked runs forever. All tracked runs are
+        reconciled first, then the poller wakes up for the next scheduled check,
+        and at least every min_interval to pick up newly tracked runs.
+
+        Args: None
+
+        Returns: None
+
+        """
+        try:
+            self.reconcile()
+        except: # pylint: disable=bare-except
+            tbk = traceback.format_exc()
+            self.logger.error(tbk)
+        while True:
+            try:
+                self.sweep()
+            except: # pylint: disable=bare-except
+                tbk = traceback.format_exc()
+                self.logger.error(tbk)
+            wait = self.min_interval
+            next_check = self.next_check_time()
+            if next_check is not None:
+                wait = min(wait, next_check - time.monotonic())
+            time.sleep(max(wait, 0.1))
+
+
+def wait_status_thread(name, kfc_kfconnect, outbox=None):
+    """
+     Thread Function for notify the status of all pipeline run
+    to training manager
+
+    Args:
+        name: name of the thread
+        kfc_kfconnect: KfConnect object
+        outbox: NotificationOutbox for finished runs, optional
+
+    Returns:None
+
+    """
+    #pylint: disable=unused-argument
+    RunStatusPoller(kfc_kfconnect, outbox=outbox).run()
@@ -0,0 +1,225 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+"""kfadapter_runstore.py
+
+This module is for persisting tracked run id to trainingjob id mappings
+of kfadapter_conf.TRAINING_DICT so they survive restarts
+
+"""
+
+import time
+import sqlite3
+import logging
+import traceback
+from threading import Lock, Event, Thread
+
+from kfadapter import kfadapter_conf
+from kfadapter.kfadapter_metrics import METRICS
+
+
+class TrackedRunStore:
+    """
+    This is a class for storing tracked runs in sqlite. Changes are queued
+    in memory and written by a background flusher in one transaction per
+    batch, so callers holding kfadapter_conf.LOCK never wait for disk.
+
+    Attributes: None
+    """
+
+    def __init__(self, path, logger=None, flush_interval=0.2, batch_size=1000):
+        """
+        The constructor for TrackedRunStore class.
+
+        Parameters:
+            path: sqlite database file of the store
+            logger: logger to be used, module logger if not given
+            flush_interval: seconds between two background flushes
+            batch_size: number of queued changes which triggers an early flush
+         """
+        self.logger = logger or logging.getLogger(__name__)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.lock = Lock()
+        self.db_lock = Lock()
+        self.wakeup = Event()
+        self.stop_event = Event()
+        self.thread = None
+        # run_id -> trainingjob_id for puts, None for deletes
+        self.pending = {}
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.db_lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS tracked_runs ("
+                              "run_id TEXT PRIMARY KEY, "
+                              "trainingjob_id TEXT NOT NULL, "
+                              "tracked_at REAL NOT NULL)")
+            self.conn.commit()
+
+    def put(self, run_id, trainingjob_id):
+        """
+        Function for queueing a tracked run to be stored
+
+        Args:
+            run_id: run id of tracked run
+            trainingjob_id: trainingjob id of tracked run
+
+        Returns: None
+
+        """
+        self._queue(run_id, trainingjob_id)
+
+    def delete(self, run_id):
+        """
+        Function for queueing removal of a tracked run
+
+        Args:
+            run_id: run id of tracked run
+
+        Returns: None
+
+        """
+        self._queue(run_id, None)
+
+    def _queue(self, run_id, trainingjob_id):
+        with self.lock:
+            self.pending[run_id] = trainingjob_id
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.wakeup.set()
+
+    def flush(self):
+        """
+        Function for writing queued changes in one transaction
+
+        Args: None
+
+        Returns: number of written changes
+
+        """
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return 0
+        now = time.time()
+        puts = [(run_id, job_id, now) for run_id, job_id in pending.items() if job_id is not None]
+        deletes = [(run_id,) for run_id, job_id in pending.items() if job_id is None]
+        with self.db_lock:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO tracked_runs "
+                                      "(run_id, trainingjob_id, tracked_at) VALUES (?, ?, ?)",
+                                      puts)
+                self.conn.executemany("DELETE FROM tracked_runs WHERE run_id = ?", deletes)
+        METRICS.observe('run_store_flush_batch_size', len(pending))
+        return len(pending)
+
+    def load(self):
+        """
+        Function for reading all stored tracked runs
+
+        Args: None
+
+        Returns: dict of run_id to trainingjob_id
+
+        """
+        with self.db_lock:
+            return dict(self.conn.execute("SELECT run_id, trainingjob_id FROM tracked_runs"))
+
+    def load_tracked_at(self):
+        """
+        Function for reading the time all stored tracked runs were written
+
+        Args: None
+
+        Returns: dict of run_id to epoch seconds
+
+        """
+        with self.db_lock:
+            return dict(self.conn.execute("SELECT run_id, tracked_at FROM tracked_runs"))
+
+    def run(self):
+        """
+        Function for flushing queued changes until stop is called
+
+        Args: None
+
+        Returns: None
+
+        """
+        while not self.stop_event.is_set():
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except: # pylint: disable=bare-except
+                tbk = traceback.format_exc()
+                self.logger.error(tbk)
+        self.flush()
+
+    def start(self):
+        """
+        Function for starting the background flusher thread
+
+        Args: None
+
+        Returns: None
+
+        """
+        self.thread = Thread(target=self.run, name="tracked-run-store", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Function for stopping the background flusher thread after a last flush
+
+        Args: None
+
+        Returns: None
+
+        """
+        self.stop_event.set()
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+def recover_tracked_runs(store):
+    """
+    Function for loading stored tracked runs into kfadapter_conf.TRAINING_DICT
+    and attaching the store so later changes are persisted
+
+    Args:
+        store: TrackedRunStore to recover from
+
+    Returns: number of recovered runs
+
+    """
+    start = time.monotonic()
+    recovered = store.load()
+    tracked_at = store.load_tracked_at()
+    with kfadapter_conf.LOCK:
+        kfadapter_conf.TRAINING_DICT.update(recovered)
+        kfadapter_conf.RUN_TRACKED_AT.update(tracked_at)
+        kfadapter_conf.JOB_RUNS.update((job_id, run_id) for run_id, job_id in recovered.items())
+        kfadapter_conf.RUN_STORE = store
+    duration = time.monotonic() - start
+    METRICS.set_gauge('run_store_recovered_runs', len(recovered))
+    METRICS.observe('run_store_recovery_seconds', duration)
+    store.logger.info("Recovered %d tracked runs in %.3f sec", len(recovered), duration)
+    return len(recovered)
@@ -0,0 +1,122 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+"""kfadapter_server.py
+
+This module is for serving KfAdapter App with gunicorn instead of the
+Flask development server
+
+Run as:
+    python3 -m kfadapter.kfadapter_server
+
+"""
+
+from gunicorn.app.base import BaseApplication
+
+from kfadapter import kfadapter_conf
+from kfadapter import kfadapter_main
+
+
+def start_worker_services(worker):
+    """
+    Function for starting the background services in the worker process once
+    it has been forked, gunicorn post_worker_init hook
+
+    Args:
+        worker: gunicorn worker
+
+    Returns: None
+
+    """
+    if not kfadapter_main.start_services():
+        worker.log.error("KfAdapter services could not be started")
+        # exit code 3 makes the arbiter stop instead of restarting the worker
+        raise SystemExit(3)
+
+
+def server_options(kfc_config):
+    """
+    Function for giving gunicorn settings from configuration. Tracked runs,
+    caches, queues and the status poller live in process memory, so there is
+    one worker process serving requests with a pool of threads, and the
+    background services are started in it exactly once.
+
+    Args:
+        kfc_config: KfConfiguration
+
+    Returns: dict of gunicorn settings
+
+    """
+    return {'bind': '0.0.0.0:' + str(kfc_config.appport),
+            'workers': 1,
+            'worker_class': 'gthread',
+            'threads': kfc_config.server_threads,
+            'keepalive': kfc_config.server_keepalive_sec,
+            'backlog': kfc_config.server_backlog,
+            'timeout': kfc_config.server_timeout_sec,
+            'graceful_timeout': kfc_config.server_graceful_timeout_sec,
+            # a recycled worker would lose in memory state, never recycle
+            'max_requests': 0,
+            'post_worker_init': start_worker_services}
+
+
+class KfAdapterServer(BaseApplication):
+    """
+    This is a class for running a WSGI app with gunicorn settings given as a
+    dict instead of command line arguments.
+
+    Attributes: None
+    """
+
+    def __init__(self, app, options):
+        """
+        The constructor for KfAdapterServer class.
+
+        Parameters:
+            app: WSGI app to serve
+            options: dict of gunicorn settings
+         """
+        self.application = app
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+
+def main():
+    """
+    Function for serving kfadapter_main.APP until the server is stopped
+
+    Args: None
+
+    Returns: None
+
+    """
+    kfc_config = kfadapter_conf.KfConfiguration.get_instance()
+    if kfc_config.is_config_loaded_properly() is False:
+        print("Config not loaded properly")
+        return
+    KfAdapterServer(kfadapter_main.APP, server_options(kfc_config)).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+"""kfadapter_submission.py
+
+This module is for submitting pipeline runs asynchronously from a bounded
+queue served by a pool of worker threads
+
+"""
+
+import time
+import uuid
+import queue
+import logging
+import traceback
+from collections import OrderedDict
+from threading import Lock, Thread
+
+from kfadapter.kfadapter_metrics import METRICS
+
+TICKET_QUEUED = 'queued'
+TICKET_RUNNING = 'running'
+TICKET_SUBMITTED = 'submitted'
+TICKET_FAILED = 'failed'
+
+
+class SubmissionQueue:
+    """
+    This is a class for queueing run submissions and handing them to worker
+    threads. Every accepted submission gets a ticket whose status can be
+    queried until it is dropped, oldest finished tickets first, once more
+    than max_tickets are kept.
+
+    Attributes: None
+    """
+
+    def __init__(self, handler, workers=4, maxsize=1000, max_tickets=10000, logger=None):
+        """
+        The constructor for SubmissionQueue class.
+
+        Parameters:
+            handler: function of trainingjob id, request body and idempotency key
+                     submitting the run, returns run dict and raises ValueError
+                     for invalid requests
+            workers: number of worker threads
+            maxsize: maximum number of submissions waiting in the queue
+            max_tickets: maximum number of tickets kept for status queries
+            logger: logger to be used, module logger if not given
+         """
+        self.handler = handler
+        self.workers = workers
+        self.max_tickets = max_tickets
+        self.logger = logger or logging.getLogger(__name__)
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.lock = Lock()
+        # ticket -> status dict, ordered from oldest to newest
+        self.tickets = OrderedDict()
+        self.threads = []
+
+    def submit(self, trainingjob_id, req, idempotency_key=None):
+        """
+        Function for queueing a run submission
+
+        Args:
+            trainingjob_id: trainingjob id of the run
+            req: execution request body
+            idempotency_key: idempotency key of the submission, if any
+
+        Returns: ticket of the submission
+
+        Exceptions:
+            queue.Full: queue has no room for the submission
+
+        """
+        ticket = uuid.uuid4().hex
+        with self.lock:
+            self.tickets[ticket] = {'ticket': ticket, 'trainingjob_id': trainingjob_id,
+                                    'status': TICKET_QUEUED}
+            self._drop_finished_tickets()
+        try:
+            self.queue.put_nowait((ticket, trainingjob_id, req, idempotency_key,
+                                 time.monotonic()))
+        except queue.Full:
+            with self.lock:
+                del self.tickets[ticket]
+            METRICS.inc('submission_queue_rejected')
+            raise
+        METRICS.set_gauge('submission_queue_depth', self.queue.qsize())
+        return ticket
+
+    def _drop_finished_tickets(self):
+        # caller holds self.lock
+        if len(self.tickets) <= self.max_tickets:
+            return
+        for ticket in list(self.tickets):
+            if self.tickets[ticket]['status'] in (TICKET_SUBMITTED, TICKET_FAILED):
+                del self.tickets[ticket]
+                if len(self.tickets) <= self.max_tickets:
+                    return
+
+    def status(self, ticket):
+        """
+        Function for giving status of a submission
+
+        Args:
+            ticket: ticket of the submission
+
+        Returns: status dict of the ticket or None if ticket is unknown
+
+        """
+        with self.lock:
+            ticket_status = self.tickets.get(ticket)
+            return dict(ticket_status) if ticket_status is not None else None
+
+    def _update(self, ticket, **fields):
+        with self.lock:
+            if ticket in self.tickets:
+                self.tickets[ticket].update(fields)
+
+    def process(self, ticket, trainingjob_id, req, idempotency_key, enqueued_at):
+        """
+        Function for submitting one queued run and recording its outcome
+
+        Args:
+            ticket: ticket of the submission
+            trainingjob_id: trainingjob id of the run
+            req: execution request body
+            idempotency_key: idempotency key of the submission, if any
+            enqueued_at: monotonic time the submission was queued at
+
+        Returns: None
+
+        """
+        start = time.monotonic()
+        METRICS.observe('submission_queue_wait_seconds', start - enqueued_at)
+        self._update(ticket, status=TICKET_RUNNING)
+        try:
+            run_dict = self.handler(trainingjob_id, req, idempotency_key)
+            self._update(ticket, status=TICKET_SUBMITTED, run=run_dict,
+                         run_id=run_dict['run_id'])
+            METRICS.inc('submission_succeeded')
+        except ValueError as err:
+            self.logger.error(err)
+            self._update(ticket, status=TICKET_FAILED, message=str(err))
+            METRICS.inc('submission_failed')
+        except: # pylint: disable=bare-except
+            tbk = traceback.format_exc()
+            self.logger.error(tbk)
+            self._update(ticket, status=TICKET_FAILED, message="Unsupported error from Kubeflow")
+            METRICS.inc('submission_failed')
+        METRICS.observe('submission_service_seconds', time.monotonic() - start)
+
+    def run(self):
+        """
+        Function for processing queued submissions until None is taken from queue
+
+        Args: None
+
+        Returns: None
+
+        """
+        while True:
+            item = self.queue.get()
+            METRICS.set_gauge('submission_queue_depth', self.queue.qsize())
+            if item is None:
+                return
+            self.process(*item)
+
+    def start(self):
+        """
+        Function for starting the worker threads
+
+        Args: None
+
+        Returns: None
+
+        """
+        for index in range(self.workers):
+            thread = Thread(target=self.run, name="run-submission-%d" % index, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        """
+        Function for stopping the worker threads once the queued submissions are done
+
+        Args: None
+
+        Returns: None
+
+        """
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
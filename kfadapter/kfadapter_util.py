@@ -22,16 +22,13 @@ by the main and other modules
 
 """
 
-import traceback
 import string
 import time
-import json
-import requests
 from random import choices
 
 from flask_api import status
 
-from kfadapter import kfadapter_conf
+from kfadapter.kfadapter_metrics import METRICS
 
 class BadRequest(Exception):
     """
@@ -90,57 +87,39 @@ def random_suffix():
     """
     return ''.join(choices(string.ascii_lowercase + string.digits, k=10))
 
-def wait_status_thread(name, kfc_kfconnect):
+def timed_stage(timings, stage, func, *args):
     """
-     Thread Function for notify the status of all pipeline run
-    to training manager
+        Function for calling func and recording its duration
 
-    Args:
-        kfc_config: KfAdapter_config object
+        Args:
+            timings: dict in which duration in seconds is stored under stage
+            stage: name of the stage
+            func: function to call
+            args: arguments of func
+
+        Returns: return value of func
+
+    """
+    start = time.monotonic()
+    try:
+        return func(*args)
+    finally:
+        duration = time.monotonic() - start
+        timings[stage] = duration
+        METRICS.observe('run_submit_' + stage + '_seconds', duration)
+
+def format_server_timing(timings):
+    """
+        Function for formatting stage timings as Server-Timing header value
+
+        Args:
+            timings: dict of stage name to duration in seconds
 
-    Returns:None
+        Returns: header value with durations in milliseconds
 
     """
-    #pylint: disable=unused-argument
-    #pylint: disable=maybe-no-member
-    kfc_config = kfadapter_conf.KfConfiguration.get_instance()
-    logger = kfc_config.logger
-    while True:
-        with kfadapter_conf.LOCK:
-            dict_copy = kfadapter_conf.TRAINING_DICT.copy()
-            for i in dict_copy:
-                try:
-                    run = kfc_kfconnect.get_kf_run(i)
-                    run_status = run.state
-                except: # pylint: disable=bare-except
-                    run_status = "Manual reconcile"
-
-                if run_finished(run_status) or run_status == "Manual reconcile":
-                    run_dict = {}
-                    run_dict['run_id'] = i
-                    run_dict['run_status'] = run_status
-                    run_dict['trainingjob_id'] = kfadapter_conf.TRAINING_DICT[i]
-                    logger.info("POSTING to training manager")
-                    logger.info(run_dict)
-                    payload = json.dumps(run_dict)
-                    url = "http://"+kfc_config.trainingmgr_dict['trainingmgr_host']+":"+\
-                                kfc_config.trainingmgr_dict['trainingmgr_port']\
-                                + "/trainingjob/pipelineNotification"
-                    logger.debug(url)
-                    headers = {'content-type': 'application/json', 'Accept-Charset': 'UTF-8'}
-                    try:
-                        response = requests.post(url, data=payload, headers=headers)
-                        logger.info(response.json)
-                    except requests.exceptions.ConnectionError as warn:
-                        logger.warning("REST Server not running at %s", url)
-                        logger.warning(warn)
-                    except: # pylint: disable=bare-except
-                        tbk = traceback.format_exc()
-                        logger.error(tbk)
-                    del kfadapter_conf.TRAINING_DICT[i]
-                    break
-                time.sleep(1)
-        time.sleep(kfc_config.run_status_polling_interval_sec)
+    return ', '.join('{};dur={:.1f}'.format(stage, duration * 1000)
+                     for stage, duration in timings.items())
 
 def check_list(data, compare_key):
     '''
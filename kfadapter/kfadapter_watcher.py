@@ -0,0 +1,237 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+"""kfadapter_watcher.py
+
+This module is for following the status of pipeline runs through a
+Kubernetes watch on the Argo Workflows backing them
+
+"""
+
+import logging
+import traceback
+from os import getenv
+from threading import Event, Thread
+
+from kubernetes import client, watch
+from kubernetes.client.rest import ApiException
+
+from kfadapter.kfadapter_metrics import METRICS
+
+WORKFLOW_GROUP = "argoproj.io"
+WORKFLOW_VERSION = "v1alpha1"
+WORKFLOW_PLURAL = "workflows"
+# label kubeflow pipelines puts on the workflow of a run
+RUN_ID_LABEL = "pipeline/runid"
+# workflow phase -> kubeflow run state, as mapped by the kubeflow api server
+WORKFLOW_PHASES = {'Pending': 'PENDING', 'Running': 'RUNNING', 'Succeeded': 'SUCCEEDED',
+                   'Failed': 'FAILED', 'Error': 'FAILED'}
+SERVICE_ACCOUNT_DIR = "/var/run/secrets/kubernetes.io/serviceaccount"
+HTTP_GONE = 410
+
+
+def make_api_client(api_url=None, token_path=None, ca_cert_path=None):
+    """
+    Function for building a kubernetes api client, in cluster service account
+    settings are used for what is not given
+
+    Args:
+        api_url: url of the kubernetes api server
+        token_path: file holding the bearer token, no authentication if missing
+        ca_cert_path: file holding the CA certificate of the api server
+
+    Returns: kubernetes ApiClient
+
+    """
+    configuration = client.Configuration()
+    configuration.host = api_url or "https://{}:{}".format(
+        getenv('KUBERNETES_SERVICE_HOST'), getenv('KUBERNETES_SERVICE_PORT', '443'))
+    token_path = token_path or SERVICE_ACCOUNT_DIR + "/token"
+    try:
+        with open(token_path, encoding='utf-8') as token_file:
+            configuration.api_key['authorization'] = token_file.read().strip()
+        configuration.api_key_prefix['authorization'] = 'Bearer'
+    except OSError:
+        pass
+    configuration.ssl_ca_cert = ca_cert_path or SERVICE_ACCOUNT_DIR + "/ca.crt"
+    return client.ApiClient(configuration)
+
+
+class WorkflowWatcher:
+    """
+    This is a class for turning changes of the Argo Workflows of pipeline
+    runs into run status callbacks. Workflows are listed once, then watched
+    from the resourceVersion of the list. Every event and bookmark moves the
+    resourceVersion forward, so an expired or broken watch resumes without
+    replaying history, and only a 410 Gone answer leads to a new list.
+
+    Attributes: None
+    """
+
+    def __init__(self, api_client, namespace, on_status, watch_timeout=300,
+                 retry_interval=1, max_retry_interval=30, logger=None):
+        """
+        The constructor for WorkflowWatcher class.
+
+        Parameters:
+            api_client: kubernetes ApiClient, see make_api_client
+            namespace: namespace of the workflows
+            on_status: function called with run id and kubeflow run state,
+                       e.g. RunStatusPoller.observe_status
+            watch_timeout: seconds after which the api server ends one watch request
+            retry_interval: seconds before the first retry of a failed request
+            max_retry_interval: upper bound of seconds between retries
+            logger: logger to be used, module logger if not given
+         """
+        self.api = client.CustomObjectsApi(api_client)
+        self.namespace = namespace
+        self.on_status = on_status
+        self.watch_timeout = watch_timeout
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.logger = logger or logging.getLogger(__name__)
+        self.resource_version = None
+        self.stop_event = Event()
+        self.watch = None
+        self.thread = None
+
+    def _list_kwargs(self):
+        return {'group': WORKFLOW_GROUP, 'version': WORKFLOW_VERSION,
+                'namespace': self.namespace, 'plural': WORKFLOW_PLURAL,
+                'label_selector': RUN_ID_LABEL}
+
+    def handle(self, workflow):
+        """
+        Function for reporting the run status of a workflow
+
+        Args:
+            workflow: workflow resource as dict
+
+        Returns: None
+
+        """
+        run_id = ((workflow.get('metadata') or {}).get('labels') or {}).get(RUN_ID_LABEL)
+        run_status = WORKFLOW_PHASES.get((workflow.get('status') or {}).get('phase'))
+        if run_id and run_status:
+            self.on_status(run_id, run_status)
+
+    def relist(self):
+        """
+        Function for listing all workflows, reporting their status and taking
+        the resourceVersion of the list to watch from
+
+        Args: None
+
+        Returns: number of listed workflows
+
+        """
+        workflows = self.api.list_namespaced_custom_object(**self._list_kwargs())
+        for workflow in workflows.get('items') or []:
+            self.handle(workflow)
+        self.resource_version = workflows['metadata']['resourceVersion']
+        METRICS.inc('workflow_watch_relists')
+        return len(workflows.get('items') or [])
+
+    def watch_once(self):
+        """
+        Function for running one watch request from the current resourceVersion
+        until the api server ends it
+
+        Args: None
+
+        Returns: number of received events
+
+        Exceptions:
+            ApiException with status 410 when the resourceVersion has expired
+
+        """
+        self.watch = watch.Watch()
+        received = 0
+        for event in self.watch.stream(self.api.list_namespaced_custom_object,
+                                       resource_version=self.resource_version,
+                                       timeout_seconds=int(self.watch_timeout),
+                                       allow_watch_bookmarks=True, **self._list_kwargs()):
+            obj = event['raw_object']
+            version = (obj.get('metadata') or {}).get('resourceVersion')
+            if event['type'] in ('ADDED', 'MODIFIED'):
+                self.handle(obj)
+            if version:
+                self.resource_version = version
+            received += 1
+            METRICS.inc('workflow_watch_events')
+        return received
+
+    def run(self):
+        """
+        Function for watching workflows until stop is called, requests failing
+        for other reasons than an expired resourceVersion are retried with
+        exponential backoff
+
+        Args: None
+
+        Returns: None
+
+        """
+        failures = 0
+        while not self.stop_event.is_set():
+            try:
+                if self.resource_version is None:
+                    self.relist()
+                self.watch_once()
+                failures = 0
+                continue
+            except ApiException as err:
+                if err.status == HTTP_GONE:
+                    self.logger.info("Workflow watch expired, listing workflows again")
+                    self.resource_version = None
+                    continue
+                self.logger.error("Workflow watch failed: %s", err)
+            except: # pylint: disable=bare-except
+                tbk = traceback.format_exc()
+                self.logger.error(tbk)
+            failures += 1
+            METRICS.inc('workflow_watch_failures')
+            self.stop_event.wait(min(self.max_retry_interval,
+                                     self.retry_interval * (2 ** (failures - 1))))
+
+    def start(self):
+        """
+        Function for starting the background watch thread
+
+        Args: None
+
+        Returns: None
+
+        """
+        self.thread = Thread(target=self.run, name="workflow-watch", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Function for stopping the background watch thread, a running watch
+        request ends at the next event or at its timeout
+
+        Args: None
+
+        Returns: None
+
+        """
+        self.stop_event.set()
+        if self.watch is not None:
+            self.watch.stop()
+        if self.thread is not None:
+            self.thread.join(self.watch_timeout)
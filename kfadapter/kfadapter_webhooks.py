@@ -0,0 +1,212 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+"""kfadapter_webhooks.py
+
+This module is for delivering run state transitions to webhooks registered
+by subscribers
+
+"""
+
+import time
+import uuid
+import logging
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from kfadapter.kfadapter_metrics import METRICS
+
+
+class WebhookDispatcher:
+    """
+    This is a class for fanning out run events to subscribed callback urls.
+    Every subscription has its own bounded queue which is drained in order by
+    at most one worker of a shared pool at a time, so a slow subscriber only
+    delays its own deliveries. Events are dropped for a subscriber whose
+    queue is full.
+
+    Attributes: None
+    """
+
+    def __init__(self, notifier, workers=8, max_queued=1000, max_subscriptions=100,
+                 logger=None):
+        """
+        The constructor for WebhookDispatcher class.
+
+        Parameters:
+            notifier: TrainingMgrNotifier whose post is used for delivery
+            workers: number of concurrent deliveries
+            max_queued: maximum number of undelivered events per subscription
+            max_subscriptions: maximum number of subscriptions
+            logger: logger to be used, module logger if not given
+         """
+        self.notifier = notifier
+        self.max_queued = max_queued
+        self.max_subscriptions = max_subscriptions
+        self.logger = logger or logging.getLogger(__name__)
+        self.lock = Lock()
+        # subscription_id -> subscription dict, '_queue' and '_draining' are internal
+        self.subscriptions = {}
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="webhook")
+
+    def subscribe(self, callback_url, states=None, trainingjob_id=None):
+        """
+        Function for registering a callback url
+
+        Args:
+            callback_url: url events are posted to
+            states: only deliver events with one of these run states, all if not given
+            trainingjob_id: only deliver events of this trainingjob, all if not given
+
+        Returns: subscription dict or None if max_subscriptions is reached
+
+        """
+        subscription = {'subscription_id': uuid.uuid4().hex, 'callback_url': callback_url,
+                        'states': sorted(states) if states else None,
+                        'trainingjob_id': trainingjob_id, 'created_at': time.time(),
+                        'delivered': 0, 'failed': 0, 'dropped': 0,
+                        '_queue': deque(), '_draining': False}
+        with self.lock:
+            if len(self.subscriptions) >= self.max_subscriptions:
+                return None
+            self.subscriptions[subscription['subscription_id']] = subscription
+            METRICS.set_gauge('webhook_subscriptions', len(self.subscriptions))
+        return self._describe(subscription)
+
+    def unsubscribe(self, subscription_id):
+        """
+        Function for removing a subscription, undelivered events are discarded
+
+        Args:
+            subscription_id: id given by subscribe
+
+        Returns: True if the subscription existed
+
+        """
+        with self.lock:
+            subscription = self.subscriptions.pop(subscription_id, None)
+            if subscription is not None:
+                subscription['_queue'].clear()
+            METRICS.set_gauge('webhook_subscriptions', len(self.subscriptions))
+        return subscription is not None
+
+    def get(self, subscription_id):
+        """
+        Function for describing one subscription
+
+        Args:
+            subscription_id: id given by subscribe
+
+        Returns: subscription dict or None
+
+        """
+        with self.lock:
+            subscription = self.subscriptions.get(subscription_id)
+            return self._describe(subscription) if subscription is not None else None
+
+    def list(self):
+        """
+        Function for describing all subscriptions
+
+        Args: None
+
+        Returns: list of subscription dicts, oldest first
+
+        """
+        with self.lock:
+            return [self._describe(subscription) for subscription in self.subscriptions.values()]
+
+    @staticmethod
+    def _describe(subscription):
+        description = {key: value for key, value in subscription.items()
+                       if not key.startswith('_')}
+        description['queued'] = len(subscription['_queue'])
+        return description
+
+    @staticmethod
+    def _matches(subscription, event):
+        return (not subscription['states'] or event['run_status'] in subscription['states']) \
+            and (not subscription['trainingjob_id'] or
+                 event['trainingjob_id'] == subscription['trainingjob_id'])
+
+    def dispatch(self, event):
+        """
+        Function for queueing an event for every matching subscription, it
+        does not wait for any delivery
+
+        Args:
+            event: run event dict of RunEventBus
+
+        Returns: number of subscriptions the event was queued for
+
+        """
+        queued = 0
+        to_drain = []
+        with self.lock:
+            for subscription in self.subscriptions.values():
+                if not self._matches(subscription, event):
+                    continue
+                if len(subscription['_queue']) >= self.max_queued:
+                    subscription['dropped'] += 1
+                    METRICS.inc('webhook_dropped')
+                    continue
+                subscription['_queue'].append(event)
+                queued += 1
+                if not subscription['_draining']:
+                    subscription['_draining'] = True
+                    to_drain.append(subscription)
+        for subscription in to_drain:
+            self.executor.submit(self._drain, subscription)
+        return queued
+
+    def _drain(self, subscription):
+        while True:
+            with self.lock:
+                if not subscription['_queue']:
+                    subscription['_draining'] = False
+                    return
+                event = subscription['_queue'].popleft()
+            payload = dict(event, subscription_id=subscription['subscription_id'])
+            try:
+                response = self.notifier.post(subscription['callback_url'], payload, 'webhook')
+                delivered = response is not None and 200 <= response.status_code < 300
+            except: # pylint: disable=bare-except
+                tbk = traceback.format_exc()
+                self.logger.error(tbk)
+                delivered = False
+            with self.lock:
+                subscription['delivered' if delivered else 'failed'] += 1
+            if delivered:
+                METRICS.inc('webhook_delivered')
+                METRICS.observe('webhook_delivery_lag_seconds', time.time() - event['time'])
+            else:
+                METRICS.inc('webhook_failed')
+                self.logger.error("Webhook %s failed for event %s", subscription['callback_url'],
+                                  event['id'])
+
+    def stop(self):
+        """
+        Function for waiting for queued deliveries and stopping the workers
+
+        Args: None
+
+        Returns: None
+
+        """
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,106 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+
+import time
+from threading import Thread
+
+import pytest
+
+from kfadapter import kfadapter_conf
+from kfadapter.kfadapter_admission import AdmissionController, AdmissionRejected
+from kfadapter.kfadapter_metrics import METRICS
+
+
+def wait_until(condition):
+    for _ in range(200):
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class Test_AdmissionController:
+    def setup_method(self):
+        METRICS.reset()
+        kfadapter_conf.TRAINING_DICT.clear()
+
+    def teardown_method(self):
+        kfadapter_conf.ADMISSION = None
+        kfadapter_conf.TRAINING_DICT.clear()
+
+    def test_admits_below_limit_and_counts_tracked_runs(self):
+        kfadapter_conf.TRAINING_DICT['recovered-run'] = 'job0'
+        admission = AdmissionController(2, timeout=0.05)
+        admission.acquire()
+
+        assert admission.in_flight() == 2
+        with pytest.raises(AdmissionRejected):
+            admission.acquire()
+        assert METRICS.get('admission_admitted') == 1
+        assert METRICS.get('admission_queued') == 1
+        assert METRICS.get('admission_rejected') == 1
+
+    def test_rejects_when_queue_is_full(self):
+        admission = AdmissionController(0, max_queued=0)
+        with pytest.raises(AdmissionRejected):
+            admission.acquire()
+        assert METRICS.get('admission_rejected') == 1
+
+    def test_waiters_are_admitted_by_priority(self):
+        admission = AdmissionController(1, timeout=5)
+        admission.acquire()
+        admitted = []
+
+        def submit(priority):
+            admission.acquire(priority)
+            admitted.append(priority)
+
+        threads = []
+        for priority in [1, 5, 3]:
+            thread = Thread(target=submit, args=(priority,))
+            thread.start()
+            threads.append(thread)
+            assert wait_until(lambda: len(admission.waiters) == len(threads))
+
+        for count in range(1, 4):
+            admission.cancel()
+            assert wait_until(lambda: len(admitted) == count)
+        for thread in threads:
+            thread.join()
+
+        assert admitted == [5, 3, 1]
+        assert METRICS.get('admission_wait_seconds')['count'] == 3
+
+    def test_slot_is_handed_over_to_tracked_run_and_freed_when_untracked(self):
+        admission = AdmissionController(1, timeout=5)
+        kfadapter_conf.ADMISSION = admission
+        admission.acquire()
+        with kfadapter_conf.LOCK:
+            kfadapter_conf.track_run('run-1', 'job1')
+        assert admission.reserved == 0
+        assert admission.in_flight() == 1
+
+        waiter = Thread(target=admission.acquire)
+        waiter.start()
+        assert wait_until(lambda: len(admission.waiters) == 1)
+        with kfadapter_conf.LOCK:
+            kfadapter_conf.untrack_run('run-1')
+        waiter.join(1)
+
+        assert not waiter.is_alive()
+        assert admission.in_flight() == 1
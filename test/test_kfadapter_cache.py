@@ -0,0 +1,187 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+
+import time
+from threading import Thread
+
+from kfp_server_api.models.v2beta1_run import V2beta1Run
+
+from kfadapter.kfadapter_cache import TtlLruCache, SingleFlight, RunStateCache
+from kfadapter.kfadapter_metrics import METRICS
+
+
+class Test_TtlLruCache:
+    def setup_method(self):
+        METRICS.reset()
+
+    def test_hit_and_miss_counters(self):
+        cache = TtlLruCache(maxsize=2, ttl=60, name='test')
+        assert cache.get('key') is None
+        cache.put('key', 'value')
+        assert cache.get('key') == 'value'
+
+        assert METRICS.get('test_cache_hits') == 1
+        assert METRICS.get('test_cache_misses') == 1
+
+    def test_lru_eviction(self):
+        cache = TtlLruCache(maxsize=2, ttl=60, name='test')
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+        assert METRICS.get('test_cache_evictions') == 1
+
+    def test_ttl_expiry(self):
+        cache = TtlLruCache(maxsize=2, ttl=0.01, name='test')
+        cache.put('a', 1)
+        time.sleep(0.02)
+
+        assert cache.get('a') is None
+        assert len(cache) == 0
+
+    def test_get_or_load_does_not_cache_none(self):
+        cache = TtlLruCache(maxsize=2, ttl=60, name='test')
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return None
+
+        assert cache.get_or_load('a', loader) is None
+        assert cache.get_or_load('a', loader) is None
+        assert len(loads) == 2
+        assert cache.get_or_load('b', lambda: 'value') == 'value'
+        assert cache.get_or_load('b', loader) == 'value'
+
+    def test_invalidate_where(self):
+        cache = TtlLruCache(maxsize=10, ttl=60, name='test')
+        cache.put(('pipeline', 'p1'), 1)
+        cache.put(('pipeline', 'p2'), 2)
+        cache.put(('experiment', 'e1'), 3)
+
+        assert cache.invalidate_where(lambda key, value: key[0] == 'pipeline') == 2
+        assert len(cache) == 1
+
+
+class Test_SingleFlight:
+    def setup_method(self):
+        METRICS.reset()
+
+    def test_concurrent_calls_share_result(self):
+        flight = SingleFlight('test')
+        calls = []
+        results = []
+
+        def load():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'value'
+
+        threads = [Thread(target=lambda: results.append(flight.do('key', load)))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == ['value'] * 4
+        assert METRICS.get('test_coalesced') == 3
+        assert flight.calls == {}
+
+    def test_exception_is_shared_and_next_call_runs_again(self):
+        flight = SingleFlight('test')
+        errors = []
+
+        def fail():
+            time.sleep(0.1)
+            raise ValueError('failed')
+
+        def call():
+            try:
+                flight.do('key', fail)
+            except ValueError as err:
+                errors.append(err)
+
+        threads = [Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(errors) == 3
+        assert flight.do('key', lambda: 'value') == 'value'
+
+
+def make_run(run_id, state):
+    run = V2beta1Run()
+    run.run_id = run_id
+    run.state = state
+    return run
+
+
+class Test_RunStateCache:
+    def setup_method(self):
+        METRICS.reset()
+
+    def test_fresh_entry_hits_and_old_entry_misses(self):
+        cache = RunStateCache()
+        cache.put(make_run('run-1', 'RUNNING'))
+        cache.put(make_run('run-2', 'RUNNING'), time.time() - 10)
+
+        run, age = cache.get('run-1', 5)
+        assert run.state == 'RUNNING'
+        assert age < 5
+        assert cache.get('run-2', 5) is None
+        assert cache.get('run-3', 5) is None
+
+        assert METRICS.get('run_state_cache_hits') == 1
+        assert METRICS.get('run_state_cache_misses') == 2
+        assert METRICS.get('run_state_cache_hit_ratio') == 1 / 3
+        assert METRICS.get('run_state_cache_age_seconds')['count'] == 1
+
+    def test_finished_run_never_goes_stale(self):
+        cache = RunStateCache()
+        cache.put(make_run('run-1', 'SUCCEEDED'), time.time() - 3600)
+
+        run, age = cache.get('run-1', 5)
+        assert run.state == 'SUCCEEDED'
+        assert age >= 3600
+
+    def test_older_fetch_does_not_overwrite_newer(self):
+        cache = RunStateCache()
+        now = time.time()
+        cache.put(make_run('run-1', 'SUCCEEDED'), now)
+        cache.put(make_run('run-1', 'RUNNING'), now - 1)
+
+        assert cache.get('run-1', 5)[0].state == 'SUCCEEDED'
+
+    def test_eviction_and_invalidate(self):
+        cache = RunStateCache(maxsize=2)
+        for run_id in ['run-1', 'run-2', 'run-3']:
+            cache.put(make_run(run_id, 'RUNNING'))
+
+        assert len(cache) == 2
+        assert cache.get('run-1', 5) is None
+        cache.invalidate('run-2')
+        assert cache.get('run-2', 5) is None
+        assert cache.get('run-3', 5) is not None
@@ -0,0 +1,96 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+
+import time
+from threading import Thread
+
+from kfadapter.kfadapter_events import RunEventBus
+from kfadapter.kfadapter_metrics import METRICS
+
+
+class Test_RunEventBus:
+    def setup_method(self):
+        METRICS.reset()
+
+    def test_unchanged_state_is_not_published(self):
+        bus = RunEventBus()
+        assert bus.publish('run-1', 'RUNNING', 'job-1')['id'] == 1
+        assert bus.publish('run-1', 'RUNNING', 'job-1') is None
+        event = bus.publish('run-1', 'SUCCEEDED', 'job-1', True)
+
+        assert event['id'] == 2
+        assert event['finished']
+        assert bus.state('run-1') == ('SUCCEEDED', True)
+        assert METRICS.get('run_events_published') == 2
+
+    def test_wait_returns_when_run_finishes(self):
+        bus = RunEventBus()
+        bus.publish('run-1', 'RUNNING')
+        publisher = Thread(target=lambda: (time.sleep(0.05),
+                                           bus.publish('run-1', 'FAILED', final=True)))
+        publisher.start()
+
+        start = time.monotonic()
+        assert bus.wait('run-1', 5) == ('FAILED', True)
+        assert time.monotonic() - start < 1
+        publisher.join()
+        assert bus.waiters == {}
+        assert METRICS.get('run_waiters') == 0
+
+    def test_wait_times_out_and_finished_run_returns_at_once(self):
+        bus = RunEventBus()
+        bus.publish('run-1', 'RUNNING')
+        assert bus.wait('run-1', 0.01) == ('RUNNING', False)
+        assert bus.wait('run-2', 0.01) is None
+
+        bus.publish('run-1', 'SUCCEEDED', final=True)
+        assert bus.wait('run-1', 5) == ('SUCCEEDED', True)
+
+    def test_many_waiters_are_released_by_one_publish(self):
+        bus = RunEventBus()
+        results = []
+        waiters = [Thread(target=lambda: results.append(bus.wait('run-1', 5))) for _ in range(20)]
+        for waiter in waiters:
+            waiter.start()
+        while bus.waiting < 20:
+            time.sleep(0.01)
+
+        bus.publish('run-1', 'SUCCEEDED', final=True)
+        for waiter in waiters:
+            waiter.join()
+        assert results == [('SUCCEEDED', True)] * 20
+
+    def test_events_after_resumes_from_last_id(self):
+        bus = RunEventBus(buffer_size=2)
+        for run_id in ['run-1', 'run-2', 'run-3']:
+            bus.publish(run_id, 'RUNNING')
+
+        assert [event['run_id'] for event in bus.events_after(0, 0)] == ['run-2', 'run-3']
+        assert [event['run_id'] for event in bus.events_after(2, 0)] == ['run-3']
+        assert bus.events_after(3, 0.01) == []
+        # ids from before a restart start over from the buffer
+        assert len(bus.events_after(100, 0)) == 2
+
+    def test_events_after_wakes_up_on_publish(self):
+        bus = RunEventBus()
+        publisher = Thread(target=lambda: (time.sleep(0.05), bus.publish('run-1', 'RUNNING')))
+        publisher.start()
+
+        events = bus.events_after(0, 5)
+        publisher.join()
+        assert [event['run_id'] for event in events] == ['run-1']
@@ -0,0 +1,115 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+
+import time
+from threading import Thread
+
+from kfadapter import kfadapter_conf
+from kfadapter.kfadapter_idempotency import SubmissionDeduplicator
+from kfadapter.kfadapter_metrics import METRICS
+
+
+class Test_SubmissionDeduplicator:
+    def setup_method(self):
+        METRICS.reset()
+        self.calls = 0
+
+    def teardown_method(self):
+        kfadapter_conf.TRAINING_DICT.clear()
+        kfadapter_conf.JOB_RUNS.clear()
+        kfadapter_conf.RUN_TRACKED_AT.clear()
+        kfadapter_conf.SUBMISSIONS = None
+
+    def submit(self, delay=0):
+        self.calls += 1
+        time.sleep(delay)
+        return {'trainingjob_id': 'job', 'run_id': 'run-%d' % self.calls}
+
+    def test_retry_within_window_gets_first_run(self):
+        dedup = SubmissionDeduplicator(60)
+        first, first_replayed = dedup.submit('job', None, self.submit)
+        second, second_replayed = dedup.submit('job', None, self.submit)
+
+        assert first == second == {'trainingjob_id': 'job', 'run_id': 'run-1'}
+        assert not first_replayed
+        assert second_replayed
+        assert self.calls == 1
+        assert METRICS.get('idempotent_replays') == 1
+
+    def test_new_idempotency_key_submits_again(self):
+        dedup = SubmissionDeduplicator(60)
+        dedup.submit('job', 'key-1', self.submit)
+        run_dict, replayed = dedup.submit('job', 'key-2', self.submit)
+
+        assert run_dict['run_id'] == 'run-2'
+        assert not replayed
+
+    def test_tracked_run_is_found_through_reverse_index(self):
+        with kfadapter_conf.LOCK:
+            kfadapter_conf.track_run('recovered-run', 'job')
+        dedup = SubmissionDeduplicator(60)
+        run_dict, replayed = dedup.submit('job', None, self.submit)
+
+        assert replayed
+        assert run_dict['run_id'] == 'recovered-run'
+        assert self.calls == 0
+
+        with kfadapter_conf.LOCK:
+            kfadapter_conf.untrack_run('recovered-run')
+        assert 'job' not in kfadapter_conf.JOB_RUNS
+
+    def test_finished_run_is_not_replayed(self):
+        dedup = SubmissionDeduplicator(60)
+        kfadapter_conf.SUBMISSIONS = dedup
+
+        def submit_scheduled():
+            run_dict = self.submit()
+            run_dict['run_status'] = "scheduled"
+            with kfadapter_conf.LOCK:
+                kfadapter_conf.track_run(run_dict['run_id'], 'job')
+            return run_dict
+
+        dedup.submit('job', 'key-1', submit_scheduled)
+        dedup.submit('job', 'key-2', submit_scheduled)
+        # key-1 run is still tracked though the trainingjob maps to the key-2 run
+        assert dedup.submit('job', 'key-1', submit_scheduled)[0]['run_id'] == 'run-1'
+
+        with kfadapter_conf.LOCK:
+            kfadapter_conf.untrack_run('run-1')
+        run_dict, replayed = dedup.submit('job', 'key-1', submit_scheduled)
+
+        assert not replayed
+        assert run_dict['run_id'] == 'run-3'
+        assert self.calls == 3
+
+    def test_concurrent_duplicates_share_one_submission(self):
+        dedup = SubmissionDeduplicator(60)
+        results = []
+
+        def submit_job():
+            results.append(dedup.submit('job', None, lambda: self.submit(0.1)))
+
+        threads = [Thread(target=submit_job) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert self.calls == 1
+        assert {result[0]['run_id'] for result in results} == {'run-1'}
+        assert [result[1] for result in results].count(False) == 1
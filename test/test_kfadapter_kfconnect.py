@@ -17,9 +17,20 @@
 # ==================================================================================
 
 import kfp_server_api
-from mock import patch
+from mock import patch, MagicMock
 
-from kfadapter.kfadapter_kfconnect import KfConnect
+import json
+import time
+from datetime import datetime, timezone
+from threading import Thread
+
+from kfp_server_api.models.v2beta1_list_pipeline_versions_response import V2beta1ListPipelineVersionsResponse as ApiListPipelineVersionsResponse
+from kfp_server_api.models.v2beta1_pipeline_version import V2beta1PipelineVersion as ApiPipelineVersion
+from kfp_server_api.models.v2beta1_run import V2beta1Run as ApiRun
+from kfp_server_api.models.v2beta1_list_runs_response import V2beta1ListRunsResponse as ApiListRunsResponse
+
+from kfadapter.kfadapter_kfconnect import KfConnect, build_kf_filter
+from kfadapter.kfadapter_metrics import METRICS
 
 from .fake_kfp import FakeKfp
 from .fake_kfp import FakeNegativeKfp
@@ -100,6 +111,228 @@ class Test_KfConnect:
         , version_id='version_id')
     
 
+    def test_build_kf_filter(self):
+        assert None == build_kf_filter([])
+        run_filter = json.loads(build_kf_filter([('state', 'IN', ['RUNNING', 'FAILED']),
+                                                 ('display_name', 'EQUALS', 'name')]))
+        assert run_filter == {'predicates': [
+            {'operation': 8, 'key': 'state', 'stringValues': {'values': ['RUNNING', 'FAILED']}},
+            {'operation': 1, 'key': 'display_name', 'stringValue': 'name'}]}
+
+    def test_get_kf_runs_falls_back_to_get_run(self):
+        # FakeKfp has no list_runs and get_run returns None
+        assert {} == self.__KFCONNECT.get_kf_runs(['run-1', 'run-2'])
+
+    def test_get_kf_runs_gets_few_runs_directly(self):
+        kfp_client = MagicMock()
+        self.__KFCONNECT.set_kf_client(kfp_client)
+
+        runs = self.__KFCONNECT.get_kf_runs(['run-1'])
+
+        assert list(runs) == ['run-1']
+        kfp_client.list_runs.assert_not_called()
+        kfp_client.get_run.assert_called_once_with('run-1')
+
+    def test_get_kf_runs_stops_paging_at_created_after(self):
+        def make_page(hours, token):
+            page = ApiListRunsResponse(next_page_token=token)
+            page.runs = [ApiRun(run_id='run-{}'.format(hour),
+                                created_at=datetime(2024, 1, 1, hour, tzinfo=timezone.utc))
+                         for hour in hours]
+            return page
+        kfp_client = MagicMock()
+        kfp_client.list_runs.side_effect = [make_page([9, 8], 'p2'), make_page([7, 6], 'p3'),
+                                            make_page([5, 4], '')]
+        kfp_client.get_run.side_effect = ValueError('run-gone')
+        self.__KFCONNECT.set_kf_client(kfp_client)
+        created_after = datetime(2024, 1, 1, 7, 30, tzinfo=timezone.utc)
+
+        runs = self.__KFCONNECT.get_kf_runs(['run-8', 'run-gone'], created_after=created_after,
+                                            page_size=2)
+
+        assert list(runs) == ['run-8']
+        assert kfp_client.list_runs.call_count == 2
+        run_filter = json.loads(kfp_client.list_runs.call_args.kwargs['filter'])
+        assert run_filter['predicates'] == [{'operation': 5, 'key': 'created_at',
+                                             'timestampValue': '2024-01-01T07:30:00Z'}]
+        kfp_client.get_run.assert_called_once_with('run-gone')
+
+
+    def test_metadata_lookups_are_cached(self):
+        kfp_client = MagicMock()
+        kfp_client.get_pipeline_id.return_value = 'pipeline-id'
+        self.__KFCONNECT.set_kf_client(kfp_client)
+
+        for _ in range(3):
+            assert 'pipeline-id' == self.__KFCONNECT.get_kf_pipeline_id('pipeline-name')
+            self.__KFCONNECT.get_kf_pipeline_desc('pipeline-id')
+            self.__KFCONNECT.get_kf_experiment_details('exp-name', 'ns')
+
+        kfp_client.get_pipeline_id.assert_called_once()
+        kfp_client.get_pipeline.assert_called_once()
+        kfp_client.get_experiment.assert_called_once()
+
+    def test_delete_pipeline_invalidates_cache(self):
+        kfp_client = MagicMock()
+        kfp_client.get_pipeline_id.return_value = 'pipeline-id'
+        self.__KFCONNECT.set_kf_client(kfp_client)
+        self.__KFCONNECT.get_kf_pipeline_id('pipeline-name')
+        self.__KFCONNECT.get_kf_pipeline_desc('pipeline-id')
+
+        self.__KFCONNECT.delete_kf_pipeline('pipeline-id')
+        self.__KFCONNECT.get_kf_pipeline_id('pipeline-name')
+        self.__KFCONNECT.get_kf_pipeline_desc('pipeline-id')
+
+        assert kfp_client.get_pipeline_id.call_count == 2
+        assert kfp_client.get_pipeline.call_count == 2
+
+    def test_upload_pipeline_invalidates_cache(self):
+        kfp_client = MagicMock()
+        kfp_client.get_pipeline_id.return_value = 'pipeline-id'
+        self.__KFCONNECT.set_kf_client(kfp_client)
+        self.__KFCONNECT.get_kf_pipeline_desc('pipeline-id')
+
+        self.__KFCONNECT.upload_kf_pipeline('pipeline-name', 'file', 'desc')
+        assert len(self.__KFCONNECT.metadata_cache) == 1
+        self.__KFCONNECT.get_kf_pipeline_id('pipeline-name')
+        self.__KFCONNECT.upload_kf_pipeline('pipeline-name', 'file', 'desc')
+
+        assert len(self.__KFCONNECT.metadata_cache) == 0
+
+
+    def test_concurrent_identical_reads_share_one_call(self):
+        METRICS.reset()
+        kfp_client = MagicMock()
+
+        def slow_get_pipeline_id(name):
+            time.sleep(0.1)
+            return 'pipeline-id'
+
+        kfp_client.get_pipeline_id.side_effect = slow_get_pipeline_id
+        self.__KFCONNECT.set_kf_client(kfp_client)
+        # coalescing applies even when nothing is cached
+        self.__KFCONNECT.metadata_cache.ttl = 0
+        results = []
+
+        threads = [Thread(target=lambda: results.append(
+            self.__KFCONNECT.get_kf_pipeline_id('pipeline-name'))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == ['pipeline-id'] * 5
+        kfp_client.get_pipeline_id.assert_called_once_with('pipeline-name')
+        assert METRICS.get('kfp_read_coalesced') == 4
+
+
+    def test_get_kf_list_runs_pushes_filters_down(self):
+        kfp_client = MagicMock()
+        self.__KFCONNECT.set_kf_client(kfp_client)
+
+        self.__KFCONNECT.get_kf_list_runs('ns', 50, 'token', states=['RUNNING', 'FAILED'],
+                                          experiment_id='exp-id', pipeline_id='pipeline-id',
+                                          created_after=datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+                                          sort_by='created_at desc')
+
+        kwargs = kfp_client.list_runs.call_args.kwargs
+        assert kwargs['page_size'] == 50
+        assert kwargs['page_token'] == 'token'
+        assert kwargs['experiment_id'] == 'exp-id'
+        assert kwargs['sort_by'] == 'created_at desc'
+        assert json.loads(kwargs['filter']) == {'predicates': [
+            {'operation': 8, 'key': 'state', 'stringValues': {'values': ['RUNNING', 'FAILED']}},
+            {'operation': 1, 'key': 'pipeline_id', 'stringValue': 'pipeline-id'},
+            {'operation': 3, 'key': 'created_at', 'timestampValue': '2024-01-02T03:04:05Z'}]}
+
+    def test_get_kf_list_runs_without_filters(self):
+        kfp_client = MagicMock()
+        self.__KFCONNECT.set_kf_client(kfp_client)
+
+        self.__KFCONNECT.get_kf_list_runs('ns')
+
+        kfp_client.list_runs.assert_called_once_with(page_token='', page_size=20, sort_by='',
+                                                      experiment_id=None, filter=None)
+
+
+    def test_iter_kf_pages_follows_page_tokens(self):
+        pages = {'': MagicMock(runs=[1, 2], next_page_token='token'),
+                 'token': MagicMock(runs=[3], next_page_token='')}
+        list_page = MagicMock(side_effect=lambda page_size, page_token: pages[page_token])
+
+        assert [1, 2, 3] == list(KfConnect.iter_kf_pages(list_page, 'runs', page_size=2))
+        assert list_page.call_count == 2
+
+
+    def _versions_page(self, names, next_page_token=None):
+        response = ApiListPipelineVersionsResponse()
+        response.pipeline_versions = []
+        for name in names:
+            version = ApiPipelineVersion()
+            version.display_name = name
+            version.pipeline_version_id = 'id-' + name
+            version.pipeline_id = 'pipeline-id'
+            response.pipeline_versions.append(version)
+        response.next_page_token = next_page_token
+        return response
+
+    def test_pipeline_version_index_is_paginated_and_cached(self):
+        kfp_client = MagicMock()
+        kfp_client.get_pipeline_id.return_value = 'pipeline-id'
+        kfp_client.list_pipeline_versions.side_effect = [
+            self._versions_page(['1', '2'], 'token'), self._versions_page(['3'])]
+        self.__KFCONNECT.set_kf_client(kfp_client)
+
+        assert 'id-2' == self.__KFCONNECT.get_kf_pipeline_version_id('pipeline-id', '2')
+        assert 'id-3' == self.__KFCONNECT.get_kf_pipeline_version_id('pipeline-id', '3')
+        assert ['1', '2', '3'] == self.__KFCONNECT.get_pl_versions_by_pl_name('pipeline-name')
+
+        assert kfp_client.list_pipeline_versions.call_count == 2
+        kfp_client.list_pipeline_versions.assert_called_with('pipeline-id', page_token='token',
+                                                             page_size=100)
+
+    def test_pipeline_version_index_reloads_unknown_version(self):
+        kfp_client = MagicMock()
+        kfp_client.list_pipeline_versions.side_effect = [
+            self._versions_page(['1']), self._versions_page(['1', '2']), self._versions_page(['1', '2'])]
+        self.__KFCONNECT.set_kf_client(kfp_client)
+
+        assert 'id-1' == self.__KFCONNECT.get_kf_pipeline_version_id('pipeline-id', '1')
+        assert 'id-2' == self.__KFCONNECT.get_kf_pipeline_version_id('pipeline-id', '2')
+        assert None == self.__KFCONNECT.get_kf_pipeline_version_id('pipeline-id', '3')
+
+    def test_upload_pipeline_version_updates_index(self):
+        kfp_client = MagicMock()
+        kfp_client.get_pipeline_id.return_value = 'pipeline-id'
+        kfp_client.list_pipeline_versions.return_value = self._versions_page(['1'])
+        kfp_client.upload_pipeline_version.return_value = self._versions_page(['2']).pipeline_versions[0]
+        self.__KFCONNECT.set_kf_client(kfp_client)
+
+        self.__KFCONNECT.upload_pipeline_with_versions('pipeline-name', 'file', 'desc')
+
+        kfp_client.upload_pipeline_version.assert_called_once_with('file', pipeline_version_name='2',
+                                                                   pipeline_name='pipeline-name')
+        assert ['1', '2'] == self.__KFCONNECT.get_pl_versions_by_pl_name('pipeline-name')
+        assert 'id-2' == self.__KFCONNECT.get_kf_pipeline_version_id('pipeline-id', '2')
+        kfp_client.list_pipeline_versions.assert_called_once()
+
+    def test_upload_pipeline_version_reloads_cached_index(self):
+        kfp_client = MagicMock()
+        kfp_client.get_pipeline_id.return_value = 'pipeline-id'
+        kfp_client.list_pipeline_versions.side_effect = [
+            self._versions_page(['1']), self._versions_page(['1', '2'])]
+        kfp_client.upload_pipeline_version.return_value = self._versions_page(['3']).pipeline_versions[0]
+        self.__KFCONNECT.set_kf_client(kfp_client)
+        assert ['1'] == self.__KFCONNECT.get_pl_versions_by_pl_name('pipeline-name')
+
+        # version '2' was uploaded by another replica after the index was cached
+        self.__KFCONNECT.upload_pipeline_with_versions('pipeline-name', 'file', 'desc')
+
+        kfp_client.upload_pipeline_version.assert_called_once_with('file', pipeline_version_name='3',
+                                                                   pipeline_name='pipeline-name')
+        assert ['1', '2', '3'] == self.__KFCONNECT.get_pl_versions_by_pl_name('pipeline-name')
+
+
 class Test_Negative_KfConnect:
     def setup_method(self):
         print("test")
@@ -17,6 +17,8 @@
 # ==================================================================================
 import json
 import io
+import threading
+import time
 from unittest import TestCase
 from mock import patch, MagicMock
 from flask_api import status
@@ -32,6 +34,14 @@ from kfp_server_api.models.v2beta1_pipeline_version import V2beta1PipelineVersio
 from kfadapter import kfadapter_main
 from kfadapter import kfadapter_conf
 from kfadapter import kfadapter_kfconnect
+from kfadapter.kfadapter_admission import AdmissionController
+from kfadapter.kfadapter_cache import RunStateCache
+from kfadapter.kfadapter_events import RunEventBus
+from kfadapter.kfadapter_idempotency import SubmissionDeduplicator
+from kfadapter.kfadapter_metrics import METRICS
+from kfadapter.kfadapter_mirror import RunMirror
+from kfadapter.kfadapter_submission import SubmissionQueue
+from kfadapter.kfadapter_webhooks import WebhookDispatcher
 
 class testKfadapterApi(TestCase):
     @classmethod
@@ -314,6 +324,345 @@ class testKfadapterApi(TestCase):
         self.assertEqual(response.get_json()[exp.display_name], exp.experiment_id)
 
 
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_list_experiments")
+    def test_get_experiments_page(self, mock_get_kf_list_experiments):
+        # given
+        exp = ApiExperiment()
+        exp.display_name = "exp-name"
+        exp.experiment_id = "exp-id"
+        explist = kfp_server_api.V2beta1ListExperimentsResponse()
+        explist.experiments = [exp]
+        explist.next_page_token = "next-token"
+        mock_get_kf_list_experiments.return_value = explist
+
+        # when
+        response = self.client.get("/experiments?page_size=50&page_token=token")
+
+        # then
+        mock_get_kf_list_experiments.assert_called_once_with(kfadapter_main.KFCONNECT_CONFIG_OBJ.kf_dict['kfdefaultns'], 50, "token")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.headers["X-Next-Page-Token"], "next-token")
+        self.assertEqual(response.get_json(), {"exp-name": "exp-id"})
+
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_list_runs")
+    def test_get_all_runs_streamed(self, mock_get_kf_list_runs):
+        # given
+        def page(names, next_page_token):
+            runs = []
+            for name in names:
+                run = ApiRun()
+                run.run_id = "id-" + name
+                run.display_name = name
+                run.state = "RUNNING"
+                runs.append(run)
+            list_run = ApiListRunsResponse()
+            list_run.runs = runs
+            list_run.next_page_token = next_page_token
+            return list_run
+
+        mock_get_kf_list_runs.side_effect = [page(["run1", "run2"], "token"), page(["run3"], None)]
+
+        # when
+        response = self.client.get("/runs?all=true&page_size=2")
+
+        # then
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content_type, "application/x-ndjson")
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([line["run_name"] for line in lines], ["run1", "run2", "run3"])
+        self.assertEqual(lines[2]["run_id"], "id-run3")
+        mock_get_kf_list_runs.assert_called_with(kfadapter_main.KFCONNECT_CONFIG_OBJ.kf_dict['kfdefaultns'], page_size=2, page_token="token")
+
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_list_runs")
+    def test_get_runs_filtered(self, mock_get_kf_list_runs):
+        # given
+        list_run = ApiListRunsResponse()
+        list_run.runs = []
+        mock_get_kf_list_runs.return_value = list_run
+
+        # when
+        response = self.client.get("/runs?state=running,,Failed,&experiment_id=exp-id&pipeline_id=pipeline-id"
+                                   "&created_after=2024-01-02T03:04:05Z&sort_by=created_at%20desc")
+
+        # then
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        args, kwargs = mock_get_kf_list_runs.call_args
+        self.assertEqual(kwargs["states"], ["RUNNING", "FAILED"])
+        self.assertEqual(kwargs["experiment_id"], "exp-id")
+        self.assertEqual(kwargs["pipeline_id"], "pipeline-id")
+        self.assertEqual(kwargs["created_after"].isoformat(), "2024-01-02T03:04:05+00:00")
+        self.assertEqual(kwargs["sort_by"], "created_at desc")
+
+    def test_get_runs_from_mirror(self):
+        # given
+        run = ApiRun()
+        run.run_id = "run-id"
+        run.display_name = "run-name"
+        run.state = "RUNNING"
+        mirror = RunMirror(kfadapter_main.KFCONNECT_KF_OBJ, "kubeflow")
+        mirror.runs = {run.run_id: run}
+        mirror.last_sync = time.time()
+        kfadapter_main.RUN_MIRROR = mirror
+        try:
+            with patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_list_runs") as mock_get_kf_list_runs, \
+                    patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_run") as mock_get_kf_run:
+                # when
+                list_response = self.client.get("/runs")
+                run_response = self.client.get("/runs/run-id")
+
+                # then
+                mock_get_kf_list_runs.assert_not_called()
+                mock_get_kf_run.assert_not_called()
+            self.assertEqual(list_response.get_json()["run-name"]["run_status"], "RUNNING")
+            self.assertIn("X-Run-Mirror-Staleness-Sec", list_response.headers)
+            self.assertEqual(run_response.get_json()["run_status"], "RUNNING")
+            self.assertIn("X-Run-Mirror-Staleness-Sec", run_response.headers)
+        finally:
+            kfadapter_main.RUN_MIRROR = None
+
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_run")
+    def test_get_run_falls_back_to_kubeflow_when_not_mirrored_or_stale(self, mock_get_kf_run):
+        # given
+        run = ApiRun()
+        run.run_id = "run-id"
+        run.display_name = "run-name"
+        run.state = "PENDING"
+        mock_get_kf_run.return_value = run
+        mirror = RunMirror(kfadapter_main.KFCONNECT_KF_OBJ, "kubeflow")
+        mirror.last_sync = time.time()
+        kfadapter_main.RUN_MIRROR = mirror
+        try:
+            # when
+            missing_response = self.client.get("/runs/run-id")
+            mirror.runs = {run.run_id: run}
+            mirror.last_sync = time.time() - kfadapter_main.KFCONNECT_CONFIG_OBJ.run_mirror_max_staleness_sec - 1
+            stale_response = self.client.get("/runs/run-id")
+        finally:
+            kfadapter_main.RUN_MIRROR = None
+
+        # then
+        self.assertEqual(mock_get_kf_run.call_count, 2)
+        for response in [missing_response, stale_response]:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.get_json()["run_status"], "PENDING")
+            self.assertNotIn("X-Run-Mirror-Staleness-Sec", response.headers)
+
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_run")
+    def test_get_run_from_run_state_cache(self, mock_get_kf_run):
+        # given
+        run = ApiRun()
+        run.run_id = "run-id"
+        run.display_name = "run-name"
+        run.state = "RUNNING"
+        mock_get_kf_run.return_value = run
+        state_cache = RunStateCache()
+        kfadapter_conf.RUN_STATE_CACHE = state_cache
+        max_age = kfadapter_main.KFCONNECT_CONFIG_OBJ.run_state_cache_max_age_sec
+        try:
+            # when
+            state_cache.put(run)
+            cached_response = self.client.get("/runs/run-id")
+            state_cache.invalidate("run-id")
+            state_cache.put(run, time.time() - max_age - 1)
+            stale_response = self.client.get("/runs/run-id")
+            refreshed_response = self.client.get("/runs/run-id")
+        finally:
+            kfadapter_conf.RUN_STATE_CACHE = None
+
+        # then
+        mock_get_kf_run.assert_called_once_with("run-id")
+        for response in [cached_response, stale_response, refreshed_response]:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.get_json()["run_status"], "RUNNING")
+        self.assertIn("X-Run-State-Age-Sec", cached_response.headers)
+        self.assertNotIn("X-Run-State-Age-Sec", stale_response.headers)
+        self.assertIn("X-Run-State-Age-Sec", refreshed_response.headers)
+
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_run")
+    def test_wait_run_returns_when_poller_sees_it_finish(self, mock_get_kf_run):
+        # given
+        run = ApiRun()
+        run.run_id = "run-id"
+        run.state = "RUNNING"
+        mock_get_kf_run.return_value = run
+        events = RunEventBus()
+        kfadapter_conf.RUN_EVENTS = events
+        kfadapter_conf.TRAINING_DICT["run-id"] = "job-id"
+        publisher = threading.Thread(target=lambda: (
+            time.sleep(0.1), events.publish("run-id", "SUCCEEDED", "job-id", True)))
+        try:
+            publisher.start()
+
+            # when
+            response = self.client.get("/runs/run-id/wait?timeout=5")
+            finished_response = self.client.get("/runs/run-id/wait")
+        finally:
+            publisher.join()
+            kfadapter_conf.RUN_EVENTS = None
+            kfadapter_conf.TRAINING_DICT.clear()
+
+        # then
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.get_json(), {"run_id": "run-id", "run_status": "SUCCEEDED", "finished": True})
+        self.assertEqual(finished_response.get_json()["run_status"], "SUCCEEDED")
+        mock_get_kf_run.assert_called_once_with("run-id")
+
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_run")
+    def test_wait_run_times_out(self, mock_get_kf_run):
+        # given
+        run = ApiRun()
+        run.run_id = "run-id"
+        run.state = "RUNNING"
+        mock_get_kf_run.return_value = run
+        kfadapter_conf.RUN_EVENTS = RunEventBus()
+        kfadapter_conf.TRAINING_DICT["run-id"] = "job-id"
+        try:
+            # when
+            response = self.client.get("/runs/run-id/wait?timeout=0.05")
+        finally:
+            kfadapter_conf.RUN_EVENTS = None
+            kfadapter_conf.TRAINING_DICT.clear()
+
+        # then
+        self.assertEqual(response.get_json(), {"run_id": "run-id", "run_status": "RUNNING", "finished": False})
+
+    def test_negative_wait_run_with_invalid_timeout(self):
+        for timeout in ["-1", "soon", "3600"]:
+            # when
+            response = self.client.get("/runs/run-id/wait?timeout=" + timeout)
+
+            # then
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, timeout)
+
+    def test_event_stream(self):
+        # given
+        events = RunEventBus()
+        events.publish("run-1", "RUNNING", "job-1")
+        events.publish("run-2", "RUNNING", "job-2")
+        events.publish("run-1", "SUCCEEDED", "job-1", True)
+        kfadapter_conf.RUN_EVENTS = events
+        try:
+            # when
+            response = self.client.get("/events?run_id=run-1", headers={"Last-Event-ID": "1"})
+            chunks = iter(response.response)
+            first, second = next(chunks), next(chunks)
+            response.close()
+        finally:
+            kfadapter_conf.RUN_EVENTS = None
+
+        # then
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.mimetype, "text/event-stream")
+        self.assertEqual(first.decode(), "retry: 3000\n\n")
+        lines = second.decode().splitlines()
+        self.assertEqual(lines[:2], ["id: 3", "event: run"])
+        data = json.loads(lines[2][len("data: "):])
+        self.assertEqual((data["run_id"], data["run_status"], data["finished"]), ("run-1", "SUCCEEDED", True))
+
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_run")
+    def test_liveness_while_streams_hold_all_slots(self, mock_get_kf_run):
+        # given
+        run = ApiRun()
+        run.run_id = "run-id"
+        run.state = "RUNNING"
+        mock_get_kf_run.return_value = run
+        kfadapter_conf.RUN_EVENTS = RunEventBus()
+        kfadapter_conf.TRAINING_DICT["run-id"] = "job-id"
+        kfadapter_conf.RUN_EVENTS.publish("run-id", "RUNNING", "job-id")
+        slots = kfadapter_main.LONG_REQUEST_SLOTS
+        kfadapter_main.LONG_REQUEST_SLOTS = threading.BoundedSemaphore(2)
+        rejected = METRICS.get('long_requests_rejected') or 0
+        try:
+            # when
+            streams = [self.client.get("/events") for _ in range(2)]
+            rejected_stream = self.client.get("/events")
+            rejected_wait = self.client.get("/runs/run-id/wait?timeout=5")
+            liveness = self.client.get("/liveness")
+            streams[0].close()
+            reopened = self.client.get("/events")
+            reopened.close()
+            streams[1].close()
+        finally:
+            kfadapter_main.LONG_REQUEST_SLOTS = slots
+            kfadapter_conf.RUN_EVENTS = None
+            kfadapter_conf.TRAINING_DICT.clear()
+
+        # then
+        for response in streams:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(rejected_stream.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(rejected_wait.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(liveness.status_code, status.HTTP_200_OK)
+        self.assertEqual(reopened.status_code, status.HTTP_200_OK)
+        self.assertEqual(METRICS.get('long_requests_rejected'), rejected + 2)
+
+    def test_negative_event_stream_not_enabled(self):
+        # when
+        response = self.client.get("/events")
+
+        # then
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_subscriptions(self):
+        # given
+        kfadapter_main.WEBHOOKS = WebhookDispatcher(MagicMock(), max_subscriptions=1)
+        try:
+            # when
+            created = self.client.post("/subscriptions", data=json.dumps(
+                {"callback_url": "http://dashboard/hook", "states": ["SUCCEEDED", "FAILED"]}),
+                content_type="application/json")
+            subscription_id = created.get_json()["subscription_id"]
+            listed = self.client.get("/subscriptions")
+            over_limit = self.client.post("/subscriptions", data=json.dumps(
+                {"callback_url": "http://other/hook"}), content_type="application/json")
+            fetched = self.client.get("/subscriptions/" + subscription_id)
+            deleted = self.client.delete("/subscriptions/" + subscription_id)
+            deleted_again = self.client.delete("/subscriptions/" + subscription_id)
+        finally:
+            kfadapter_main.WEBHOOKS.stop()
+            kfadapter_main.WEBHOOKS = None
+
+        # then
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(created.get_json()["states"], ["FAILED", "SUCCEEDED"])
+        self.assertEqual([sub["subscription_id"] for sub in listed.get_json()], [subscription_id])
+        self.assertEqual(over_limit.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(fetched.get_json()["queued"], 0)
+        self.assertEqual(deleted.status_code, status.HTTP_200_OK)
+        self.assertEqual(deleted_again.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_negative_subscribe_with_invalid_request(self):
+        kfadapter_main.WEBHOOKS = WebhookDispatcher(MagicMock())
+        try:
+            for body in [{}, {"callback_url": "ftp://host/hook"},
+                         {"callback_url": "http://host/hook", "states": ["DONE"]},
+                         {"callback_url": "http://host/hook", "states": "FAILED"}]:
+                # when
+                response = self.client.post("/subscriptions", data=json.dumps(body),
+                                            content_type="application/json")
+
+                # then
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, body)
+        finally:
+            kfadapter_main.WEBHOOKS.stop()
+            kfadapter_main.WEBHOOKS = None
+
+    def test_negative_get_runs_with_invalid_filters(self):
+        for query in ["state=DONE", "created_after=yesterday", "sort_by=run_id", "sort_by=created_at%20up",
+                      "sort_by=%20"]:
+            # when
+            response = self.client.get("/runs?" + query)
+
+            # then
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query)
+
+    def test_negative_list_with_invalid_page_size(self):
+        # when
+        response = self.client.get("/pipelines?page_size=0")
+
+        # then
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_experiment_details")
     @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_pipeline_id")
     @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_pipeline_version_id")
@@ -377,6 +726,334 @@ class testKfadapterApi(TestCase):
         # self.assertEqual(response.status_code, status.HTTP_200_OK)
         # self.assertEqual(response.get_data(), b'{"experiment_id":"rr-id0","experiment_name":"rr-name0","pipeline_id":"rr-id1","pipeline_name":"rr-name1","run_id":"run-id","run_name":"run-name","trainingjob_name":"job_name"}\n')
 
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_experiment_details")
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_pipeline_id")
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_pipeline_version_id")
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.run_kf_pipeline")
+    def test_execute_job_resolves_lookups_concurrently(self, mock_run_kf_pipeline, mock_get_kf_pipeline_version_id, mock_get_kf_pipeline_id, mock_get_kf_experiment_details):
+        # given
+        exp = ApiExperiment()
+        exp.display_name = "exp-name"
+        exp.experiment_id = "exp-id"
+
+        def slow_experiment(*args):
+            time.sleep(0.2)
+            return exp
+
+        def slow_pipeline_id(*args):
+            time.sleep(0.2)
+            return "pipeline-id"
+
+        mock_get_kf_experiment_details.side_effect = slow_experiment
+        mock_get_kf_pipeline_id.side_effect = slow_pipeline_id
+        mock_get_kf_pipeline_version_id.return_value = "version-id"
+
+        run = ApiRun()
+        run.run_id = "run-id"
+        run.display_name = "run-name"
+        run.experiment_id = "exp-id"
+        run.pipeline_version_reference = MagicMock(pipeline_id="pipeline-id")
+        run.state = "RUNNING"
+        mock_run_kf_pipeline.return_value = run
+
+        dict_job = {"arguments": {}, "pipeline_name": "pipeline-name", "pipeline_version": "1",
+                    "experiment_name": exp.display_name}
+
+        # when
+        start = time.monotonic()
+        response = self.client.post("/trainingjobs/job_name/execution", data=json.dumps(dict_job), headers={'content-type': 'application/json', 'Accept-Charset': 'UTF-8'})
+        elapsed = time.monotonic() - start
+
+        # then
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLess(elapsed, 0.35)
+        mock_get_kf_pipeline_version_id.assert_called_once_with("pipeline-id", "1")
+        mock_run_kf_pipeline.assert_called_once_with("exp-id", "pipeline-id", {}, "version-id")
+        self.assertEqual(response.get_json()["run_id"], "run-id")
+        server_timing = response.headers["Server-Timing"]
+        for stage in ["experiment", "pipeline", "pipeline_version", "submit", "total"]:
+            self.assertIn(stage + ";dur=", server_timing)
+
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_experiment_details")
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_pipeline_id")
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_pipeline_version_id")
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.run_kf_pipeline")
+    def test_execute_job_with_ids_skips_lookups(self, mock_run_kf_pipeline, mock_get_kf_pipeline_version_id, mock_get_kf_pipeline_id, mock_get_kf_experiment_details):
+        # given
+        run = ApiRun()
+        run.run_id = "run-id"
+        run.display_name = "run-name"
+        run.experiment_id = "exp-id"
+        run.state = "RUNNING"
+        mock_run_kf_pipeline.return_value = run
+
+        dict_job = {"arguments": {"epochs": "1"}, "experiment_id": "exp-id",
+                    "pipeline_id": "pipeline-id", "pipeline_version_id": "version-id"}
+
+        # when
+        response = self.client.post("/trainingjobs/job_name/execution", data=json.dumps(dict_job), headers={'content-type': 'application/json', 'Accept-Charset': 'UTF-8'})
+
+        # then
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_get_kf_experiment_details.assert_not_called()
+        mock_get_kf_pipeline_id.assert_not_called()
+        mock_get_kf_pipeline_version_id.assert_not_called()
+        mock_run_kf_pipeline.assert_called_once_with("exp-id", "pipeline-id", {"epochs": "1"}, "version-id")
+        self.assertEqual(response.get_json()["experiment_id"], "exp-id")
+        self.assertEqual(response.get_json()["pipeline_id"], "pipeline-id")
+        self.assertEqual(response.get_json()["pipeline_version_id"], "version-id")
+
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_experiment_details")
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_pipeline_id")
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_pipeline_version_id")
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.run_kf_pipeline")
+    def test_execute_job_with_pipeline_id_looks_up_version_only(self, mock_run_kf_pipeline, mock_get_kf_pipeline_version_id, mock_get_kf_pipeline_id, mock_get_kf_experiment_details):
+        # given
+        exp = ApiExperiment()
+        exp.display_name = "exp-name"
+        exp.experiment_id = "exp-id"
+        mock_get_kf_experiment_details.return_value = exp
+        mock_get_kf_pipeline_version_id.return_value = "version-id"
+
+        run = ApiRun()
+        run.run_id = "run-id"
+        run.display_name = "run-name"
+        run.state = "RUNNING"
+        mock_run_kf_pipeline.return_value = run
+
+        dict_job = {"arguments": {}, "experiment_name": "exp-name",
+                    "pipeline_id": "pipeline-id", "pipeline_version": "1"}
+
+        # when
+        response = self.client.post("/trainingjobs/job_name/execution", data=json.dumps(dict_job), headers={'content-type': 'application/json', 'Accept-Charset': 'UTF-8'})
+
+        # then
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_get_kf_pipeline_id.assert_not_called()
+        mock_get_kf_pipeline_version_id.assert_called_once_with("pipeline-id", "1")
+        mock_run_kf_pipeline.assert_called_once_with("exp-id", "pipeline-id", {}, "version-id")
+        self.assertEqual(response.get_json()["experiment_id"], "exp-id")
+        self.assertEqual(response.get_json()["pipeline_version_id"], "version-id")
+
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_experiment_details")
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_pipeline_id")
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.get_kf_pipeline_version_id")
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.run_kf_pipeline")
+    def test_execute_jobs_batch(self, mock_run_kf_pipeline, mock_get_kf_pipeline_version_id, mock_get_kf_pipeline_id, mock_get_kf_experiment_details):
+        # given
+        exp = ApiExperiment()
+        exp.display_name = "exp-name"
+        exp.experiment_id = "exp-id"
+        mock_get_kf_experiment_details.side_effect = lambda name, namespace: exp if name == "exp-name" else None
+        mock_get_kf_pipeline_id.return_value = "pipeline-id"
+        mock_get_kf_pipeline_version_id.return_value = "version-id"
+
+        def run_pipeline(exp_id, pipe_id, arguments, version_id):
+            run = ApiRun()
+            run.run_id = "run-" + arguments["job"]
+            run.display_name = "run-name"
+            run.state = "PENDING"
+            return run
+        mock_run_kf_pipeline.side_effect = run_pipeline
+
+        jobs = [{"trainingjob_id": "job{}".format(i), "arguments": {"job": str(i)},
+                 "experiment_name": "exp-name", "pipeline_name": "pipeline-name",
+                 "pipeline_version": "1"} for i in range(5)]
+        jobs.append({"trainingjob_id": "job5", "arguments": {"job": "5"},
+                     "experiment_name": "wrong-exp", "pipeline_name": "pipeline-name",
+                     "pipeline_version": "1"})
+        jobs.append({"trainingjob_id": "job6", "arguments": {}})
+        jobs.append({"trainingjob_id": "job7", "arguments": {"job": "7"}, "experiment_id": None,
+                     "experiment_name": "exp-name", "pipeline_id": None,
+                     "pipeline_name": "pipeline-name", "pipeline_version": "1"})
+
+        # when
+        response = self.client.post("/trainingjobs/execution:batch", data=json.dumps({"jobs": jobs}), headers={'content-type': 'application/json', 'Accept-Charset': 'UTF-8'})
+
+        # then
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.get_json()
+        self.assertEqual(body["submitted"], 6)
+        self.assertEqual(body["failed"], 2)
+        self.assertEqual(mock_get_kf_experiment_details.call_count, 2)
+        mock_get_kf_pipeline_id.assert_called_once_with("pipeline-name")
+        mock_get_kf_pipeline_version_id.assert_called_once_with("pipeline-id", "1")
+        self.assertEqual(mock_run_kf_pipeline.call_count, 6)
+        self.assertEqual(body["results"][7]["run_id"], "run-7")
+        self.assertEqual(kfadapter_conf.TRAINING_DICT.pop("run-7"), "job7")
+        for i in range(5):
+            self.assertEqual(body["results"][i]["trainingjob_id"], "job{}".format(i))
+            self.assertEqual(body["results"][i]["run_id"], "run-{}".format(i))
+            self.assertEqual(body["results"][i]["status"], "submitted")
+            self.assertEqual(kfadapter_conf.TRAINING_DICT.pop("run-{}".format(i)), "job{}".format(i))
+        self.assertEqual(body["results"][5]["message"], "Experiment name is not correct wrong-exp")
+        self.assertEqual(body["results"][6]["message"], "Less arguments")
+
+    def test_negative_execute_jobs_batch_too_many_jobs(self):
+        # given
+        max_jobs = kfadapter_main.KFCONNECT_CONFIG_OBJ.batch_submit_max_jobs
+        jobs = [{"trainingjob_id": "job", "arguments": {}}] * (max_jobs + 1)
+
+        # when
+        response = self.client.post("/trainingjobs/execution:batch", data=json.dumps({"jobs": jobs}), headers={'content-type': 'application/json', 'Accept-Charset': 'UTF-8'})
+
+        # then
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.get_json()["message"], "Too many jobs in batch")
+
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.run_kf_pipeline")
+    def test_execute_job_async(self, mock_run_kf_pipeline):
+        # given
+        run = ApiRun()
+        run.run_id = "run-id"
+        run.display_name = "run-name"
+        run.state = "RUNNING"
+        mock_run_kf_pipeline.return_value = run
+        dict_job = {"arguments": {}, "experiment_id": "exp-id",
+                    "pipeline_id": "pipeline-id", "pipeline_version_id": "version-id"}
+        kfadapter_main.SUBMISSION_QUEUE = SubmissionQueue(
+            lambda trainingjob_id, req, key: kfadapter_main.execute_run({}, trainingjob_id, req))
+        kfadapter_main.SUBMISSION_QUEUE.start()
+
+        try:
+            # when
+            response = self.client.post("/trainingjobs/job_name/execution?async=true", data=json.dumps(dict_job), headers={'content-type': 'application/json', 'Accept-Charset': 'UTF-8'})
+            ticket = response.get_json()["ticket"]
+            for _ in range(100):
+                submission = self.client.get("/submissions/" + ticket).get_json()
+                if submission["status"] == "submitted":
+                    break
+                time.sleep(0.01)
+        finally:
+            kfadapter_main.SUBMISSION_QUEUE.stop()
+            kfadapter_main.SUBMISSION_QUEUE = None
+
+        # then
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.headers["Location"], "/submissions/" + ticket)
+        self.assertEqual(submission["status"], "submitted")
+        self.assertEqual(submission["run_id"], "run-id")
+        self.assertEqual(submission["run"]["pipeline_version_id"], "version-id")
+
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.run_kf_pipeline")
+    def test_negative_execute_job_not_admitted(self, mock_run_kf_pipeline):
+        # given
+        dict_job = {"arguments": {}, "experiment_id": "exp-id",
+                    "pipeline_id": "pipeline-id", "pipeline_version_id": "version-id"}
+        kfadapter_conf.ADMISSION = AdmissionController(0, max_queued=0)
+
+        try:
+            # when
+            response = self.client.post("/trainingjobs/job_name/execution", data=json.dumps(dict_job), headers={'content-type': 'application/json', 'Accept-Charset': 'UTF-8'})
+        finally:
+            kfadapter_conf.ADMISSION = None
+
+        # then
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.get_json()["message"], "Too many submissions waiting for admission")
+        mock_run_kf_pipeline.assert_not_called()
+
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.run_kf_pipeline")
+    def test_negative_execute_job_with_invalid_priority(self, mock_run_kf_pipeline):
+        # given
+        dict_job = {"arguments": {}, "experiment_id": "exp-id", "pipeline_id": "pipeline-id",
+                    "pipeline_version_id": "version-id", "priority": "high"}
+        headers = {'content-type': 'application/json', 'Accept-Charset': 'UTF-8'}
+
+        # when
+        response = self.client.post("/trainingjobs/job_name/execution", data=json.dumps(dict_job), headers=headers)
+        batch_response = self.client.post("/trainingjobs/execution:batch", data=json.dumps(
+            {"jobs": [dict(dict_job, trainingjob_id="job_name")]}), headers=headers)
+
+        # then
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.get_json()["message"], "priority must be an integer")
+        self.assertEqual(batch_response.get_json()["results"][0]["message"], "priority must be an integer")
+        mock_run_kf_pipeline.assert_not_called()
+
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.run_kf_pipeline")
+    def test_execute_job_retry_returns_first_run(self, mock_run_kf_pipeline):
+        # given
+        run = ApiRun()
+        run.run_id = "run-id"
+        run.display_name = "run-name"
+        run.state = "RUNNING"
+        mock_run_kf_pipeline.return_value = run
+        dict_job = {"arguments": {}, "experiment_id": "exp-id",
+                    "pipeline_id": "pipeline-id", "pipeline_version_id": "version-id"}
+        kfadapter_main.SUBMISSION_DEDUP = SubmissionDeduplicator(60)
+
+        try:
+            # when
+            first = self.client.post("/trainingjobs/job_name/execution", data=json.dumps(dict_job), headers={'content-type': 'application/json', 'Accept-Charset': 'UTF-8'})
+            retry = self.client.post("/trainingjobs/job_name/execution", data=json.dumps(dict_job), headers={'content-type': 'application/json', 'Accept-Charset': 'UTF-8'})
+            other_key = self.client.post("/trainingjobs/job_name/execution", data=json.dumps(dict_job), headers={'content-type': 'application/json', 'Accept-Charset': 'UTF-8', 'Idempotency-Key': 'rerun-1'})
+        finally:
+            kfadapter_main.SUBMISSION_DEDUP = None
+
+        # then
+        self.assertEqual(first.get_json(), retry.get_json())
+        self.assertNotIn("Idempotent-Replayed", first.headers)
+        self.assertEqual(retry.headers["Idempotent-Replayed"], "true")
+        self.assertNotIn("Idempotent-Replayed", other_key.headers)
+        self.assertEqual(mock_run_kf_pipeline.call_count, 2)
+
+    @patch("kfadapter.kfadapter_kfconnect.KfConnect.run_kf_pipeline")
+    def test_execute_retry_after_run_finished_submits_again(self, mock_run_kf_pipeline):
+        # given
+        run_ids = iter(["run-1", "run-2", "run-3"])
+
+        def run_pipeline(exp_id, pipe_id, arguments, version_id):
+            run = ApiRun()
+            run.run_id = next(run_ids)
+            run.display_name = "run-name"
+            run.state = "PENDING"
+            return run
+        mock_run_kf_pipeline.side_effect = run_pipeline
+        job = {"trainingjob_id": "job_name", "arguments": {}, "experiment_id": "exp-id",
+               "pipeline_id": "pipeline-id", "pipeline_version_id": "version-id"}
+        headers = {'content-type': 'application/json', 'Accept-Charset': 'UTF-8'}
+        dedup = SubmissionDeduplicator(60)
+        kfadapter_main.SUBMISSION_DEDUP = dedup
+        kfadapter_conf.SUBMISSIONS = dedup
+        admission = MagicMock()
+        kfadapter_conf.ADMISSION = admission
+
+        try:
+            # when
+            first = self.client.post("/trainingjobs/execution:batch", data=json.dumps({"jobs": [job]}), headers=headers)
+            retry = self.client.post("/trainingjobs/execution:batch", data=json.dumps({"jobs": [job]}), headers=headers)
+            with kfadapter_conf.LOCK:
+                kfadapter_conf.untrack_run("run-1")
+            after_batch = self.client.post("/trainingjobs/execution:batch", data=json.dumps({"jobs": [job]}), headers=headers)
+            with kfadapter_conf.LOCK:
+                kfadapter_conf.untrack_run("run-2")
+            after_single = self.client.post("/trainingjobs/job_name/execution", data=json.dumps(job), headers=headers)
+        finally:
+            kfadapter_main.SUBMISSION_DEDUP = None
+            kfadapter_conf.SUBMISSIONS = None
+            kfadapter_conf.ADMISSION = None
+            with kfadapter_conf.LOCK:
+                kfadapter_conf.untrack_run("run-3")
+
+        # then
+        self.assertNotIn("replayed", first.get_json()["results"][0])
+        self.assertTrue(retry.get_json()["results"][0]["replayed"])
+        self.assertEqual(retry.get_json()["results"][0]["run_id"], "run-1")
+        self.assertEqual(after_batch.get_json()["results"][0]["run_id"], "run-2")
+        self.assertNotIn("replayed", after_batch.get_json()["results"][0])
+        self.assertEqual(after_single.get_json()["run_id"], "run-3")
+        self.assertNotIn("Idempotent-Replayed", after_single.headers)
+        self.assertEqual(mock_run_kf_pipeline.call_count, 3)
+        self.assertEqual(admission.tracked.call_count, 3)
+
+    def test_negative_get_submission_unknown_ticket(self):
+        # when
+        response = self.client.get("/submissions/unknown")
+
+        # then
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
 class testNegativeKfadapterApi(TestCase):
     @classmethod
     def setUpClass(self):
@@ -0,0 +1,136 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+
+import time
+from datetime import datetime, timezone
+
+from kfp_server_api.models.v2beta1_run import V2beta1Run
+from kfp_server_api.models.v2beta1_list_runs_response import V2beta1ListRunsResponse
+from kfp_server_api.models.v2beta1_pipeline_version_reference import V2beta1PipelineVersionReference
+
+from kfadapter.kfadapter_kfconnect import KfConnect
+from kfadapter.kfadapter_metrics import METRICS
+from kfadapter.kfadapter_mirror import RunMirror, ACTIVE_STATES
+
+
+def make_run(run_id, state, created_sec, finished_sec=None, experiment_id='exp-1',
+             pipeline_id='pipe-1'):
+    run = V2beta1Run()
+    run.run_id = run_id
+    run.display_name = run_id
+    run.state = state
+    run.experiment_id = experiment_id
+    run.pipeline_version_reference = V2beta1PipelineVersionReference(pipeline_id=pipeline_id)
+    run.created_at = datetime.fromtimestamp(created_sec, timezone.utc)
+    if finished_sec is not None:
+        run.finished_at = datetime.fromtimestamp(finished_sec, timezone.utc)
+    return run
+
+
+class FakeKfConnect:
+    iter_kf_pages = staticmethod(KfConnect.iter_kf_pages)
+
+    def __init__(self, runs):
+        self.runs = runs
+        self.calls = []
+
+    def get_kf_list_runs(self, nspace, page_size=20, page_token='', states=None,
+                         created_after=None, finished_after=None):
+        self.calls.append({'states': states, 'created_after': created_after,
+                           'finished_after': finished_after})
+        runs = [run for run in self.runs
+                if (not states or run.state in states) and
+                (created_after is None or run.created_at > created_after) and
+                (finished_after is None or
+                 (run.finished_at is not None and run.finished_at > finished_after))]
+        offset = int(page_token or 0)
+        next_page_token = str(offset + page_size) if offset + page_size < len(runs) else None
+        return V2beta1ListRunsResponse(runs=runs[offset:offset + page_size],
+                                       next_page_token=next_page_token)
+
+
+class Test_RunMirror:
+    def setup_method(self):
+        METRICS.reset()
+        self.kfc = FakeKfConnect([make_run('run-1', 'SUCCEEDED', 100, 150),
+                                  make_run('run-2', 'RUNNING', 200, experiment_id='exp-2'),
+                                  make_run('run-3', 'FAILED', 300, 350, pipeline_id='pipe-2')])
+        self.mirror = RunMirror(self.kfc, 'kubeflow', page_size=2)
+
+    def test_full_sync(self):
+        assert self.mirror.staleness() is None
+        assert self.mirror.full_sync() == 3
+        assert self.mirror.get_kf_run('run-2').state == 'RUNNING'
+        assert self.mirror.get_kf_run('run-4') is None
+        assert self.mirror.created_watermark == datetime.fromtimestamp(300, timezone.utc)
+        assert self.mirror.finished_watermark == datetime.fromtimestamp(350, timezone.utc)
+        assert self.mirror.staleness() < 1
+        assert METRICS.get('run_mirror_size') == 3
+
+    def test_delta_sync_applies_new_and_changed_runs(self):
+        self.mirror.full_sync()
+        self.kfc.runs[1] = make_run('run-2', 'SUCCEEDED', 200, 400, experiment_id='exp-2')
+        self.kfc.runs.append(make_run('run-4', 'PENDING', 500))
+        self.kfc.calls = []
+
+        self.mirror.delta_sync()
+
+        assert [call['states'] for call in self.kfc.calls] == [None, None, ACTIVE_STATES]
+        assert self.kfc.calls[0]['created_after'] == datetime.fromtimestamp(299, timezone.utc)
+        assert self.kfc.calls[1]['finished_after'] == datetime.fromtimestamp(349, timezone.utc)
+        assert self.mirror.get_kf_run('run-2').state == 'SUCCEEDED'
+        assert self.mirror.get_kf_run('run-4').state == 'PENDING'
+        assert self.mirror.by_state == {'SUCCEEDED': {'run-1', 'run-2'}, 'FAILED': {'run-3'},
+                                        'PENDING': {'run-4'}}
+
+    def test_full_sync_drops_deleted_runs(self):
+        self.mirror.full_sync()
+        del self.kfc.runs[0]
+
+        self.mirror.sync()
+        assert self.mirror.get_kf_run('run-1') is not None
+
+        self.mirror.last_full_sync = time.time() - self.mirror.full_sync_interval
+        self.mirror.sync()
+        assert self.mirror.get_kf_run('run-1') is None
+        assert 'SUCCEEDED' not in self.mirror.by_state
+
+    def test_list_runs_filters_and_sorts(self):
+        self.mirror.full_sync()
+
+        def run_ids(**kwargs):
+            return [run.run_id for run in self.mirror.get_kf_list_runs('kubeflow', **kwargs).runs]
+
+        assert run_ids() == ['run-3', 'run-2', 'run-1']
+        assert run_ids(sort_by='created_at') == ['run-1', 'run-2', 'run-3']
+        assert run_ids(states=['SUCCEEDED', 'FAILED']) == ['run-3', 'run-1']
+        assert run_ids(experiment_id='exp-1', states=['RUNNING']) == []
+        assert run_ids(experiment_id='exp-2') == ['run-2']
+        assert run_ids(pipeline_id='pipe-2') == ['run-3']
+        assert run_ids(created_after=datetime.fromtimestamp(200, timezone.utc)) == ['run-3']
+
+    def test_list_runs_paginates(self):
+        self.mirror.full_sync()
+
+        first = self.mirror.get_kf_list_runs('kubeflow', page_size=2)
+        assert [run.run_id for run in first.runs] == ['run-3', 'run-2']
+        assert first.total_size == 3
+        second = self.mirror.get_kf_list_runs('kubeflow', page_size=2,
+                                              page_token=first.next_page_token)
+        assert [run.run_id for run in second.runs] == ['run-1']
+        assert second.next_page_token is None
@@ -0,0 +1,121 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+
+import json
+
+import requests
+from mock import patch, MagicMock
+
+from kfadapter import kfadapter_conf
+from kfadapter.kfadapter_metrics import METRICS
+from kfadapter.kfadapter_notifier import TrainingMgrNotifier
+
+
+def make_response(status_code):
+    response = MagicMock()
+    response.status_code = status_code
+    return response
+
+
+class Test_TrainingMgrNotifier:
+    def setup_method(self):
+        METRICS.reset()
+        self.trainingmgr_dict = {'trainingmgr_host': '127.0.0.1', 'trainingmgr_port': '1111',
+                                 'pool_size': 4, 'connect_timeout_sec': 1,
+                                 'read_timeout_sec': 2, 'notify_retries': 2,
+                                 'notify_backoff_sec': 0}
+        self.notifier = TrainingMgrNotifier(self.trainingmgr_dict)
+
+    def test_session_is_pooled(self):
+        adapter = self.notifier.session.get_adapter('http://127.0.0.1:1111')
+        assert adapter._pool_maxsize == 4
+        assert self.notifier.url == 'http://127.0.0.1:1111/trainingjob/pipelineNotification'
+
+    def test_webhook_session_keeps_connections_of_many_hosts(self):
+        webhook_dict = dict(self.trainingmgr_dict, pool_connections=50, notify_retries=0)
+        notifier = TrainingMgrNotifier(webhook_dict)
+
+        adapter = notifier.session.get_adapter('http://subscriber-1:8080')
+        assert adapter._pool_connections == 50
+        with patch.object(notifier.session, 'post', side_effect=requests.exceptions.Timeout()) as mock_post:
+            assert notifier.post('http://subscriber-1:8080/hook', {}, 'webhook') is None
+        mock_post.assert_called_once()
+
+    def test_webhook_dict_has_short_timeouts_without_retries(self):
+        kfc_config = kfadapter_conf.KfConfiguration.get_instance()
+        webhook_dict = kfc_config.webhook_dict
+
+        assert webhook_dict['notify_retries'] == 0
+        assert webhook_dict['connect_timeout_sec'] + webhook_dict['read_timeout_sec'] < \
+            kfc_config.trainingmgr_dict['read_timeout_sec']
+        assert webhook_dict['pool_connections'] == kfc_config.max_subscriptions
+
+    def test_notify_success(self):
+        run_dict = {'run_id': 'run-id', 'run_status': 'SUCCEEDED', 'trainingjob_id': 'job'}
+        with patch.object(self.notifier.session, 'post', return_value=make_response(200)) as mock_post:
+            assert self.notifier.notify(run_dict)
+
+        mock_post.assert_called_once_with(self.notifier.url, data=json.dumps(run_dict),
+                                          timeout=(1, 2))
+        assert METRICS.get('trainingmgr_notify_success') == 1
+
+    def test_notify_retries_on_connection_error_and_server_error(self):
+        side_effect = [requests.exceptions.ConnectionError(), make_response(503), make_response(200)]
+        with patch.object(self.notifier.session, 'post', side_effect=side_effect) as mock_post:
+            assert self.notifier.notify({'run_id': 'run-id'})
+
+        assert mock_post.call_count == 3
+        assert METRICS.get('trainingmgr_notify_retries') == 2
+
+    def test_notify_gives_up_after_retries(self):
+        side_effect = requests.exceptions.Timeout()
+        with patch.object(self.notifier.session, 'post', side_effect=side_effect) as mock_post:
+            assert not self.notifier.notify({'run_id': 'run-id'})
+
+        assert mock_post.call_count == 3
+        assert METRICS.get('trainingmgr_notify_failures') == 1
+
+    def test_notify_does_not_retry_client_error(self):
+        with patch.object(self.notifier.session, 'post', return_value=make_response(400)) as mock_post:
+            assert not self.notifier.notify({'run_id': 'run-id'})
+
+        mock_post.assert_called_once()
+
+    def test_notify_batch_posts_array(self):
+        run_dicts = [{'run_id': 'run-1'}, {'run_id': 'run-2'}]
+        with patch.object(self.notifier.session, 'post', return_value=make_response(200)) as mock_post:
+            assert self.notifier.notify_batch(run_dicts) is True
+
+        mock_post.assert_called_once_with('http://127.0.0.1:1111/trainingjob/pipelineNotifications',
+                                          data=json.dumps(run_dicts), timeout=(1, 2))
+        assert METRICS.get('trainingmgr_notify_success') == 2
+        assert METRICS.get('trainingmgr_notify_batch_size')['count'] == 1
+
+    def test_notify_batch_unsupported_is_remembered(self):
+        with patch.object(self.notifier.session, 'post', return_value=make_response(404)) as mock_post:
+            assert self.notifier.notify_batch([{'run_id': 'run-1'}]) is None
+            assert self.notifier.notify_batch([{'run_id': 'run-1'}]) is None
+
+        mock_post.assert_called_once()
+        assert METRICS.get('trainingmgr_notify_batch_unsupported') == 1
+
+    def test_notify_batch_failure(self):
+        with patch.object(self.notifier.session, 'post', return_value=make_response(400)):
+            assert self.notifier.notify_batch([{'run_id': 'run-1'}, {'run_id': 'run-2'}]) is False
+
+        assert METRICS.get('trainingmgr_notify_failures') == 2
@@ -0,0 +1,158 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+
+import time
+
+from kfadapter.kfadapter_metrics import METRICS
+from kfadapter.kfadapter_outbox import NotificationOutbox
+
+
+class FakeNotifier:
+    def __init__(self, results=None, batch_results=None):
+        self.results = list(results or [])
+        self.batch_results = list(batch_results or [])
+        self.notified = []
+        self.batches = []
+
+    def notify(self, payload):
+        self.notified.append(payload)
+        if self.results:
+            return self.results.pop(0)
+        return True
+
+    def notify_batch(self, payloads):
+        self.batches.append(payloads)
+        if self.batch_results:
+            return self.batch_results.pop(0)
+        return True
+
+
+class Test_NotificationOutbox:
+    def setup_method(self):
+        METRICS.reset()
+
+    def test_delivered_entry_is_removed(self, tmp_path):
+        notifier = FakeNotifier()
+        outbox = NotificationOutbox(str(tmp_path / "outbox.db"), notifier)
+        outbox.put({'run_id': 'run-1'})
+        assert METRICS.get('notification_outbox_depth') == 1
+
+        assert outbox.drain_once() == 1
+        assert outbox.depth() == 0
+        assert notifier.notified == [{'run_id': 'run-1'}]
+        assert METRICS.get('notification_outbox_depth') == 0
+        assert METRICS.get('notification_delivery_lag_seconds')['count'] == 1
+
+    def test_failed_entry_is_kept_and_retried(self, tmp_path):
+        notifier = FakeNotifier([False, True])
+        outbox = NotificationOutbox(str(tmp_path / "outbox.db"), notifier, retry_interval=0.05)
+        outbox.put({'run_id': 'run-1'})
+
+        assert outbox.drain_once() == 0
+        assert outbox.depth() == 1
+        assert outbox.due_entries() == []
+
+        time.sleep(0.06)
+        assert outbox.drain_once() == 1
+        assert outbox.depth() == 0
+
+    def test_entries_survive_restart(self, tmp_path):
+        path = str(tmp_path / "outbox.db")
+        outbox = NotificationOutbox(path, FakeNotifier([False]))
+        outbox.put({'run_id': 'run-1'})
+        outbox.put({'run_id': 'run-2'})
+        outbox.conn.close()
+
+        notifier = FakeNotifier()
+        outbox = NotificationOutbox(path, notifier)
+        assert METRICS.get('notification_outbox_depth') == 2
+        outbox.defer(outbox.due_entries()[0][0], 0)
+        assert outbox.drain_once() == 1
+        assert notifier.notified == [{'run_id': 'run-2'}]
+
+    def test_background_sender(self, tmp_path):
+        notifier = FakeNotifier()
+        outbox = NotificationOutbox(str(tmp_path / "outbox.db"), notifier)
+        outbox.start()
+        try:
+            outbox.put({'run_id': 'run-1'})
+            for _ in range(100):
+                if notifier.notified:
+                    break
+                time.sleep(0.01)
+        finally:
+            outbox.stop()
+
+        assert notifier.notified == [{'run_id': 'run-1'}]
+        assert outbox.depth() == 0
+
+    def test_entries_are_notified_in_batches(self, tmp_path):
+        notifier = FakeNotifier()
+        outbox = NotificationOutbox(str(tmp_path / "outbox.db"), notifier, notify_batch_size=2)
+        for index in range(5):
+            outbox.put({'run_id': 'run-%d' % index})
+
+        assert outbox.drain_once() == 5
+        assert [[payload['run_id'] for payload in batch] for batch in notifier.batches] == \
+            [['run-0', 'run-1'], ['run-2', 'run-3']]
+        assert notifier.notified == [{'run_id': 'run-4'}]
+        assert outbox.depth() == 0
+        assert METRICS.get('notification_delivery_lag_seconds')['count'] == 5
+
+    def test_unsupported_batch_falls_back_to_single_notifications(self, tmp_path):
+        notifier = FakeNotifier(results=[True, False], batch_results=[None])
+        outbox = NotificationOutbox(str(tmp_path / "outbox.db"), notifier, notify_batch_size=10)
+        outbox.put({'run_id': 'run-1'})
+        outbox.put({'run_id': 'run-2'})
+
+        assert outbox.drain_once() == 1
+        assert notifier.notified == [{'run_id': 'run-1'}, {'run_id': 'run-2'}]
+        assert outbox.depth() == 1
+        assert METRICS.get('notification_batch_fallbacks') == 1
+
+    def test_failed_batch_is_retried(self, tmp_path):
+        notifier = FakeNotifier(batch_results=[False])
+        outbox = NotificationOutbox(str(tmp_path / "outbox.db"), notifier, retry_interval=0.05,
+                                    notify_batch_size=10)
+        outbox.put({'run_id': 'run-1'})
+        outbox.put({'run_id': 'run-2'})
+
+        assert outbox.drain_once() == 0
+        assert outbox.depth() == 2
+        time.sleep(0.06)
+        assert outbox.drain_once() == 2
+        assert len(notifier.batches) == 2
+
+    def test_background_sender_collects_burst_in_window(self, tmp_path):
+        notifier = FakeNotifier()
+        outbox = NotificationOutbox(str(tmp_path / "outbox.db"), notifier, retry_interval=0.05,
+                                    notify_batch_size=10, batch_window=0.2)
+        outbox.start()
+        try:
+            # the first pass runs at start, the burst waits for the window
+            time.sleep(0.1)
+            for index in range(3):
+                outbox.put({'run_id': 'run-%d' % index})
+            for _ in range(100):
+                if notifier.batches:
+                    break
+                time.sleep(0.01)
+        finally:
+            outbox.stop()
+
+        assert [len(batch) for batch in notifier.batches] == [3]
@@ -0,0 +1,333 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+
+import threading
+import time
+
+import pytest
+from mock import patch, MagicMock
+from kfp_server_api.models.v2beta1_run import V2beta1Run as ApiRun
+from kfp_server_api.models.v2beta1_list_runs_response import V2beta1ListRunsResponse as ApiListRunsResponse
+
+from kfadapter import kfadapter_conf
+from kfadapter.kfadapter_cache import RunStateCache
+from kfadapter.kfadapter_events import RunEventBus
+from kfadapter.kfadapter_kfconnect import KfConnect
+from kfadapter.kfadapter_metrics import METRICS
+from kfadapter.kfadapter_outbox import NotificationOutbox
+from kfadapter.kfadapter_poller import RunStatusPoller, MANUAL_RECONCILE, SWEEP_MODE_DRAIN, \
+    SWEEP_MODE_SINGLE, CREATED_AFTER_MARGIN_SEC
+
+
+class FakeRunsKfp:
+    def __init__(self, states, listed=None, delay=0):
+        self.states = states
+        self.listed = states.keys() if listed is None else listed
+        self.delay = delay
+        self.lock_free = True
+        self.list_calls = 0
+        self.get_calls = 0
+
+    def _make_run(self, run_id):
+        if self.delay:
+            time.sleep(self.delay)
+        if kfadapter_conf.LOCK.locked():
+            self.lock_free = False
+        run = ApiRun()
+        run.run_id = run_id
+        run.state = self.states[run_id]
+        return run
+
+    def list_runs(self, page_token='', page_size=10, sort_by='', experiment_id=None,
+                  namespace=None, filter=None):
+        self.list_calls += 1
+        run_ids = sorted(self.listed)
+        start = int(page_token or 0)
+        response = ApiListRunsResponse()
+        response.runs = [self._make_run(run_id) for run_id in run_ids[start:start+page_size]]
+        if start + page_size < len(run_ids):
+            response.next_page_token = str(start + page_size)
+        return response
+
+    def get_run(self, run_id):
+        self.get_calls += 1
+        if run_id not in self.states:
+            raise ValueError(run_id)
+        return self._make_run(run_id)
+
+
+def make_kfconnect(kfp_client):
+    kfconnect = KfConnect()
+    kfconnect.set_kf_client(kfp_client)
+    return kfconnect
+
+
+class Test_RunStatusPoller:
+    def setup_method(self):
+        kfadapter_conf.TRAINING_DICT.clear()
+        kfadapter_conf.RUN_TRACKED_AT.clear()
+        METRICS.reset()
+
+    def teardown_method(self):
+        kfadapter_conf.TRAINING_DICT.clear()
+        kfadapter_conf.JOB_RUNS.clear()
+        kfadapter_conf.RUN_TRACKED_AT.clear()
+
+    @patch("kfadapter.kfadapter_poller.RunStatusPoller.notify_trainingmgr")
+    def test_sweep_notifies_finished_run(self, mock_notify):
+        kfadapter_conf.TRAINING_DICT['run-1'] = 'job-1'
+        kfadapter_conf.TRAINING_DICT['run-2'] = 'job-2'
+        poller = RunStatusPoller(make_kfconnect(FakeRunsKfp({'run-1': 'RUNNING', 'run-2': 'SUCCEEDED'})))
+
+        finished = poller.sweep()
+
+        assert finished == ['run-2']
+        mock_notify.assert_called_once_with('run-2', 'SUCCEEDED', 'job-2')
+        assert kfadapter_conf.TRAINING_DICT == {'run-1': 'job-1'}
+        assert METRICS.get('tracked_runs') == 2
+        assert METRICS.get('run_status_poll_sweep_seconds')['count'] == 1
+
+    @patch("kfadapter.kfadapter_poller.RunStatusPoller.notify_trainingmgr")
+    def test_drain_sweep_notifies_all_finished_runs(self, mock_notify):
+        states = {'run-1': 'SUCCEEDED', 'run-2': 'RUNNING', 'run-3': 'FAILED', 'run-4': 'TERMINATED'}
+        for run_id in states:
+            kfadapter_conf.TRAINING_DICT[run_id] = 'job-' + run_id
+        poller = RunStatusPoller(make_kfconnect(FakeRunsKfp(states)), sweep_mode=SWEEP_MODE_DRAIN)
+
+        finished = poller.sweep()
+
+        assert sorted(finished) == ['run-1', 'run-3', 'run-4']
+        assert mock_notify.call_count == 3
+        assert kfadapter_conf.TRAINING_DICT == {'run-2': 'job-run-2'}
+        assert METRICS.get('run_completions_notified') == 3
+        assert METRICS.get('run_completions_per_sweep')['last'] == 3
+
+    @patch("kfadapter.kfadapter_poller.RunStatusPoller.notify_trainingmgr")
+    def test_single_sweep_notifies_one_finished_run(self, mock_notify):
+        states = {'run-1': 'SUCCEEDED', 'run-2': 'FAILED'}
+        for run_id in states:
+            kfadapter_conf.TRAINING_DICT[run_id] = 'job-' + run_id
+        poller = RunStatusPoller(make_kfconnect(FakeRunsKfp(states)), sweep_mode=SWEEP_MODE_SINGLE)
+
+        assert len(poller.sweep()) == 1
+        assert len(poller.sweep()) == 1
+        assert mock_notify.call_count == 2
+        assert kfadapter_conf.TRAINING_DICT == {}
+
+    @patch("kfadapter.kfadapter_poller.RunStatusPoller.notify_trainingmgr")
+    def test_sweep_marks_unknown_run_for_manual_reconcile(self, mock_notify):
+        kfadapter_conf.TRAINING_DICT['run-1'] = 'job-1'
+        poller = RunStatusPoller(make_kfconnect(FakeRunsKfp({})))
+
+        poller.sweep()
+
+        mock_notify.assert_called_once_with('run-1', MANUAL_RECONCILE, 'job-1')
+        assert kfadapter_conf.TRAINING_DICT == {}
+
+    @patch("kfadapter.kfadapter_poller.RunStatusPoller.notify_trainingmgr")
+    def test_sweep_does_not_hold_lock_during_status_query(self, mock_notify):
+        states = {'run-{}'.format(i): 'RUNNING' for i in range(16)}
+        for run_id in states:
+            kfadapter_conf.TRAINING_DICT[run_id] = 'job'
+        kfp_client = FakeRunsKfp(states, listed=[], delay=0.2)
+        poller = RunStatusPoller(make_kfconnect(kfp_client), workers=16)
+
+        thr = threading.Thread(target=poller.sweep)
+        thr.start()
+        time.sleep(0.05)
+        start = time.monotonic()
+        with kfadapter_conf.LOCK:
+            kfadapter_conf.TRAINING_DICT['run-new'] = 'job-new'
+        lock_wait = time.monotonic() - start
+        thr.join()
+
+        assert lock_wait < 0.1
+        assert kfp_client.lock_free
+        mock_notify.assert_not_called()
+        assert 'run-new' in kfadapter_conf.TRAINING_DICT
+
+    @patch("kfadapter.kfadapter_poller.RunStatusPoller.notify_trainingmgr")
+    def test_sweep_uses_batched_list_runs(self, mock_notify):
+        states = {'run-{:03d}'.format(i): 'RUNNING' for i in range(250)}
+        states['run-new'] = 'SUCCEEDED'
+        for run_id in states:
+            kfadapter_conf.TRAINING_DICT[run_id] = 'job'
+        kfp_client = FakeRunsKfp(states, listed=[r for r in states if r != 'run-new'])
+        poller = RunStatusPoller(make_kfconnect(kfp_client))
+
+        finished = poller.sweep()
+
+        assert finished == ['run-new']
+        assert kfp_client.list_calls == 3
+        assert kfp_client.get_calls == 1
+
+    def test_run_listing_is_bounded_by_oldest_tracked_run(self):
+        with kfadapter_conf.LOCK:
+            kfadapter_conf.track_run('run-1', 'job-1')
+            kfadapter_conf.track_run('run-2', 'job-2')
+            kfadapter_conf.RUN_TRACKED_AT['run-1'] = 1000000.0
+        poller = RunStatusPoller(make_kfconnect(FakeRunsKfp({})))
+
+        created_after = poller.created_after(['run-1', 'run-2'])
+
+        assert created_after.timestamp() == 1000000.0 - CREATED_AFTER_MARGIN_SEC
+        assert poller.created_after(['run-1', 'run-untimed']) is None
+        with kfadapter_conf.LOCK:
+            kfadapter_conf.untrack_run('run-1')
+        assert 'run-1' not in kfadapter_conf.RUN_TRACKED_AT
+
+    @patch("kfadapter.kfadapter_poller.RunStatusPoller.notify_trainingmgr")
+    def test_sweep_writes_run_state_cache(self, mock_notify):
+        kfadapter_conf.TRAINING_DICT['run-1'] = 'job-1'
+        kfadapter_conf.TRAINING_DICT['run-2'] = 'job-2'
+        poller = RunStatusPoller(make_kfconnect(FakeRunsKfp({'run-1': 'RUNNING', 'run-2': 'SUCCEEDED'})))
+        kfadapter_conf.RUN_STATE_CACHE = RunStateCache()
+        try:
+            poller.sweep()
+
+            assert kfadapter_conf.RUN_STATE_CACHE.get('run-1', 5)[0].state == 'RUNNING'
+            assert kfadapter_conf.RUN_STATE_CACHE.get('run-2', 5)[0].state == 'SUCCEEDED'
+        finally:
+            kfadapter_conf.RUN_STATE_CACHE = None
+
+    @patch("kfadapter.kfadapter_poller.RunStatusPoller.notify_trainingmgr")
+    def test_sweep_publishes_run_states(self, mock_notify):
+        kfadapter_conf.TRAINING_DICT['run-1'] = 'job-1'
+        kfadapter_conf.TRAINING_DICT['run-2'] = 'job-2'
+        poller = RunStatusPoller(make_kfconnect(FakeRunsKfp({'run-1': 'RUNNING', 'run-2': 'SUCCEEDED'})))
+        kfadapter_conf.RUN_EVENTS = RunEventBus()
+        try:
+            poller.sweep()
+
+            assert kfadapter_conf.RUN_EVENTS.state('run-1') == ('RUNNING', False)
+            assert kfadapter_conf.RUN_EVENTS.state('run-2') == ('SUCCEEDED', True)
+            assert kfadapter_conf.RUN_EVENTS.events_after(0, 0)[1]['trainingjob_id'] == 'job-2'
+        finally:
+            kfadapter_conf.RUN_EVENTS = None
+
+    @patch("kfadapter.kfadapter_poller.RunStatusPoller.notify_trainingmgr")
+    def test_run_completed_by_watcher_is_not_notified_again(self, mock_notify):
+        kfadapter_conf.TRAINING_DICT['run-1'] = 'job-1'
+        poller = RunStatusPoller(make_kfconnect(FakeRunsKfp({'run-1': 'SUCCEEDED'})))
+        poller._sync_tracked_runs(kfadapter_conf.TRAINING_DICT.copy(), time.monotonic())
+
+        assert not poller.observe_status('run-2', 'SUCCEEDED')
+        assert not poller.observe_status('run-1', 'RUNNING')
+        assert poller.observe_status('run-1', 'SUCCEEDED')
+        finished = poller.sweep()
+
+        assert finished == []
+        mock_notify.assert_called_once_with('run-1', 'SUCCEEDED', 'job-1')
+        assert poller.run_checks == {}
+
+    @patch("kfadapter.kfadapter_poller.RunStatusPoller.notify_trainingmgr")
+    def test_sweep_backs_off_per_run(self, mock_notify):
+        kfadapter_conf.TRAINING_DICT['run-old'] = 'job-old'
+        kfp_client = FakeRunsKfp({'run-old': 'RUNNING', 'run-new': 'SUCCEEDED'}, listed=[])
+        poller = RunStatusPoller(make_kfconnect(kfp_client), min_interval=2, max_interval=8,
+                                 backoff=2, jitter=0)
+
+        poller.sweep(now=100)
+        assert poller.next_check_time() == 102
+        poller.sweep(now=101)
+        assert kfp_client.get_calls == 1
+
+        kfadapter_conf.TRAINING_DICT['run-new'] = 'job-new'
+        assert poller.sweep(now=101.5) == ['run-new']
+        assert kfp_client.get_calls == 2
+
+        for now, next_check in [(102, 106), (106, 114), (114, 122)]:
+            poller.sweep(now=now)
+            assert poller.next_check_time() == next_check
+        assert kfp_client.get_calls == 5
+        mock_notify.assert_called_once_with('run-new', 'SUCCEEDED', 'job-new')
+
+    @patch("kfadapter.kfadapter_poller.RunStatusPoller.notify_trainingmgr")
+    def test_run_is_checked_again_after_failed_sweep(self, mock_notify):
+        kfadapter_conf.TRAINING_DICT['run-1'] = 'job-1'
+        kfconnect = make_kfconnect(FakeRunsKfp({'run-1': 'SUCCEEDED'}))
+        poller = RunStatusPoller(kfconnect, min_interval=2, jitter=0)
+
+        with patch.object(kfconnect, 'get_kf_runs', side_effect=ValueError('kubeflow down')), \
+                pytest.raises(ValueError):
+            poller.sweep(now=100)
+        assert poller.next_check_time() == 102
+
+        assert poller.sweep(now=102) == ['run-1']
+        mock_notify.assert_called_once_with('run-1', 'SUCCEEDED', 'job-1')
+
+    def test_next_interval_jitter_and_cap(self):
+        poller = RunStatusPoller(make_kfconnect(FakeRunsKfp({})), min_interval=1, max_interval=60,
+                                 backoff=3, jitter=0.1)
+        for checks in range(10):
+            interval = poller.next_interval(checks)
+            expected = min(60, 3 ** checks)
+            assert expected * 0.9 <= interval <= expected * 1.1
+
+    def test_untracked_run_is_not_checked(self):
+        kfadapter_conf.TRAINING_DICT['run-1'] = 'job-1'
+        kfp_client = FakeRunsKfp({'run-1': 'RUNNING'}, listed=[])
+        poller = RunStatusPoller(make_kfconnect(kfp_client), min_interval=2, jitter=0)
+
+        poller.sweep(now=0)
+        kfadapter_conf.TRAINING_DICT.clear()
+        poller.sweep(now=10)
+
+        assert kfp_client.get_calls == 1
+        assert poller.next_check_time() is None
+
+    def test_finished_run_is_queued_in_outbox(self, tmp_path):
+        kfadapter_conf.TRAINING_DICT['run-1'] = 'job-1'
+        notifier = MagicMock()
+        outbox = NotificationOutbox(str(tmp_path / "outbox.db"), notifier)
+        poller = RunStatusPoller(make_kfconnect(FakeRunsKfp({'run-1': 'FAILED'})),
+                                 notifier=notifier, outbox=outbox)
+
+        assert poller.sweep() == ['run-1']
+
+        notifier.notify.assert_not_called()
+        assert kfadapter_conf.TRAINING_DICT == {}
+        assert [entry[1] for entry in outbox.due_entries()] == [
+            {'run_id': 'run-1', 'run_status': 'FAILED', 'trainingjob_id': 'job-1'}]
+
+    def test_run_stays_tracked_when_outbox_write_fails(self):
+        kfadapter_conf.TRAINING_DICT['run-1'] = 'job-1'
+        outbox = MagicMock()
+        outbox.put.side_effect = [OSError('disk full'), 1]
+        poller = RunStatusPoller(make_kfconnect(FakeRunsKfp({'run-1': 'FAILED'})),
+                                 notifier=MagicMock(), outbox=outbox, jitter=0)
+
+        assert poller.sweep(now=100) == []
+        assert kfadapter_conf.TRAINING_DICT == {'run-1': 'job-1'}
+
+        assert poller.sweep(now=101) == ['run-1']
+        assert kfadapter_conf.TRAINING_DICT == {}
+        assert outbox.put.call_count == 2
+
+    @patch("kfadapter.kfadapter_poller.RunStatusPoller.notify_trainingmgr")
+    def test_reconcile_checks_all_tracked_runs(self, mock_notify):
+        states = {'run-{}'.format(i): 'RUNNING' for i in range(50)}
+        states['run-0'] = 'SUCCEEDED'
+        kfadapter_conf.TRAINING_DICT.update({run_id: 'job' for run_id in states})
+        kfp_client = FakeRunsKfp(states)
+        poller = RunStatusPoller(make_kfconnect(kfp_client))
+
+        assert poller.reconcile() == ['run-0']
+        assert kfp_client.list_calls == 1
+        assert kfp_client.get_calls == 0
+        assert METRICS.get('run_reconcile_seconds')['count'] == 1
@@ -0,0 +1,86 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+
+import time
+
+from kfadapter import kfadapter_conf
+from kfadapter.kfadapter_metrics import METRICS
+from kfadapter.kfadapter_runstore import TrackedRunStore, recover_tracked_runs
+
+
+class Test_TrackedRunStore:
+    def setup_method(self):
+        METRICS.reset()
+        kfadapter_conf.TRAINING_DICT.clear()
+
+    def teardown_method(self):
+        kfadapter_conf.TRAINING_DICT.clear()
+        kfadapter_conf.JOB_RUNS.clear()
+        kfadapter_conf.RUN_TRACKED_AT.clear()
+        kfadapter_conf.RUN_STORE = None
+
+    def test_changes_are_written_on_flush(self, tmp_path):
+        store = TrackedRunStore(str(tmp_path / "runs.db"))
+        store.put('run-1', 'job-1')
+        store.put('run-2', 'job-2')
+        store.delete('run-1')
+        assert store.load() == {}
+
+        assert store.flush() == 2
+        assert store.load() == {'run-2': 'job-2'}
+
+    def test_track_and_untrack_update_store(self, tmp_path):
+        store = TrackedRunStore(str(tmp_path / "runs.db"))
+        kfadapter_conf.RUN_STORE = store
+        with kfadapter_conf.LOCK:
+            kfadapter_conf.track_run('run-1', 'job-1')
+            kfadapter_conf.track_run('run-2', 'job-2')
+        store.flush()
+        with kfadapter_conf.LOCK:
+            assert kfadapter_conf.untrack_run('run-1') == 'job-1'
+            assert kfadapter_conf.untrack_run('run-x') is None
+        store.flush()
+
+        assert store.load() == {'run-2': 'job-2'}
+        assert kfadapter_conf.TRAINING_DICT == {'run-2': 'job-2'}
+
+    def test_background_flusher(self, tmp_path):
+        store = TrackedRunStore(str(tmp_path / "runs.db"), flush_interval=0.01)
+        store.start()
+        store.put('run-1', 'job-1')
+        store.stop()
+
+        assert store.load() == {'run-1': 'job-1'}
+
+    def test_recover_10k_tracked_runs(self, tmp_path):
+        path = str(tmp_path / "runs.db")
+        store = TrackedRunStore(path)
+        for i in range(10000):
+            store.put('run-{}'.format(i), 'job-{}'.format(i))
+        store.flush()
+        store.conn.close()
+
+        start = time.monotonic()
+        store = TrackedRunStore(path)
+        assert recover_tracked_runs(store) == 10000
+        assert time.monotonic() - start < 1
+
+        assert kfadapter_conf.TRAINING_DICT['run-9999'] == 'job-9999'
+        assert kfadapter_conf.RUN_TRACKED_AT['run-9999'] <= time.time()
+        assert kfadapter_conf.RUN_STORE is store
+        assert METRICS.get('run_store_recovered_runs') == 10000
@@ -0,0 +1,69 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+
+import pytest
+from mock import patch, MagicMock
+
+from kfadapter import kfadapter_conf
+from kfadapter import kfadapter_main
+from kfadapter.kfadapter_server import KfAdapterServer, server_options, start_worker_services
+
+
+class Test_KfAdapterServer:
+    def test_server_options_from_configuration(self):
+        kfc_config = kfadapter_conf.KfConfiguration.get_instance()
+
+        options = server_options(kfc_config)
+
+        assert options['bind'] == '0.0.0.0:' + str(kfc_config.appport)
+        assert options['workers'] == 1
+        assert options['worker_class'] == 'gthread'
+        assert options['threads'] == kfc_config.server_threads
+        # streams and waits leave threads for other requests
+        assert kfc_config.long_request_max_concurrent < options['threads']
+        assert options['keepalive'] == kfc_config.server_keepalive_sec
+        assert options['backlog'] == kfc_config.server_backlog
+        assert options['post_worker_init'] is start_worker_services
+
+    def test_gunicorn_takes_options(self):
+        kfc_config = kfadapter_conf.KfConfiguration.get_instance()
+        server = KfAdapterServer(kfadapter_main.APP, server_options(kfc_config))
+
+        assert server.cfg.worker_class_str == 'gthread'
+        assert server.cfg.threads == kfc_config.server_threads
+        assert server.cfg.backlog == kfc_config.server_backlog
+        assert server.load() is kfadapter_main.APP
+
+    @patch("kfadapter.kfadapter_main.start_services", return_value=True)
+    def test_services_are_started_in_worker(self, mock_start_services):
+        start_worker_services(MagicMock())
+
+        mock_start_services.assert_called_once()
+
+    @patch("kfadapter.kfadapter_main.start_services", return_value=False)
+    def test_worker_stops_when_services_fail(self, mock_start_services):
+        with pytest.raises(SystemExit) as err:
+            start_worker_services(MagicMock())
+        assert err.value.code == 3
+
+    def test_services_are_started_once(self):
+        with patch.object(kfadapter_main, 'SERVICES_STARTED', True), \
+                patch("kfadapter.kfadapter_conf.KfConfiguration.get_instance") as mock_get_instance:
+            assert kfadapter_main.start_services()
+
+        mock_get_instance.assert_not_called()
@@ -0,0 +1,89 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+
+import queue
+import time
+
+import pytest
+
+from kfadapter.kfadapter_metrics import METRICS
+from kfadapter.kfadapter_submission import SubmissionQueue
+
+
+def wait_for_status(submissions, ticket, expected):
+    for _ in range(100):
+        ticket_status = submissions.status(ticket)
+        if ticket_status['status'] == expected:
+            return ticket_status
+        time.sleep(0.01)
+    return submissions.status(ticket)
+
+
+class Test_SubmissionQueue:
+    def setup_method(self):
+        METRICS.reset()
+
+    def test_submission_is_processed_by_worker(self):
+        submissions = SubmissionQueue(lambda job_id, req, key: {'run_id': 'run-' + job_id}, workers=2)
+        submissions.start()
+        try:
+            ticket = submissions.submit('job', {'arguments': {}})
+            ticket_status = wait_for_status(submissions, ticket, 'submitted')
+        finally:
+            submissions.stop()
+
+        assert ticket_status['run_id'] == 'run-job'
+        assert ticket_status['trainingjob_id'] == 'job'
+        assert METRICS.get('submission_queue_wait_seconds')['count'] == 1
+        assert METRICS.get('submission_service_seconds')['count'] == 1
+        assert METRICS.get('submission_queue_depth') == 0
+
+    def test_failed_submission_keeps_message(self):
+        def handler(job_id, req, key):
+            raise ValueError("Experiment name is not correct exp")
+
+        submissions = SubmissionQueue(handler)
+        ticket = submissions.submit('job', {})
+        submissions.process(*submissions.queue.get_nowait())
+
+        ticket_status = submissions.status(ticket)
+        assert ticket_status['status'] == 'failed'
+        assert ticket_status['message'] == "Experiment name is not correct exp"
+        assert METRICS.get('submission_failed') == 1
+
+    def test_full_queue_rejects_submission(self):
+        submissions = SubmissionQueue(lambda job_id, req, key: {}, maxsize=1)
+        submissions.submit('job1', {})
+        with pytest.raises(queue.Full):
+            submissions.submit('job2', {})
+
+        assert len(submissions.tickets) == 1
+        assert METRICS.get('submission_queue_depth') == 1
+        assert METRICS.get('submission_queue_rejected') == 1
+
+    def test_oldest_finished_tickets_are_dropped(self):
+        submissions = SubmissionQueue(lambda job_id, req, key: {'run_id': job_id}, max_tickets=2)
+        first = submissions.submit('job1', {})
+        submissions.process(*submissions.queue.get_nowait())
+        second = submissions.submit('job2', {})
+        third = submissions.submit('job3', {})
+
+        assert submissions.status(first) is None
+        assert submissions.status(second)['status'] == 'queued'
+        assert submissions.status(third)['status'] == 'queued'
+        assert submissions.status('unknown') is None
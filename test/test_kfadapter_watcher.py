@@ -0,0 +1,175 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+from mock import patch
+from kubernetes.client.rest import ApiException
+
+from kfadapter import kfadapter_conf
+from kfadapter.kfadapter_kfconnect import KfConnect
+from kfadapter.kfadapter_metrics import METRICS
+from kfadapter.kfadapter_poller import RunStatusPoller
+from kfadapter.kfadapter_watcher import WorkflowWatcher, make_api_client
+
+WORKFLOWS_PATH = "/apis/argoproj.io/v1alpha1/namespaces/kubeflow/workflows"
+
+
+def make_workflow(run_id, phase, resource_version):
+    return {'apiVersion': 'argoproj.io/v1alpha1', 'kind': 'Workflow',
+            'metadata': {'name': 'wf-' + run_id, 'resourceVersion': resource_version,
+                         'labels': {'pipeline/runid': run_id}},
+            'status': {'phase': phase}}
+
+
+class FakeApiServer:
+    """Kubernetes api server serving workflow lists and scripted watch streams"""
+
+    def __init__(self):
+        self.list_response = {'items': [], 'metadata': {'resourceVersion': '1'}}
+        # resourceVersion -> list of watch events answered for a watch from it
+        self.watches = {}
+        self.requests = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                fake.requests.append((url.path, query))
+                if url.path != WORKFLOWS_PATH or query.get('labelSelector') != 'pipeline/runid':
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                if query.get('watch') != 'True':
+                    self.wfile.write(json.dumps(fake.list_response).encode())
+                    return
+                for event in fake.watches.get(query.get('resourceVersion'), []):
+                    self.wfile.write((json.dumps(event) + '\n').encode())
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:%d' % self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,),
+                                       daemon=True)
+        self.thread.start()
+
+    def watched_versions(self):
+        return [query.get('resourceVersion') for path, query in self.requests
+                if query.get('watch') == 'True']
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class Test_WorkflowWatcher:
+    def setup_method(self):
+        METRICS.reset()
+        kfadapter_conf.TRAINING_DICT.clear()
+        self.server = FakeApiServer()
+        self.statuses = []
+        self.watcher = WorkflowWatcher(make_api_client(self.server.url, token_path='/nonexistent'),
+                                       'kubeflow', lambda *status: self.statuses.append(status),
+                                       retry_interval=0.01)
+
+    def teardown_method(self):
+        self.server.close()
+        kfadapter_conf.TRAINING_DICT.clear()
+
+    def test_relist_then_watch_from_resource_version(self):
+        self.server.list_response = {'items': [make_workflow('run-1', 'Running', '8'),
+                                               make_workflow('run-2', 'Pending', '9')],
+                                     'metadata': {'resourceVersion': '10'}}
+        self.server.watches['10'] = [
+            {'type': 'MODIFIED', 'object': make_workflow('run-1', 'Succeeded', '11')},
+            {'type': 'DELETED', 'object': make_workflow('run-2', 'Error', '12')},
+            {'type': 'BOOKMARK', 'object': {'kind': 'Workflow', 'metadata': {'resourceVersion': '15'}}}]
+
+        assert self.watcher.relist() == 2
+        assert self.watcher.watch_once() == 3
+
+        assert self.statuses == [('run-1', 'RUNNING'), ('run-2', 'PENDING'), ('run-1', 'SUCCEEDED')]
+        assert self.server.watched_versions() == ['10']
+        assert self.watcher.resource_version == '15'
+
+    def test_expired_resource_version_raises_gone(self):
+        self.watcher.resource_version = '3'
+        self.server.watches['3'] = [{'type': 'ERROR', 'object': {
+            'kind': 'Status', 'code': 410, 'reason': 'Expired', 'message': 'too old'}}]
+
+        with pytest.raises(ApiException) as err:
+            self.watcher.watch_once()
+        assert err.value.status == 410
+
+    def test_run_resumes_and_relists_after_gone(self):
+        self.server.list_response = {'items': [], 'metadata': {'resourceVersion': '10'}}
+        self.server.watches['10'] = [{'type': 'ADDED', 'object': make_workflow('run-1', 'Running', '11')}]
+        self.server.watches['11'] = [{'type': 'ERROR', 'object': {
+            'kind': 'Status', 'code': 410, 'reason': 'Expired', 'message': 'too old'}}]
+
+        def on_status(run_id, run_status):
+            self.statuses.append((run_id, run_status))
+            if run_status == 'FAILED':
+                self.watcher.stop_event.set()
+
+        self.watcher.on_status = on_status
+        relists = []
+
+        def relist():
+            if relists:
+                self.server.list_response = {'items': [make_workflow('run-1', 'Failed', '20')],
+                                             'metadata': {'resourceVersion': '20'}}
+            relists.append(True)
+            return WorkflowWatcher.relist(self.watcher)
+
+        with patch.object(self.watcher, 'relist', side_effect=relist):
+            self.watcher.start()
+            self.watcher.thread.join(5)
+
+        assert not self.watcher.thread.is_alive()
+        assert self.statuses == [('run-1', 'RUNNING'), ('run-1', 'FAILED')]
+        assert self.server.watched_versions()[:2] == ['10', '11']
+        assert len(relists) == 2
+
+    def test_watched_completion_is_notified_once(self):
+        kfadapter_conf.TRAINING_DICT['run-1'] = 'job-1'
+        poller = RunStatusPoller(KfConnect(), notifier=object())
+        self.watcher.on_status = poller.observe_status
+        self.server.list_response = {'items': [make_workflow('run-1', 'Running', '5')],
+                                     'metadata': {'resourceVersion': '5'}}
+        self.server.watches['5'] = [
+            {'type': 'MODIFIED', 'object': make_workflow('run-1', 'Succeeded', '6')},
+            {'type': 'MODIFIED', 'object': make_workflow('run-1', 'Succeeded', '7')}]
+
+        with patch.object(poller, 'notify_trainingmgr') as mock_notify:
+            self.watcher.relist()
+            self.watcher.watch_once()
+
+        mock_notify.assert_called_once_with('run-1', 'SUCCEEDED', 'job-1')
+        assert kfadapter_conf.TRAINING_DICT == {}
+        assert METRICS.get('run_completions_watched') == 1
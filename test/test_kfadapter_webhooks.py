@@ -0,0 +1,134 @@
+# ==================================================================================
+#
+#       Copyright (c) 2022 Samsung Electronics Co., Ltd. All Rights Reserved.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#          http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+# ==================================================================================
+
+import time
+from threading import Event, Lock
+
+from mock import MagicMock
+
+from kfadapter.kfadapter_events import RunEventBus
+from kfadapter.kfadapter_metrics import METRICS
+from kfadapter.kfadapter_webhooks import WebhookDispatcher
+
+
+class FakePoster:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.lock = Lock()
+        self.posted = []
+        self.blocked = {}
+
+    def post(self, url, payload, metric_prefix='trainingmgr_notify'):
+        if url in self.blocked:
+            self.blocked[url].wait(5)
+        with self.lock:
+            self.posted.append((url, payload))
+        response = MagicMock()
+        response.status_code = self.status_code
+        return response
+
+
+def make_event(event_id, run_status, run_id='run-1', trainingjob_id='job-1'):
+    return {'id': event_id, 'run_id': run_id, 'run_status': run_status,
+            'trainingjob_id': trainingjob_id, 'finished': run_status == 'SUCCEEDED',
+            'time': time.time()}
+
+
+def wait_for(condition):
+    for _ in range(500):
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class Test_WebhookDispatcher:
+    def setup_method(self):
+        METRICS.reset()
+        self.poster = FakePoster()
+        self.dispatcher = WebhookDispatcher(self.poster, workers=4, max_queued=2,
+                                            max_subscriptions=2)
+
+    def teardown_method(self):
+        for blocker in self.poster.blocked.values():
+            blocker.set()
+        self.dispatcher.stop()
+
+    def test_events_are_delivered_in_order_to_matching_subscriptions(self):
+        all_states = self.dispatcher.subscribe('http://a/hook')
+        finished = self.dispatcher.subscribe('http://b/hook', ['SUCCEEDED'], 'job-1')
+
+        assert self.dispatcher.dispatch(make_event(1, 'RUNNING')) == 1
+        assert self.dispatcher.dispatch(make_event(2, 'SUCCEEDED')) == 2
+        assert self.dispatcher.dispatch(make_event(3, 'SUCCEEDED', trainingjob_id='job-2')) == 1
+        assert wait_for(lambda: METRICS.get('webhook_delivered') == 4)
+
+        posted_a = [payload['id'] for url, payload in self.poster.posted if url == 'http://a/hook']
+        posted_b = [payload for url, payload in self.poster.posted if url == 'http://b/hook']
+        assert posted_a == [1, 2, 3]
+        assert [payload['id'] for payload in posted_b] == [2]
+        assert posted_b[0]['subscription_id'] == finished['subscription_id']
+        assert self.dispatcher.get(all_states['subscription_id'])['delivered'] == 3
+
+    def test_slow_subscriber_does_not_delay_others(self):
+        self.dispatcher.subscribe('http://slow/hook')
+        self.dispatcher.subscribe('http://fast/hook')
+        self.poster.blocked['http://slow/hook'] = Event()
+
+        for event_id in range(1, 4):
+            self.dispatcher.dispatch(make_event(event_id, 'RUNNING', run_id='run-%d' % event_id))
+
+        assert wait_for(lambda: len(self.poster.posted) == 3)
+        assert {url for url, payload in self.poster.posted} == {'http://fast/hook'}
+        # the slow subscriber holds one event in flight and two queued, the last is dropped
+        assert METRICS.get('webhook_dropped') is None
+        self.dispatcher.dispatch(make_event(4, 'RUNNING', run_id='run-4'))
+        assert METRICS.get('webhook_dropped') == 1
+
+        self.poster.blocked['http://slow/hook'].set()
+        assert wait_for(lambda: METRICS.get('webhook_delivered') == 7)
+
+    def test_failed_delivery_is_counted(self):
+        self.poster.status_code = 500
+        subscription = self.dispatcher.subscribe('http://a/hook')
+
+        self.dispatcher.dispatch(make_event(1, 'FAILED'))
+
+        assert wait_for(lambda: METRICS.get('webhook_failed') == 1)
+        assert self.dispatcher.get(subscription['subscription_id'])['failed'] == 1
+
+    def test_subscription_limit_and_unsubscribe(self):
+        first = self.dispatcher.subscribe('http://a/hook')
+        self.dispatcher.subscribe('http://b/hook')
+        assert self.dispatcher.subscribe('http://c/hook') is None
+
+        assert self.dispatcher.unsubscribe(first['subscription_id'])
+        assert not self.dispatcher.unsubscribe(first['subscription_id'])
+        assert [sub['callback_url'] for sub in self.dispatcher.list()] == ['http://b/hook']
+        assert self.dispatcher.subscribe('http://c/hook') is not None
+
+    def test_dispatch_as_event_bus_listener(self):
+        bus = RunEventBus()
+        bus.add_listener(self.dispatcher.dispatch)
+        self.dispatcher.subscribe('http://a/hook', ['SUCCEEDED'])
+
+        bus.publish('run-1', 'RUNNING', 'job-1')
+        bus.publish('run-1', 'SUCCEEDED', 'job-1', True)
+
+        assert wait_for(lambda: METRICS.get('webhook_delivered') == 1)
+        assert self.poster.posted[0][1]['run_status'] == 'SUCCEEDED'